@@ -0,0 +1,87 @@
+import os
+import itertools
+from root_plotting.LazyROOT import TCanvas
+
+_ids = itertools.count()
+
+class PdfBook():
+    def __init__(self, path):
+        # Multi-page PDF kept open between pages; pass it as save= to any plot method
+        self.path = path
+        self.pages = 0
+        self._open = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def add_page(self, c, title=None):
+        if not self._open:
+            if os.path.dirname(self.path): os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            c.Print(f'{self.path}[')
+            self._open = True
+        self.pages += 1
+        c.Print(self.path, f'Title:{title if title else f"page {self.pages}"}')
+
+    def close(self):
+        if not self._open: return
+        c = TCanvas(f'book_close_{next(_ids)}', '', 10, 10)
+        c.Print(f'{self.path}]')
+        c.Close()
+        self._open = False
+
+class GridCanvas():
+    def __init__(self, nx, ny, size=(1600,1600), book=None):
+        # nx*ny plots per sheet; with a book, full sheets are appended to it and the grid starts over
+        self.nx = nx
+        self.ny = ny
+        self.book = book
+        name = f'grid_{next(_ids)}'
+        self.canvas = TCanvas(name, name, size[0], size[1])
+        self.canvas.Divide(nx, ny)
+        self.index = 0
+        self.sheets = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.book is not None and self.index: self.flush()
+        return False
+
+    def next_pad(self):
+        if self.index == self.nx * self.ny:
+            if self.book is None: raise RuntimeError(f'GridCanvas is full ({self.nx}x{self.ny}), save it or pass a book')
+            self.flush()
+        self.index += 1
+        pad = self.canvas.cd(self.index)
+        pad.SetLeftMargin(0.15)
+        pad.SetRightMargin(0.05)
+        pad.SetBottomMargin(0.15)
+        return pad
+
+    def draw(self, plot_method, *args, **kwargs):
+        # Runs e.g. mhp.plotHists into the next subpad, reusing the plotter's own layout code
+        plotter = plot_method.__self__
+        plotter._canvas_target = self.next_pad()
+        try:
+            return plot_method(*args, **kwargs)
+        finally:
+            plotter._canvas_target = None
+
+    def flush(self, title=None):
+        self.canvas.Update()
+        self.sheets += 1
+        if self.book is not None: self.book.add_page(self.canvas, title=title if title else f'sheet {self.sheets}')
+        self.canvas.Clear()
+        self.canvas.Divide(self.nx, self.ny)
+        self.index = 0
+
+    def save(self, save):
+        self.canvas.Update()
+        if isinstance(save, PdfBook): save.add_page(self.canvas)
+        else:
+            for path in ([save] if isinstance(save, str) else save): self.canvas.SaveAs(path)
@@ -0,0 +1,101 @@
+import os
+import traceback
+import contextlib
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+class PlotJob():
+    def __init__(self, plotter, method, args=(), kwargs=None, params=None, name=None):
+        # plotter: 'HistPlot', 'MultiHistPlot', 'EfficiencyPlot', 'EfficiencyMapPlot' or 'StackPlot'
+        # args/kwargs are passed to the plot method, histograms are pickled to the worker
+        self.plotter = plotter
+        self.method = method
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs) if kwargs else {}
+        self.params = dict(params) if params else {}
+        self.name = name if name is not None else self.kwargs.get('save')
+
+class PlotResult():
+    def __init__(self, name, ok, output=None, error=None):
+        self.name = name
+        self.ok = ok
+        self.output = output
+        self.error = error
+
+    def __repr__(self):
+        return f'PlotResult({self.name!r}, ok={self.ok}, output={self.output!r})'
+
+def plotter_class(name):
+    if name=='HistPlot':
+        from root_plotting.HistPlot import HistPlot
+        return HistPlot
+    elif name=='MultiHistPlot':
+        from root_plotting.MultiHistPlot import MultiHistPlot
+        return MultiHistPlot
+    elif name=='EfficiencyPlot':
+        from root_plotting.EfficiencyPlot import EfficiencyPlot
+        return EfficiencyPlot
+    elif name=='EfficiencyMapPlot':
+        from root_plotting.EfficiencyMapPlot import EfficiencyMapPlot
+        return EfficiencyMapPlot
+    elif name=='StackPlot':
+        from root_plotting.StackPlot import StackPlot
+        return StackPlot
+    raise ValueError(f'Unknown plotter {name!r}')
+
+def init_worker():
+    from ROOT import gROOT, TH1
+    gROOT.SetBatch(True)
+    # Unpickled histograms would otherwise pile up in the worker's gROOT
+    TH1.AddDirectory(False)
+
+@contextlib.contextmanager
+def worker_state():
+    # init_worker's settings for jobs run in the calling process; its own batch and directory settings are restored after
+    from ROOT import gROOT, TH1
+    batch, add_directory = gROOT.IsBatch(), TH1.AddDirectoryStatus()
+    init_worker()
+    try:
+        yield
+    finally:
+        gROOT.SetBatch(batch)
+        TH1.AddDirectory(add_directory)
+
+def run_job(job):
+    from ROOT import gROOT
+    if isinstance(job, dict): job = PlotJob(**job)
+    existing = set(c.GetName() for c in gROOT.GetListOfCanvases())
+    try:
+        plotter = plotter_class(job.plotter)(init_params=job.params)
+        getattr(plotter, job.method)(*job.args, **job.kwargs)
+        return PlotResult(job.name, True, output=job.kwargs.get('save'))
+    except Exception:
+        return PlotResult(job.name, False, error=traceback.format_exc())
+    finally:
+        for c in list(gROOT.GetListOfCanvases()):
+            if c.GetName() not in existing: c.Close()
+
+def batch_pool(workers=None, start_method='spawn'):
+    # Worker processes set up by init_worker; one pool can serve several render_batch calls
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=mp.get_context(start_method), initializer=init_worker)
+
+def render_batch(jobs, workers=None, start_method='spawn', pool=None):
+    # Results come back in job order, failures are reported per job instead of raised; pass pool to reuse its workers
+    jobs = [PlotJob(**job) if isinstance(job, dict) else job for job in jobs]
+    if pool is None:
+        workers = workers or os.cpu_count()
+        if workers==1:
+            if not jobs: return []
+            with worker_state():
+                return [run_job(job) for job in jobs]
+        with batch_pool(workers, start_method) as pool:
+            return render_batch(jobs, pool=pool)
+
+    futures = [pool.submit(run_job, job) for job in jobs]
+    results = []
+    for job, future in zip(jobs, futures):
+        try:
+            results.append(future.result())
+        except Exception:
+            results.append(PlotResult(job.name, False, error=traceback.format_exc()))
+    return results
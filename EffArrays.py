@@ -0,0 +1,177 @@
+import itertools
+import numpy as np
+from root_plotting.LazyROOT import TH1D, TGraphAsymmErrors
+from root_plotting.Utils import contents_view, sumw2_view, bin_edges, divide_arrays, set_hist_arrays, hist2d_arrays, hist2d_from_arrays
+from root_plotting.EfficiencyIndex import EfficiencyIndex, EfficiencyIndex2D
+from root_plotting.Stats import CL_1SIGMA, eff_interval, ratio_interval
+
+_ids = itertools.count()
+
+class EffArrays():
+    def __init__(self, passed, total, edges, title='', passed_w2=None, total_w2=None):
+        # In-range bins only; the arrays are used as given (views stay views)
+        self.passed = np.asarray(passed)
+        self.total = np.asarray(total)
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.title = title
+        self.passed_w2 = self.passed if passed_w2 is None else np.asarray(passed_w2)
+        self.total_w2 = self.total if total_w2 is None else np.asarray(total_w2)
+        if not (len(self.passed)==len(self.total)==len(self.edges)-1):
+            raise ValueError('passed, total and edges have inconsistent lengths')
+        self._eff = {}
+        self._index = None
+
+    @classmethod
+    def from_efficiency(cls, eff):
+        h_pass = eff.GetPassedHistogram()
+        h_tot = eff.GetTotalHistogram()
+        w2_pass = sumw2_view(h_pass)
+        w2_tot = sumw2_view(h_tot)
+        return cls(contents_view(h_pass)[1:-1], contents_view(h_tot)[1:-1], bin_edges(h_pass), title=eff.GetTitle(),
+                passed_w2=None if w2_pass is None else w2_pass[1:-1],
+                total_w2=None if w2_tot is None else w2_tot[1:-1],
+        )
+
+    @classmethod
+    def from_input(cls, obj):
+        # Accepts EffArrays, TEfficiency, (passed, total, edges) or a dict of the constructor arguments
+        if isinstance(obj, cls): return obj
+        if isinstance(obj, dict): return cls(**obj)
+        if isinstance(obj, (tuple, list)): return cls(*obj)
+        return cls.from_efficiency(obj)
+
+    @property
+    def centers(self):
+        return .5 * (self.edges[1:] + self.edges[:-1])
+
+    def efficiency(self, method='clopper_pearson', level=CL_1SIGMA):
+        # (eff, err_low, err_up), computed once per object and interval
+        if (method, level) not in self._eff:
+            self._eff[(method, level)] = eff_interval(self.passed, self.total, method=method, level=level)
+        return self._eff[(method, level)]
+
+    def binomial_errors2(self):
+        # Squared errors of TH1::Divide(pass, total, 1, 1, 'B')
+        eff = self.efficiency()[0]
+        filled = self.total > 0
+        tot = np.where(filled, self.total, 1.)
+        return np.where(filled, np.abs((1 - 2*eff) * self.passed_w2 + eff*eff * self.total_w2) / (tot*tot), 0.)
+
+    def index(self):
+        if self._index is None: self._index = EfficiencyIndex(self.passed, self.total, self.edges)
+        return self._index
+
+    def _graph(self, name, mask, y, err_low, err_up):
+        x = np.ascontiguousarray(self.centers[mask])
+        half = np.ascontiguousarray(.5 * np.diff(self.edges)[mask])
+        g = TGraphAsymmErrors(int(mask.sum()), x, np.ascontiguousarray(y[mask]), half, half,
+                np.ascontiguousarray(err_low[mask]), np.ascontiguousarray(err_up[mask]))
+        g.SetName(name)
+        g.GetXaxis().SetLimits(self.edges[0], self.edges[-1])
+        return g
+
+    def graph(self, method='clopper_pearson', level=CL_1SIGMA, name=None):
+        # Only filled bins are drawn, like a painted TEfficiency
+        g = self._graph(f'eff_{next(_ids)}' if name is None else name, self.total > 0, *self.efficiency(method, level))
+        g.SetTitle(self.title)
+        return g
+
+    def ratio_points(self, other, level=CL_1SIGMA):
+        # (defined bins, ratio, err_low, err_up) with asymmetric Katz intervals
+        if len(self.edges)!=len(other.edges): raise ValueError('Cannot divide efficiencies with different binning')
+        r, err_low, err_up = ratio_interval(self.passed, self.total, other.passed, other.total, level=level)
+        defined = (self.total > 0) & (other.total > 0) & (other.passed > 0)
+        return defined, r, err_low, err_up
+
+    def ratio_graph(self, other, level=CL_1SIGMA, name=None):
+        # Asymmetric Katz intervals instead of propagated binomial errors
+        return self._graph(f'eff_ratio_{next(_ids)}' if name is None else name, *self.ratio_points(other, level))
+
+    def ratio_arrays(self, other):
+        # (ratio, squared error) with binomially propagated errors, as TH1::Divide of the two efficiencies
+        if len(self.edges)!=len(other.edges): raise ValueError('Cannot divide efficiencies with different binning')
+        return divide_arrays(self.efficiency()[0], self.binomial_errors2(), other.efficiency()[0], other.binomial_errors2())
+
+    def ratio(self, other, name=None):
+        content, err2 = self.ratio_arrays(other)
+        name = f'eff_ratio_{next(_ids)}' if name is None else name
+        edges = np.ascontiguousarray(self.edges)
+        r = TH1D(name, '', len(edges)-1, edges)
+        cells = np.zeros(len(edges)+1)
+        cells_err2 = np.zeros(len(edges)+1)
+        cells[1:-1] = content
+        cells_err2[1:-1] = err2
+        set_hist_arrays(r, cells, cells_err2)
+        return r
+
+# Content of map cells without a value; below any colour scale, so COLZ0 leaves them blank
+EMPTY_CELL = -1.
+
+class EffArrays2D():
+    def __init__(self, passed, total, xedges, yedges, title='', passed_w2=None, total_w2=None):
+        # In-range cells indexed [ix, iy] like numpy.histogram2d; the arrays are used as given
+        self.passed = np.asarray(passed)
+        self.total = np.asarray(total)
+        self.xedges = np.asarray(xedges, dtype=np.float64)
+        self.yedges = np.asarray(yedges, dtype=np.float64)
+        self.title = title
+        self.passed_w2 = self.passed if passed_w2 is None else np.asarray(passed_w2)
+        self.total_w2 = self.total if total_w2 is None else np.asarray(total_w2)
+        shape = (len(self.xedges)-1, len(self.yedges)-1)
+        if self.passed.shape!=shape or self.total.shape!=shape:
+            raise ValueError(f'passed and total must have shape {shape} for the given edges')
+        self._eff = {}
+        self._index = None
+
+    @classmethod
+    def from_efficiency(cls, eff):
+        passed, passed_w2, xedges, yedges = hist2d_arrays(eff.GetPassedHistogram())
+        total, total_w2, _, _ = hist2d_arrays(eff.GetTotalHistogram())
+        return cls(passed, total, xedges, yedges, title=eff.GetTitle(), passed_w2=passed_w2, total_w2=total_w2)
+
+    @classmethod
+    def from_input(cls, obj):
+        # Accepts EffArrays2D, a 2D TEfficiency, (passed, total, xedges, yedges) or a dict of the constructor arguments
+        if isinstance(obj, cls): return obj
+        if isinstance(obj, dict): return cls(**obj)
+        if isinstance(obj, (tuple, list)): return cls(*obj)
+        return cls.from_efficiency(obj)
+
+    def efficiency(self, method='clopper_pearson', level=CL_1SIGMA):
+        # (eff, err_low, err_up) per cell, computed once per object and interval
+        if (method, level) not in self._eff:
+            self._eff[(method, level)] = eff_interval(self.passed, self.total, method=method, level=level)
+        return self._eff[(method, level)]
+
+    def binomial_errors2(self):
+        eff = self.efficiency()[0]
+        filled = self.total > 0
+        tot = np.where(filled, self.total, 1.)
+        return np.where(filled, np.abs((1 - 2*eff) * self.passed_w2 + eff*eff * self.total_w2) / (tot*tot), 0.)
+
+    def index(self):
+        if self._index is None: self._index = EfficiencyIndex2D(self.passed, self.total, self.xedges, self.yedges)
+        return self._index
+
+    def ratio_cells(self, other, method='katz', level=CL_1SIGMA):
+        # (defined cells, ratio, err_low, err_up): Katz intervals, or binomially propagated errors with method=None
+        if self.passed.shape!=other.passed.shape: raise ValueError('Cannot divide efficiency maps with different binning')
+        defined = (self.total > 0) & (other.total > 0) & (other.passed > 0)
+        if method=='katz':
+            return (defined, *ratio_interval(self.passed, self.total, other.passed, other.total, level=level))
+        if method is None:
+            r, err2 = divide_arrays(self.efficiency()[0], self.binomial_errors2(), other.efficiency()[0], other.binomial_errors2())
+            return defined, r, np.sqrt(err2), np.sqrt(err2)
+        raise ValueError(f"Unknown ratio interval {method!r}, expected 'katz' or None")
+
+    def map_hist(self, defined, values, err_low, err_up, name=None, title=''):
+        # TH2D of the values with symmetrized errors; cells that are not defined hold EMPTY_CELL
+        err = .5 * (err_low + err_up)
+        return hist2d_from_arrays(self.xedges, self.yedges, np.where(defined, values, EMPTY_CELL), np.where(defined, err*err, 0.),
+                name=f'eff_map_{next(_ids)}' if name is None else name, title=title)
+
+    def eff_map(self, method='clopper_pearson', level=CL_1SIGMA, name=None):
+        return self.map_hist(self.total > 0, *self.efficiency(method, level), name=name, title=self.title)
+
+    def ratio_map(self, other, method='katz', level=CL_1SIGMA, name=None):
+        return self.map_hist(*self.ratio_cells(other, method, level), name=f'eff_ratio_map_{next(_ids)}' if name is None else name)
@@ -0,0 +1,58 @@
+import numpy as np
+from root_plotting.Utils import contents_view, bin_edges
+from root_plotting.Stats import CL_1SIGMA, eff_interval
+
+class EfficiencyIndex():
+    def __init__(self, passed, total, edges):
+        # passed/total hold the in-range bins only, edges has one more entry
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.low_edges = self.edges[:-1]
+        self.cum_passed = np.concatenate(([0.], np.cumsum(passed, dtype=np.float64)))
+        self.cum_total = np.concatenate(([0.], np.cumsum(total, dtype=np.float64)))
+
+    @classmethod
+    def from_efficiency(cls, eff):
+        h_pass = eff.GetPassedHistogram()
+        h_tot = eff.GetTotalHistogram()
+        return cls(contents_view(h_pass)[1:-1], contents_view(h_tot)[1:-1], bin_edges(h_pass))
+
+    def integrate(self, int_floor, int_ceil):
+        # Sum over every bin whose low edge lies in [int_floor, int_ceil]
+        lo = np.searchsorted(self.low_edges, int_floor, side='left')
+        hi = np.maximum(np.searchsorted(self.low_edges, int_ceil, side='right'), lo)
+        return self.cum_passed[hi] - self.cum_passed[lo], self.cum_total[hi] - self.cum_total[lo]
+
+    def efficiency(self, int_floor, int_ceil, method='normal', level=CL_1SIGMA):
+        # (eff, err_low, err_up) of the integrated counts
+        num, den = self.integrate(int_floor, int_ceil)
+        return eff_interval(num, den, method=method, level=level)
+
+class EfficiencyIndex2D():
+    def __init__(self, passed, total, xedges, yedges):
+        # Summed-area tables of the in-range cells [ix, iy], with a zero first row and column
+        self.xedges = np.asarray(xedges, dtype=np.float64)
+        self.yedges = np.asarray(yedges, dtype=np.float64)
+        self.sat_passed = self.summed_area(passed)
+        self.sat_total = self.summed_area(total)
+
+    @staticmethod
+    def summed_area(cells):
+        sat = np.zeros((cells.shape[0]+1, cells.shape[1]+1))
+        sat[1:, 1:] = np.cumsum(np.cumsum(cells, axis=0, dtype=np.float64), axis=1)
+        return sat
+
+    @staticmethod
+    def bounds(low_edges, floor, ceil):
+        lo = np.searchsorted(low_edges, floor, side='left')
+        return lo, np.maximum(np.searchsorted(low_edges, ceil, side='right'), lo)
+
+    def integrate(self, x_floor, x_ceil, y_floor, y_ceil):
+        # Sum over every cell whose low edges lie in the region, four lookups per region
+        xlo, xhi = self.bounds(self.xedges[:-1], x_floor, x_ceil)
+        ylo, yhi = self.bounds(self.yedges[:-1], y_floor, y_ceil)
+        region = lambda sat: sat[xhi, yhi] - sat[xlo, yhi] - sat[xhi, ylo] + sat[xlo, ylo]
+        return region(self.sat_passed), region(self.sat_total)
+
+    def efficiency(self, x_floor, x_ceil, y_floor, y_ceil, method='normal', level=CL_1SIGMA):
+        num, den = self.integrate(x_floor, x_ceil, y_floor, y_ceil)
+        return eff_interval(num, den, method=method, level=level)
@@ -0,0 +1,101 @@
+import numpy as np
+from root_plotting.LazyROOT import gStyle, gPad
+from root_plotting.EfficiencyPlot import EfficiencyPlot
+from root_plotting.PlotBase import styled_plot
+from root_plotting.Profiler import profiled, profiled_plot
+from root_plotting.PlotSession import managed_plot
+from root_plotting.EffArrays import EffArrays2D
+
+class EfficiencyMapPlot(EfficiencyPlot):
+    # Parameters that change the drawn output; only these enter the render cache key
+    PLOT_PARAMS = EfficiencyPlot.PLOT_PARAMS + ('zrange', 'z_title', 'palette')
+
+    def __init__(self, init_params=None):
+        # Same interval settings as EfficiencyPlot; yrange is the y axis here, zrange and rrange the colour scales
+        super().__init__()
+        self.title_string = ';p_{T} [GeV];#eta'
+        self.canvas_size = (900,800)
+        self.xrange = None
+        self.yrange = None
+        self.zrange = (0.,1.)
+        self.rrange = (.5,1.5)
+        self.z_title = 'Efficiency'
+        self.palette = 57
+        if init_params: self.set_params(init_params)
+
+    def map_regions(self, a, xregion, yregion):
+        # Every cell by default, like integrate_eff
+        x_floor, x_ceil = (a.xedges[0], a.xedges[-2]) if xregion is None else xregion
+        y_floor, y_ceil = (a.yedges[0], a.yedges[-2]) if yregion is None else yregion
+        return x_floor, x_ceil, y_floor, y_ceil
+
+    def integrate_region(self, eff, xregion=None, yregion=None, show=False):
+        # Integrated efficiency over the cells whose low edges lie in xregion x yregion, formatted like integrate_eff
+        a = EffArrays2D.from_input(eff)
+        region = self.map_regions(a, xregion, yregion)
+        num_tot, den_tot = a.index().integrate(*region)
+        _, err_low, err_up = a.index().efficiency(*region, method=self.integral_interval)
+        return self.integral_result(num_tot, den_tot, err_low, err_up, show)
+
+    def integrate_regions(self, eff, x_floors, x_ceils, y_floors, y_ceils, method=None):
+        # Vectorized integrate_region over many regions, (eff, err) like integrate_effs
+        method = self.integral_interval if method is None else method
+        bounds = (np.asarray(b, dtype=np.float64) for b in (x_floors, x_ceils, y_floors, y_ceils))
+        return self.integral_arrays(*EffArrays2D.from_input(eff).index().efficiency(*bounds, method=method), method)
+
+    @profiled('ratio')
+    def eff_ratio_map(self, a1, a2):
+        return self.own(a1.ratio_map(a2, method=self.ratio_interval, name=self.unique_name('eff_ratio_map')))
+
+    def check_map_backend(self):
+        if self.array_backend() is not None: raise ValueError(f'Efficiency maps are only drawn by the ROOT backend, got {self.backend!r}')
+
+    def draw_map(self, h, title, zrange, z_title, show=False, save=False, cache_key=None):
+        c = self.createCanvas(option='hist', size=self.canvas_size)
+        c.SetRightMargin(.15)
+        gStyle.SetPalette(self.palette)
+
+        # COLZ0 draws cells with zero content; cells without a value sit below the colour scale and stay blank
+        h.Draw('COLZ0')
+        self.format_axes(h, option='map', xrange=self.xrange, yrange=self.yrange, zrange=zrange, text_size=self.text_size,
+                title_string=f'{title}{self.title_string}', z_title=z_title)
+        if self.cms_style: self.draw_cms_lumi(c)
+
+        gPad.Update()
+        c.Update()
+
+        if show: c.Draw()
+        if save: self.save_canvas(c, save, cache_key)
+        return c, h
+
+    @managed_plot
+    @profiled_plot
+    @styled_plot
+    def plotEfficiencyMap(self, eff, title=None, show=False, save=False, addIntegral=False, integralRegion=None):
+        # eff: 2D TEfficiency, EffArrays2D or (passed, total, xedges, yedges); integralRegion: ((x_floor, x_ceil), (y_floor, y_ceil))
+        self.check_map_backend()
+        a = EffArrays2D.from_input(eff)
+        hit, cache_key = self.check_render_cache('plotEfficiencyMap', [a], [title, addIntegral, integralRegion], save, show)
+        if hit: return self.cache_hit(True)
+
+        h = self.own(a.eff_map(method=self.eff_interval, name=self.unique_name('eff_map')))
+        title = a.title if title is None else title
+        if addIntegral:
+            eff_int, err = self.integrate_region(a, *(integralRegion or (None, None)))
+            title = title+f' \\ [ \epsilon = {eff_int} {self.integral_text(err)}]'
+        return self.draw_map(h, title, self.zrange, self.z_title, show=show, save=save, cache_key=cache_key)
+
+    @managed_plot
+    @profiled_plot
+    @styled_plot
+    def plotEfficiencyRatioMap(self, eff_1, eff_2, title=None, show=False, save=False):
+        # Per-cell eff_1/eff_2 with ratio_interval errors; cells without a defined ratio are left blank
+        self.check_map_backend()
+        a1 = EffArrays2D.from_input(eff_1)
+        a2 = EffArrays2D.from_input(eff_2)
+        hit, cache_key = self.check_render_cache('plotEfficiencyRatioMap', [a1, a2], [title], save, show)
+        if hit: return self.cache_hit(True)
+
+        r = self.eff_ratio_map(a1, a2)
+        title = f'{a1.title} / {a2.title}' if title is None else title
+        return self.draw_map(r, title, self.rrange, 'Ratio', show=show, save=save, cache_key=cache_key)
@@ -1,10 +1,18 @@
+import weakref
 import numpy as np
-from ROOT import gStyle, gPad, TLegend, TEfficiency
-from root_plotting.PlotBase import PlotBase
+from root_plotting.LazyROOT import gPad, TLegend
+from root_plotting.PlotBase import PlotBase, styled_plot
+from root_plotting.Profiler import profiled, profiled_plot
+from root_plotting.PlotSession import managed_plot
+from root_plotting.EfficiencyIndex import EfficiencyIndex
+from root_plotting.EffArrays import EffArrays
 
 class EfficiencyPlot(PlotBase):
+    # Parameters that change the drawn output; only these enter the render cache key
+    PLOT_PARAMS = ('color1', 'color2', 'title_string', 'canvas_size', 'xrange', 'yrange', 'rrange', 'text_size', 'leg_pos', 'cms_style',
+            'backend', 'eff_interval', 'ratio_interval', 'integral_interval')
+
     def __init__(self, init_params=None):
-        gStyle.SetOptStat(0)
         self.color1 = 'black'
         self.color2 = 'orange'
         self.title_string = ';p_{T} [GeV];Efficiency'
@@ -14,70 +22,132 @@ class EfficiencyPlot(PlotBase):
         self.rrange = (.5,2)
         self.text_size='med'
         self.leg_pos = 'upper_right'
+        self.cms_style = False
+        self.render_cache = None
+        self.profiler = None
+        self.session = None
+        self.save_formats = None
+        self.writer = None
+        self.backend = 'root'
+        self.eff_interval = 'clopper_pearson'
+        self.ratio_interval = None
+        self.integral_interval = 'normal'
+        self._eff_indices = {}
         if init_params: self.set_params(init_params)
 
     def set_params(self, params):
         for key in params:
             setattr(self, key, params[key])
     
+    @profiled('ratio')
     def eff_ratio(self, eff_1, eff_2):
-        hnew1 = eff_1.GetCopyPassedHisto()
-        hnew2 = eff_1.GetCopyTotalHisto()
-        hnew3 = eff_2.GetCopyPassedHisto()
-        hnew4 = eff_2.GetCopyTotalHisto()
-        hnew1.Divide(hnew1, hnew2, c1=1., c2=1., option='B')
-        hnew3.Divide(hnew3, hnew4, c1=1., c2=1., option='B')
-        hnew1.Divide(hnew3)
-        return hnew1
+        # None (the default) gives the binomially propagated TH1D, 'katz' a TGraphAsymmErrors with log-ratio intervals
+        a1, a2 = EffArrays.from_input(eff_1), EffArrays.from_input(eff_2)
+        if self.ratio_interval=='katz': return self.own(a1.ratio_graph(a2, name=self.unique_name('eff_ratio')))
+        if self.ratio_interval is None: return self.own(a1.ratio(a2, name=self.unique_name('eff_ratio')))
+        raise ValueError(f"Unknown ratio_interval {self.ratio_interval!r}, expected 'katz' or None")
+
+    def eff_index(self, eff):
+        if isinstance(eff, EffArrays): return eff.index()
+        # Cached prefix sums per TEfficiency, held without keeping it alive; rebuilt when its entries change or after invalidate()
+        state = (eff.GetPassedHistogram().GetEntries(), eff.GetTotalHistogram().GetEntries())
+        cached = self._eff_indices.get(id(eff))
+        if cached is not None and cached[0]() is eff and cached[1]==state: return cached[2]
+        index = EfficiencyIndex.from_efficiency(eff)
+        try:
+            ref = weakref.ref(eff, lambda _, key=id(eff), indices=self._eff_indices: indices.pop(key, None))
+        except TypeError:
+            # Objects without weak reference support are not cached
+            return index
+        self._eff_indices[id(eff)] = (ref, state, index)
+        return index
+
+    def invalidate(self, eff=None):
+        # Drops the cached index of eff, or every cached index; needed after bins are refilled without changing the entry counts
+        if eff is None: self._eff_indices.clear()
+        else: self._eff_indices.pop(id(eff), None)
 
     def integrate_eff(self, eff_1, int_floor=2., int_ceil=99999., show=False):
-        hnew_pass = eff_1.GetCopyPassedHisto()
-        hnew_tot = eff_1.GetCopyTotalHisto()
-
-        num_tot = 0
-        den_tot = 0
-        nbins = hnew_pass.GetNbinsX() - 1
-        for i in range(nbins):
-            if hnew_pass.GetBinLowEdge(i) < int_floor or hnew_pass.GetBinLowEdge(i) > int_ceil: continue
-            num_tot += hnew_pass.GetBinContent(i)
-            den_tot += hnew_tot.GetBinContent(i)
-
-        eff = num_tot/den_tot if den_tot else print(num_tot)
-        eff = round(eff,3) if num_tot and den_tot else 0.
-        err = 0. if eff==0. else '{:0.2e}'.format(np.sqrt((eff*(1-eff))/den_tot),5)
-        if show: print(f'Integrated Eff = {num_tot} / {den_tot} = {eff} \pm {err}')
+        # err is a formatted string, or a (low, up) pair of strings for asymmetric intervals
+        index = self.eff_index(eff_1)
+        num_tot, den_tot = index.integrate(int_floor, int_ceil)
+        _, err_low, err_up = index.efficiency(int_floor, int_ceil, method=self.integral_interval)
+        return self.integral_result(num_tot, den_tot, err_low, err_up, show)
+
+    def integral_result(self, num_tot, den_tot, err_low, err_up, show=False):
+        eff = round(num_tot/den_tot,3) if num_tot and den_tot else 0.
+        if eff==0.: err = 0.
+        elif self.integral_interval=='normal': err = '{:0.2e}'.format(err_up)
+        else: err = ('{:0.2e}'.format(err_low), '{:0.2e}'.format(err_up))
+        if show: print(f'Integrated Eff = {num_tot} / {den_tot} = {eff} {self.integral_text(err)}')
         return eff, err
 
+    def integrals(self, a1, a2, integralRange=None):
+        # integrate_eff of both inputs over integralRange, by default every bin
+        if integralRange: 
+            int_floor, int_ceil = integralRange
+        else:
+            int_floor = a1.edges[0]
+            int_ceil = a1.edges[-2]
+        return self.integrate_eff(a1, int_floor=int_floor, int_ceil=int_ceil), self.integrate_eff(a2, int_floor=int_floor, int_ceil=int_ceil)
+
+    def load_range(self, addIntegral, integralRange):
+        # Stored efficiencies are read over xrange, widened to cover the integral (every bin by default)
+        if not addIntegral or self.xrange is None: return self.xrange
+        if integralRange is None: return None
+        return (min(self.xrange[0], integralRange[0]), max(self.xrange[1], integralRange[1]))
+
+    def integral_text(self, err):
+        return f'^{{+{err[1]}}}_{{-{err[0]}}}' if isinstance(err, tuple) else f'\\pm {err}'
+
+    def integral_arrays(self, eff, err_low, err_up, method):
+        # (eff, err) like integrate_eff: err is one array for 'normal', an (err_low, err_up) pair for asymmetric intervals
+        return eff, (err_up if method=='normal' else (err_low, err_up))
+
+    def integrate_effs(self, eff_1, int_floors, int_ceils, method=None):
+        # Vectorized integrate_eff over many ranges
+        method = self.integral_interval if method is None else method
+        eff, err_low, err_up = self.eff_index(eff_1).efficiency(np.asarray(int_floors, dtype=np.float64), np.asarray(int_ceils, dtype=np.float64), method=method)
+        return self.integral_arrays(eff, err_low, err_up, method)
+
+    def threshold_scan(self, eff_1, thresholds, int_ceil=np.inf, method=None):
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        return self.integrate_effs(eff_1, thresholds, np.full_like(thresholds, int_ceil), method=method)
+
     # Core function for plot generation
+    @managed_plot
+    @profiled_plot
+    @styled_plot
     def plotEfficiencies(self, h1, h2, ratio=True, h1_title=None, h2_title=None, save=False, addIntegral=False, integralRange=None):
-        # Construct plot objects
-        h1_pass = h1.GetCopyPassedHisto()
-        h1_tot = h1.GetCopyTotalHisto()
-        h2_pass = h2.GetCopyPassedHisto()
-        h2_tot = h2.GetCopyTotalHisto()
+        h1, h2 = self.read_inputs([h1, h2], xrange=self.load_range(addIntegral, integralRange))
+        hit, cache_key = self.check_render_cache('plotEfficiencies', [h1, h2], [ratio, h1_title, h2_title, addIntegral, integralRange], save)
+        if hit: return self.cache_hit()
+
+        # Construct plot objects, inputs can be TEfficiency, EffArrays or (passed, total, edges) arrays
+        a1 = EffArrays.from_input(h1)
+        a2 = EffArrays.from_input(h2)
+        integrals = self.integrals(a1, a2, integralRange) if addIntegral else None
+
+        backend = self.array_backend()
+        if backend is not None:
+            return backend.plot_efficiencies(self, [a1, a2], [dict(line_color=self.color1), dict(line_color=self.color2)],
+                    titles=[h1_title, h2_title], integrals=integrals, ratio=ratio, save=save, cache_key=cache_key)
 
-        eff1 = TEfficiency(h1_pass, h1_tot)
-        eff2 = TEfficiency(h2_pass, h2_tot)
-        self.format_entry(eff1, line_color=self.color1, title=h1_title)
-        self.format_entry(eff2, line_color=self.color2, title=h2_title)
+        eff1 = self.own(a1.graph(method=self.eff_interval, name=self.unique_name('eff')))
+        eff2 = self.own(a2.graph(method=self.eff_interval, name=self.unique_name('eff')))
+        self.format_entries([eff1, eff2], [dict(line_color=self.color1), dict(line_color=self.color2)], titles=[h1_title, h2_title])
 
 
         # Legend object
-        leg = TLegend(0, 0, .5, .5)
+        leg = self.own(TLegend(0, 0, .5, .5))
         entry1 = f'{eff1.GetTitle()}'
         entry2 = f'{eff2.GetTitle()}'
 
         # Efficiency integral
         if addIntegral:
-            if integralRange: 
-                int_floor, int_ceil = integralRange
-            else:
-                int_floor = h1_pass.GetBinLowEdge(1)
-                int_ceil = h1_pass.GetBinLowEdge(h1_pass.GetNbinsX())
-            eff1_int = self.integrate_eff(eff1, int_floor=int_floor, int_ceil=int_ceil)
-            eff2_int = self.integrate_eff(eff2, int_floor=int_floor, int_ceil=int_ceil)
-            entry1 = entry1+f' \\ [ \epsilon = {eff1_int[0]} \pm {eff1_int[1]}]'
-            entry2 = entry2+f' \\ [ \epsilon = {eff2_int[0]} \pm {eff2_int[1]}]'
+            eff1_int, eff2_int = integrals
+            entry1 = entry1+f' \\ [ \epsilon = {eff1_int[0]} {self.integral_text(eff1_int[1])}]'
+            entry2 = entry2+f' \\ [ \epsilon = {eff2_int[0]} {self.integral_text(eff2_int[1])}]'
 
         leg.AddEntry(eff1, entry1, 'le')
         leg.AddEntry(eff2, entry2, 'le')
@@ -92,9 +162,10 @@ class EfficiencyPlot(PlotBase):
             # Primary plot
             eff1.SetTitle(self.title_string)
             eff2.SetTitle(self.title_string)
-            eff1.Draw()
+            eff1.Draw('AP')
             self.format_axes(eff1, option='upper', xrange=self.xrange, yrange=self.yrange, text_size=self.text_size)
-            eff2.Draw('SAME E')
+            eff2.Draw('P')
+            if self.cms_style: self.draw_cms_lumi(p1)
 
             # Legend
             leg.Draw()
@@ -105,8 +176,8 @@ class EfficiencyPlot(PlotBase):
             p2.cd()
 
             # Efficiency ratio
-            r = self.eff_ratio(eff1, eff2)
-            r.Draw()
+            r = self.eff_ratio(a1, a2)
+            r.Draw('AP' if r.InheritsFrom('TGraph') else '')
             self.format_entry(r)
             self.format_axes(r, option='lower', xrange=self.xrange, yrange=self.rrange, text_size=self.text_size)
 
@@ -121,9 +192,10 @@ class EfficiencyPlot(PlotBase):
             c = self.createCanvas(option='hist', size=self.canvas_size)
 
             # Primary plot
-            eff1.Draw()
+            eff1.Draw('AP')
             self.format_axes(eff1, option='full', xrange=self.xrange, yrange=self.yrange, text_size=self.text_size)
-            eff2.Draw('SAME')
+            eff2.Draw('P')
+            if self.cms_style: self.draw_cms_lumi(c)
 
             # Legend
             self.format_legend(leg, option='full', pos=self.leg_pos)
@@ -132,4 +204,4 @@ class EfficiencyPlot(PlotBase):
             gPad.Update()
             c.Update()
         
-        if save: c.SaveAs(save)
\ No newline at end of file
+        if save: self.save_canvas(c, save, cache_key)
\ No newline at end of file
@@ -0,0 +1,184 @@
+import os
+import glob
+import itertools
+import collections
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+
+_ids = itertools.count()
+
+class FilePool():
+    def __init__(self, max_open=64):
+        # Least recently used TFile handles are closed once max_open files are open
+        self.max_open = max_open
+        self.files = collections.OrderedDict()
+
+    def get(self, path):
+        from ROOT import TFile
+        if path in self.files:
+            self.files.move_to_end(path)
+            return self.files[path]
+        f = TFile.Open(path)
+        if not f or f.IsZombie(): raise IOError(f'Cannot open {path}')
+        self.files[path] = f
+        while len(self.files) > self.max_open: self.files.popitem(last=False)[1].Close()
+        return f
+
+    def close(self):
+        while self.files: self.files.popitem()[1].Close()
+
+def hist_to_arrays(hist):
+    # Copies of every cell (under/overflow included) in the layout Utils.hist_from_arrays(flow=True) expects
+    from root_plotting.Utils import hist_arrays
+    contents, sumw2, edges = hist_arrays(hist)
+    return {
+        'edges'    : np.array(edges, dtype=np.float64),
+        'contents' : np.array(contents, dtype=np.float64),
+        'sumw2'    : np.array(sumw2, dtype=np.float64),
+        'name'     : hist.GetName(),
+        'title'    : hist.GetTitle(),
+        'flow'     : True,
+    }
+
+def detach(obj):
+    # Out of its file's directory and owned by Python, so closing the pooled TFile neither deletes nor leaks it
+    if hasattr(obj, 'SetDirectory'): obj.SetDirectory(0)
+    import ROOT
+    ROOT.SetOwnership(obj, True)
+    return obj
+
+def read_objects(pool, path, obj_paths, as_arrays=False):
+    f = pool.get(path)
+    out = {}
+    for obj_path in obj_paths:
+        obj = f.Get(obj_path)
+        if not obj: raise KeyError(f'{obj_path} not found in {path}')
+        out[obj_path] = hist_to_arrays(obj) if as_arrays else detach(obj)
+    return out
+
+def merge_arrays(total, arrays, source=''):
+    # Vectorized sum of one histogram into a running total
+    if total is None: return arrays
+    if total['edges'].shape != arrays['edges'].shape or not np.allclose(total['edges'], arrays['edges']):
+        raise ValueError(f"Cannot merge {arrays['name']} from {source}: different binning")
+    total['contents'] += arrays['contents']
+    total['sumw2'] += arrays['sumw2']
+    return total
+
+def merge_files(pool, paths, obj_paths):
+    totals = dict.fromkeys(obj_paths)
+    for path in paths:
+        for obj_path, arrays in read_objects(pool, path, obj_paths, as_arrays=True).items():
+            totals[obj_path] = merge_arrays(totals[obj_path], arrays, source=path)
+    return totals
+
+# Worker process state
+_worker_files = None
+
+def init_loader(max_open):
+    global _worker_files
+    from ROOT import gROOT, TH1
+    gROOT.SetBatch(True)
+    TH1.AddDirectory(False)
+    _worker_files = FilePool(max_open)
+
+def worker_read(path, obj_paths, as_arrays):
+    return path, read_objects(_worker_files, path, obj_paths, as_arrays)
+
+def worker_merge(paths, obj_paths):
+    return merge_files(_worker_files, paths, obj_paths)
+
+class HistLoader():
+    def __init__(self, max_open=64, workers=None, chunk_files=8, start_method='spawn'):
+        # workers=1 reads in this process; otherwise a pool of reader processes is started on first use
+        self.max_open = max_open
+        self.workers = workers or os.cpu_count()
+        self.chunk_files = chunk_files
+        self.start_method = start_method
+        self.files = FilePool(max_open)
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _pool(self):
+        if self.pool is None:
+            ctx = mp.get_context(self.start_method)
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx, initializer=init_loader, initargs=(self.max_open,))
+        return self.pool
+
+    def completed(self, fn, tasks):
+        # Results in completion order with at most 2*workers tasks in flight, so finished results never pile up
+        pool = self._pool()
+        pending = set()
+        for args in tasks:
+            pending.add(pool.submit(fn, *args))
+            if len(pending) < 2*self.workers: continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done: yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done: yield future.result()
+
+    def expand(self, patterns):
+        patterns = [patterns] if isinstance(patterns, str) else patterns
+        paths = []
+        for pattern in patterns:
+            matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+            if not matches: raise IOError(f'No files match {pattern}')
+            paths.extend(matches)
+        return paths
+
+    def get(self, path, obj_path, as_arrays=False):
+        return read_objects(self.files, path, [obj_path], as_arrays)[obj_path]
+
+    def load(self, requests, as_arrays=False):
+        # requests: [(file or glob, object path)] -> {(file, object path): detached histogram or arrays}
+        by_file = collections.OrderedDict()
+        for pattern, obj_path in requests:
+            for path in self.expand(pattern): by_file.setdefault(path, []).append(obj_path)
+
+        out = {}
+        if self.workers==1:
+            for path, obj_paths in by_file.items():
+                for obj_path, obj in read_objects(self.files, path, obj_paths, as_arrays).items(): out[(path, obj_path)] = obj
+            return out
+
+        for path, objs in self.completed(worker_read, ((path, obj_paths, as_arrays) for path, obj_paths in by_file.items())):
+            for obj_path, obj in objs.items():
+                out[(path, obj_path)] = obj if as_arrays else detach(obj)
+        return out
+
+    def merge(self, patterns, obj_paths, as_arrays=False):
+        # Sums each object path over all matching files; workers return partial sums over chunks of
+        # chunk_files files, so memory stays at a few histograms per worker
+        single = isinstance(obj_paths, str)
+        obj_paths = [obj_paths] if single else list(obj_paths)
+        paths = self.expand(patterns)
+        chunks = [paths[i:i+self.chunk_files] for i in range(0, len(paths), self.chunk_files)]
+
+        totals = dict.fromkeys(obj_paths)
+        if self.workers==1:
+            for chunk in chunks:
+                for obj_path, arrays in merge_files(self.files, chunk, obj_paths).items(): totals[obj_path] = merge_arrays(totals[obj_path], arrays)
+        else:
+            # Each partial sum is folded in as soon as its chunk finishes
+            for partial in self.completed(worker_merge, ((chunk, obj_paths) for chunk in chunks)):
+                for obj_path, arrays in partial.items(): totals[obj_path] = merge_arrays(totals[obj_path], arrays)
+
+        if not as_arrays:
+            from root_plotting.Utils import hist_from_arrays
+            for obj_path, arrays in totals.items():
+                totals[obj_path] = detach(hist_from_arrays(**dict(arrays, name=f"{arrays['name']}_merged{next(_ids)}")))
+        return totals[obj_paths[0]] if single else totals
+
+    def close(self):
+        self.files.close()
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
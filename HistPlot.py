@@ -1,11 +1,15 @@
-import numpy as np
-from ROOT import gROOT, gStyle, gPad, TLegend
-from root_plotting.PlotBase import PlotBase
-from root_plotting.Utils import clone
+from root_plotting.LazyROOT import gPad, TLegend
+from root_plotting.PlotBase import PlotBase, styled_plot
+from root_plotting.Profiler import profiled, profiled_plot
+from root_plotting.PlotSession import managed_plot
+from root_plotting.Utils import ratio
 
 class HistPlot(PlotBase):
+    # Parameters that change the drawn output; only these enter the render cache key
+    PLOT_PARAMS = ('color1', 'color2', 'title_string', 'canvas_size', 'xrange', 'yrange', 'rrange', 'text_size', 'leg_pos', 'cms_style',
+            'leg_scale', 'legtext_size', 'lod_pixels', 'backend')
+
     def __init__(self, init_params=None):
-        gStyle.SetOptStat(0)
         self.color1 = 'black'
         self.color2 = 'orange'
         self.title_string = None
@@ -15,28 +19,47 @@ class HistPlot(PlotBase):
         self.rrange = (.5,2)
         self.text_size='med'
         self.leg_pos = 'upper_right'
+        self.cms_style = False
         self.leg_scale = None
         self.legtext_size='med'
+        self.lod_pixels = 1
+        self.backend = 'root'
+        self.render_cache = None
+        self.profiler = None
+        self.session = None
+        self.save_formats = None
+        self.writer = None
         if init_params: self.set_params(init_params)
 
     def set_params(self, params):
         for key in params:
             setattr(self, key, params[key])
     
+    @profiled('ratio')
     def hist_ratio(self, h_1, h_2):
-        r = clone(h_1)
-        # r.Divide(r, h_2, c1=1., c2=1., option='B')
-        r.Divide(h_2)
-        return r
+        return self.own(ratio(h_1, h_2, name=self.unique_name(f'{h_1.GetName()}_ratio')))
 
     # Core functions for plot generation
+    @managed_plot
+    @profiled_plot
+    @styled_plot
     def plotHist(self, h, h_title=None, add_legend=False, show=False, save=False):
+        h, = self.read_inputs([h])
+        hit, cache_key = self.check_render_cache('plotHist', [h], [h_title, add_legend], save, show)
+        if hit: return self.cache_hit()
+
+        backend = self.array_backend()
+        if backend is not None:
+            return backend.plot_hists(self, [h], [dict(line_color=self.color1)], titles=[h_title], legend=add_legend, show=show, save=save, cache_key=cache_key)
+
         # Construct plot objects
+        h = self.input_hist(h)
         self.format_entry(h, line_color=self.color1, title=None)
+        h, band = self.lod_hist(h)
 
         # Legend object
         if add_legend:
-            leg = TLegend(0, 0, .5, .5)
+            leg = self.own(TLegend(0, 0, .5, .5))
             entry1 = f'{h.GetTitle()}' if h_title is None else h_title
             leg.AddEntry(h, entry1, 'le')
 
@@ -45,6 +68,8 @@ class HistPlot(PlotBase):
         # Primary plot
         h.Draw('E')
         self.format_axes(h, option='full', xrange=self.xrange, yrange=self.yrange, text_size=self.text_size)
+        self.draw_envelope(band, h)
+        if self.cms_style: self.draw_cms_lumi(c)
 
         # Legend
         if add_legend:
@@ -55,16 +80,30 @@ class HistPlot(PlotBase):
         c.Update()
     
         if show: c.Draw()
-        if save: c.SaveAs(save)
+        if save: self.save_canvas(c, save, cache_key)
         return c
 
+    @managed_plot
+    @profiled_plot
+    @styled_plot
     def plotHists(self, h1, h2, ratio=False, h1_title=None, h2_title=None, show=False, save=False):
+        h1, h2 = self.read_inputs([h1, h2])
+        hit, cache_key = self.check_render_cache('plotHists', [h1, h2], [ratio, h1_title, h2_title], save, show)
+        if hit: return self.cache_hit(ratio)
+
+        styles = [dict(line_color=self.color1), dict(line_color=self.color2)]
+        backend = self.array_backend()
+        if backend is not None:
+            return backend.plot_hists(self, [h1, h2], styles, titles=[h1_title, h2_title], ratio=ratio, show=show, save=save, cache_key=cache_key)
+
         # Construct plot objects
-        self.format_entry(h1, line_color=self.color1, title=None)
-        self.format_entry(h2, line_color=self.color2, title=None)
+        h1, h2 = self.input_hist(h1), self.input_hist(h2)
+        self.format_entries([h1, h2], styles)
+        h1, band1 = self.lod_hist(h1)
+        h2, band2 = self.lod_hist(h2)
 
         # Legend object
-        leg = TLegend(0, 0, .5, .5)
+        leg = self.own(TLegend(0, 0, .5, .5))
         entry1 = f'{h1.GetTitle()}' if h1_title is None else h1_title
         entry2 = f'{h2.GetTitle()}' if h2_title is None else h2_title
         leg.AddEntry(h1, entry1, 'le')
@@ -74,12 +113,6 @@ class HistPlot(PlotBase):
         if ratio:
             c, p1, p2 = self.createCanvas(option='ratio', size=self.canvas_size)
 
-            # TODO Fix CMS Style
-            cms_style = False
-            if cms_style:
-                gROOT.ProcessLine("setTDRStyle();")
-                gROOT.ProcessLine("CMS_lumi(c);")
-
             ## Top Panel
             p1.cd()
 
@@ -87,6 +120,9 @@ class HistPlot(PlotBase):
             h1.Draw('E')
             self.format_axes(h1, option='upper', xrange=self.xrange, yrange=self.yrange, text_size=self.text_size, title_string=self.title_string)
             h2.Draw('SAME E')
+            self.draw_envelope(band1, h1)
+            self.draw_envelope(band2, h2)
+            if self.cms_style: self.draw_cms_lumi(p1)
 
             # Legend
             leg.Draw()
@@ -110,7 +146,7 @@ class HistPlot(PlotBase):
             c.Update()
 
             if show: c.Draw()
-            if save: c.SaveAs(save)
+            if save: self.save_canvas(c, save, cache_key)
             return c, r
 
         # No ratio panel
@@ -121,6 +157,9 @@ class HistPlot(PlotBase):
             h1.Draw('E')
             self.format_axes(h1, option='full', xrange=self.xrange, yrange=self.yrange, text_size=self.text_size)
             h2.Draw('SAME E')
+            self.draw_envelope(band1, h1)
+            self.draw_envelope(band2, h2)
+            if self.cms_style: self.draw_cms_lumi(c)
 
             # Legend
             self.format_legend(leg, option='full', pos=self.leg_pos, scale=self.leg_scale, legtext_size=self.legtext_size)
@@ -130,5 +169,5 @@ class HistPlot(PlotBase):
             c.Update()
         
             if show: c.Draw()
-            if save: c.SaveAs(save)
+            if save: self.save_canvas(c, save, cache_key)
             return c
\ No newline at end of file
@@ -0,0 +1,162 @@
+import os
+import json
+import collections
+import numpy as np
+from root_plotting.Utils import hist_input, hist_from_arrays, xrange_bins
+from root_plotting.EffArrays import EffArrays
+
+# A store is a directory holding index.json and one flat little-endian float64 file per column.
+# Every entry records its bin count, the offset of its edges and the offset of its cells in each of its columns
+INDEX = 'index.json'
+DTYPE = np.dtype('<f8')
+COLUMNS = {
+    'hist' : ('contents', 'sumw2'),
+    'eff'  : ('passed', 'total', 'passed_w2', 'total_w2'),
+}
+
+def column_path(path, column):
+    return os.path.join(path, f'{column}.f8')
+
+def is_efficiency(obj):
+    return isinstance(obj, EffArrays) or (hasattr(obj, 'InheritsFrom') and obj.InheritsFrom('TEfficiency'))
+
+class StoreEntry(collections.namedtuple('StoreEntry', 'store name')):
+    # Handle accepted by the plotters in place of a histogram or efficiency, read when the plot is made
+    __slots__ = ()
+
+    def load(self, xrange=None):
+        return self.store.arrays(self.name, xrange)
+
+class HistStoreWriter():
+    def __init__(self, path, append=False):
+        # Columns are written as entries are added; the index is written on close()
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.index = HistStore.read_index(path) if append and os.path.exists(os.path.join(path, INDEX)) else {}
+        mode = 'ab' if self.index else 'wb'
+        self.files = {col : open(column_path(path, col), mode) for col in ('edges',) + COLUMNS['hist'] + COLUMNS['eff']}
+        self.sizes = {col : f.tell() // DTYPE.itemsize for col, f in self.files.items()}
+        self._edges = {}
+
+    def _write(self, column, array):
+        offset = self.sizes[column]
+        data = np.ascontiguousarray(array, dtype=DTYPE)
+        self.files[column].write(data.tobytes())
+        self.sizes[column] += len(data)
+        return offset
+
+    def _write_edges(self, edges):
+        # Histograms with the same binning share one copy of the edges
+        key = edges.tobytes()
+        if key not in self._edges: self._edges[key] = self._write('edges', edges)
+        return self._edges[key]
+
+    def add(self, name, obj, kind=None):
+        # obj: a TH1 or array input (see Utils.hist_input), or a TEfficiency / EffArrays / (passed, total, edges) with kind='eff'
+        if name in self.index: raise KeyError(f'{name!r} is already in the store')
+        kind = kind or ('eff' if is_efficiency(obj) else 'hist')
+        if kind=='eff':
+            a = EffArrays.from_input(obj)
+            edges, title, entries = a.edges, a.title, float(np.sum(a.total))
+            cells = {'passed' : a.passed, 'total' : a.total, 'passed_w2' : a.passed_w2, 'total_w2' : a.total_w2}
+        elif kind=='hist':
+            edges, contents, sumw2, title = hist_input(obj)
+            entries = obj.GetEntries() if hasattr(obj, 'GetEntries') else float(contents.sum())
+            cells = {'contents' : contents, 'sumw2' : sumw2}
+        else:
+            raise ValueError(f"Unknown kind {kind!r}, expected 'hist' or 'eff'")
+        edges = np.asarray(edges, dtype=DTYPE)
+        self.index[name] = {
+            'kind'    : kind,
+            'title'   : title,
+            'entries' : entries,
+            'nbins'   : len(edges)-1,
+            'edges'   : self._write_edges(edges),
+            'cells'   : {col : self._write(col, cells[col]) for col in COLUMNS[kind]},
+        }
+
+    def close(self):
+        for f in self.files.values(): f.close()
+        tmp = os.path.join(self.path, INDEX + '.tmp')
+        with open(tmp, 'w') as f: json.dump(self.index, f)
+        os.replace(tmp, os.path.join(self.path, INDEX))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class HistStore():
+    def __init__(self, path):
+        # Columns are memory-mapped on first use, so reading an entry only touches the pages of its bins
+        self.path = path
+        self.index = self.read_index(path)
+        self._columns = {}
+
+    @staticmethod
+    def read_index(path):
+        with open(os.path.join(path, INDEX)) as f: return json.load(f)
+
+    @staticmethod
+    def write(path, items, append=False):
+        # items: {name: obj} or [(name, obj)]
+        with HistStoreWriter(path, append=append) as writer:
+            for name, obj in (items.items() if isinstance(items, dict) else items): writer.add(name, obj)
+
+    def column(self, name):
+        if name not in self._columns:
+            path = column_path(self.path, name)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            self._columns[name] = np.memmap(path, dtype=DTYPE, mode='r') if size else np.zeros(0, dtype=DTYPE)
+        return self._columns[name]
+
+    def close(self):
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __getitem__(self, name):
+        self.entry(name)
+        return StoreEntry(self, name)
+
+    def names(self, kind=None):
+        return [name for name, e in self.index.items() if kind is None or e['kind']==kind]
+
+    def entry(self, name):
+        try:
+            return self.index[name]
+        except KeyError:
+            raise KeyError(f'{name!r} is not in the histogram store {self.path}') from None
+
+    def arrays(self, name, xrange=None):
+        # Only the bins overlapping xrange are read. Histograms come back as hist_input dicts
+        # ('edges', 'contents', 'sumw2', 'title', 'name', 'entries'), efficiencies as EffArrays arguments
+        e = self.entry(name)
+        n = e['nbins']
+        edges = self.column('edges')[e['edges']:e['edges']+n+1]
+        sel = xrange_bins(edges, xrange)
+        out = {col : self.column(col)[off+sel.start:off+sel.stop] for col, off in e['cells'].items()}
+        out['edges'] = edges[sel.start:sel.stop+1]
+        out['title'] = e['title']
+        if e['kind']=='hist': out.update(name=name, entries=e['entries'])
+        return out
+
+    def hist(self, name, xrange=None, hist_name=None):
+        a = self.arrays(name, xrange)
+        if 'contents' not in a: raise ValueError(f'{name!r} is an efficiency, use efficiency()')
+        h = hist_from_arrays(a['edges'], a['contents'], a['sumw2'], name=name if hist_name is None else hist_name, title=a['title'])
+        h.SetEntries(a['entries'])
+        return h
+
+    def efficiency(self, name, xrange=None):
+        a = self.arrays(name, xrange)
+        if 'passed' not in a: raise ValueError(f'{name!r} is a histogram, use hist()')
+        return EffArrays(**a)
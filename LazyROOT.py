@@ -0,0 +1,29 @@
+# `from root_plotting.LazyROOT import gPad, TH1D` binds stand-ins that import ROOT on first use,
+# so the package (and the matplotlib backend) can be imported without starting ROOT
+
+class LazyName():
+    __slots__ = ('_name',)
+
+    def __init__(self, name):
+        object.__setattr__(self, '_name', name)
+
+    def resolve(self):
+        import ROOT
+        return getattr(ROOT, self._name)
+
+    def __getattr__(self, attr):
+        # Looked up on every access, so globals like gPad always follow the current pad
+        return getattr(self.resolve(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.resolve(), attr, value)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<lazy ROOT.{self._name}>'
+
+def __getattr__(name):
+    if name.startswith('__'): raise AttributeError(name)
+    return LazyName(name)
@@ -0,0 +1,94 @@
+import numpy as np
+from root_plotting.Utils import LOD_OVERSAMPLE, clone, bin_edges, hist_arrays, set_hist_arrays, divide_arrays, lod_groups, lod_arrays, xrange_bins, _buffer_view
+
+class LivePlot():
+    def __init__(self, plotter, hists, ratio=False, titles=None):
+        # Draws the layout once through plotter.plotHists (a MultiHistPlot) and keeps every object it made;
+        # update() then refills contents, ratios and the y-range in place and repaints
+        if plotter.array_backend() is not None: raise ValueError(f'LivePlot refills ROOT objects in place and needs the ROOT backend, got {plotter.backend!r}')
+        self.plotter = plotter
+        hists = [plotter.input_hist(h) for h in plotter.read_inputs(hists)]
+        self.hists = [clone(h, name=plotter.unique_name(f'{h.GetName()}_live')) for h in hists]
+        self.edges = np.array(bin_edges(self.hists[0]))
+        self.auto_yrange = plotter.yrange is None
+        self.groups = None if getattr(plotter, 'lod_pixels', None) is None else lod_groups(self.edges, plotter.lod_max_bins(), plotter.xrange, LOD_OVERSAMPLE)
+        plotter.plotHists(self.hists, ratio=ratio, titles=titles)
+        self.drawn = plotter._drawn
+        self.updates = 0
+
+    @property
+    def canvas(self):
+        return self.drawn['canvas']
+
+    def _cells(self, new):
+        # TH1, (contents, sumw2) or contents; arrays cover the in-range bins or every cell
+        if hasattr(new, 'GetNcells'):
+            contents, sumw2, _ = hist_arrays(new)
+            return np.array(contents, dtype=np.float64), np.array(sumw2, dtype=np.float64), new.GetEntries()
+        contents, sumw2 = new if isinstance(new, tuple) else (new, None)
+        contents = np.asarray(contents, dtype=np.float64)
+        ncells = len(self.edges)+1
+        if len(contents) not in (ncells, ncells-2): raise ValueError(f'Expected {ncells-2} bins or {ncells} cells, got {len(contents)}')
+        inner = slice(None) if len(contents)==ncells else slice(1, -1)
+        cells = np.zeros(ncells)
+        cells_w2 = np.zeros(ncells)
+        cells[inner] = contents
+        cells_w2[inner] = np.abs(contents) if sumw2 is None else sumw2
+        return cells, cells_w2, contents.sum()
+
+    def _display(self, i, contents, sumw2):
+        # Refills the drawn histogram (the level-of-detail copy if one was drawn) and its envelope band
+        disp = self.drawn['hists'][i]
+        band = self.drawn['bands'][i]
+        if band is None or self.groups is None:
+            if disp is not self.hists[i]: set_hist_arrays(disp, contents, sumw2)
+            return contents[1:-1], sumw2[1:-1], contents[1:-1], contents[1:-1]
+        starts, stop = self.groups
+        mean, err2, low, high = lod_arrays(contents, sumw2, self.edges, starts, stop)
+        set_hist_arrays(disp, np.concatenate(([0.], mean, [0.])), np.concatenate(([0.], err2, [0.])))
+        n = band.GetN()
+        _buffer_view(band.GetY(), n, np.float64)[:] = .5 * (high + low)
+        _buffer_view(band.GetEYlow(), n, np.float64)[:] = .5 * (high - low)
+        _buffer_view(band.GetEYhigh(), n, np.float64)[:] = .5 * (high - low)
+        return mean, err2, low, high
+
+    def update(self, inputs, repaint=True):
+        if len(inputs) != len(self.hists): raise ValueError(f'LivePlot holds {len(self.hists)} histograms, got {len(inputs)} inputs')
+        norm = self.plotter.norm
+        shown = []
+        for i, (h, new) in enumerate(zip(self.hists, inputs)):
+            contents, sumw2, entries = self._cells(new)
+            total = contents[1:-1].sum()
+            if norm is not None and total:
+                contents *= norm/total
+                sumw2 *= (norm/total)**2
+            set_hist_arrays(h, contents, sumw2, entries=entries)
+            shown.append(self._display(i, contents, sumw2))
+
+        # Ratios to the first histogram, on whatever binning is drawn, in one pass over the stacked contents
+        if self.drawn['ratios']:
+            content, err2 = divide_arrays(shown[0][0], shown[0][1], np.stack([s[0] for s in shown[1:]]), np.stack([s[1] for s in shown[1:]]))
+            for r, c, e2 in zip(self.drawn['ratios'], content, err2):
+                set_hist_arrays(r, np.concatenate(([0.], c, [0.])), np.concatenate(([0.], e2, [0.])))
+
+        if self.auto_yrange: self._update_yrange(shown)
+        self.updates += 1
+        if repaint: self.repaint()
+
+    def _update_yrange(self, shown):
+        # Grows immediately, shrinks only when the data uses less than half of the frame, so the axis does not flicker
+        frame = self.drawn['hists'][0]
+        sel = xrange_bins(bin_edges(frame), self.plotter.xrange)
+        ymin = min(low[sel].min() for _, _, low, _ in shown)
+        ymax = max(high[sel].max() for _, _, _, high in shown) * 1.1
+        cur_min, cur_max = frame.GetMinimum(), frame.GetMaximum()
+        if ymin < cur_min or ymax > cur_max or (ymax - ymin) < .5 * (cur_max - cur_min):
+            frame.SetMinimum(ymin)
+            frame.SetMaximum(ymax)
+
+    def repaint(self):
+        for pad in self.drawn['pads']: pad.Modified()
+        self.drawn['canvas'].Update()
+
+    def save(self, save):
+        self.plotter.save_canvas(self.drawn['canvas'], save)
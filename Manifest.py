@@ -0,0 +1,150 @@
+import os
+import json
+import itertools
+from graphlib import TopologicalSorter
+from root_plotting.BatchRender import PlotJob, PlotResult, batch_pool, render_batch
+from root_plotting.Utils import clone
+
+_ids = itertools.count()
+
+# Plot method used when a manifest entry does not name one
+DEFAULT_METHODS = {
+    'HistPlot'          : 'plotHists',
+    'MultiHistPlot'     : 'plotHists',
+    'EfficiencyPlot'    : 'plotEfficiencies',
+    'EfficiencyMapPlot' : 'plotEfficiencyMap',
+    'StackPlot'         : 'plotStack',
+}
+
+def plot_name(plot):
+    # 'name', else the save path (the first one when save is a list of formats)
+    if 'name' in plot: return plot['name']
+    save = plot.get('save')
+    return save[0] if isinstance(save, (list, tuple)) else save
+
+class Manifest():
+    def __init__(self, inputs, plots, base_dir='.'):
+        # inputs: {name: {'file': path, 'path': object path}}
+        # plots: [{'name', 'plotter', 'method', 'inputs', 'params', 'kwargs', 'save', 'depends'}]
+        self.inputs = inputs
+        self.plots = plots
+        self.base_dir = base_dir
+        names = [plot_name(p) for p in plots]
+        if len(set(names)) != len(names): raise ValueError('Plot names (or save paths) in a manifest must be unique')
+        for plot in plots:
+            for name in self._input_names(plot.get('inputs', [])):
+                if name not in inputs: raise KeyError(f"Plot {plot_name(plot)!r} uses unknown input {name!r}")
+            for dep in plot.get('depends', []):
+                if dep not in names: raise KeyError(f"Plot {plot_name(plot)!r} depends on unknown plot {dep!r}")
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            if os.path.splitext(path)[1] in ('.yaml', '.yml'):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError('Reading YAML manifests requires PyYAML, use a JSON manifest or pip install pyyaml')
+                data = yaml.safe_load(f)
+            else:
+                data = json.load(f)
+        return cls(data.get('inputs', {}), data.get('plots', []), base_dir=os.path.dirname(os.path.abspath(path)))
+
+    def _input_names(self, spec):
+        if isinstance(spec, (list, tuple)):
+            for s in spec: yield from self._input_names(s)
+        else:
+            yield spec
+
+    def _file(self, name):
+        return os.path.normpath(os.path.join(self.base_dir, self.inputs[name]['file']))
+
+    def graph(self):
+        # Nodes: ('file', path) -> ('read', (path, object)) -> ('plot', name); identical reads share one node
+        graph = {}
+        for name, spec in self.inputs.items():
+            f = self._file(name)
+            graph.setdefault(('file', f), set())
+            graph.setdefault(('read', (f, spec['path'])), set()).add(('file', f))
+        for plot in self.plots:
+            node = ('plot', plot_name(plot))
+            deps = graph.setdefault(node, set())
+            for name in self._input_names(plot.get('inputs', [])):
+                deps.add(('read', (self._file(name), self.inputs[name]['path'])))
+            for dep in plot.get('depends', []): deps.add(('plot', dep))
+        return graph
+
+    def _resolve(self, spec, objects, copy):
+        if isinstance(spec, (list, tuple)): return [self._resolve(s, objects, copy) for s in spec]
+        obj = objects[(self._file(spec), self.inputs[spec]['path'])]
+        # norm rescales the histogram in place, so shared inputs are copied for those plots
+        return clone(obj, name=f'{obj.GetName()}_copy{next(_ids)}') if copy and obj.InheritsFrom('TH1') else obj
+
+    def _job(self, plot, objects):
+        params = dict(plot.get('params', {}))
+        kwargs = dict(plot.get('kwargs', {}))
+        if 'save' in plot: kwargs['save'] = plot['save']
+        args = [self._resolve(s, objects, params.get('norm') is not None) for s in plot.get('inputs', [])]
+        return PlotJob(plot['plotter'], plot.get('method', DEFAULT_METHODS.get(plot['plotter'])), args=args, kwargs=kwargs, params=params, name=plot_name(plot))
+
+    def _read(self, path, obj_paths, objects, errors):
+        # Reads every object needed from one file and closes it; failures are recorded per object instead of raised
+        from ROOT import TFile
+        f = TFile.Open(path)
+        try:
+            if not f or f.IsZombie():
+                for obj_path in obj_paths: errors[(path, obj_path)] = f'Cannot open {path}'
+                return
+            for obj_path in obj_paths:
+                obj = f.Get(obj_path)
+                if not obj:
+                    errors[(path, obj_path)] = f'{obj_path} not found in {path}'
+                    continue
+                if hasattr(obj, 'SetDirectory'): obj.SetDirectory(0)
+                objects[(path, obj_path)] = obj
+        finally:
+            if f: f.Close()
+
+    def _failure(self, plot, errors, results):
+        # Why a plot cannot run: an unreadable input or a failed dependency, None if it can
+        for name in self._input_names(plot.get('inputs', [])):
+            key = (self._file(name), self.inputs[name]['path'])
+            if key in errors: return f'Input {name!r}: {errors[key]}'
+        for dep in plot.get('depends', []):
+            if not results[dep].ok: return f'Dependency {dep!r} failed'
+        return None
+
+    def run(self, workers=1, start_method='spawn'):
+        # Each file is opened once, one at a time, and each object read once; ready plots run together, in parallel on
+        # one process pool for the whole manifest with workers>1. Unreadable inputs fail only the plots that need them
+        plots = {plot_name(p) : p for p in self.plots}
+        objects, errors, results = {}, {}, {}
+        sorter = TopologicalSorter(self.graph())
+        sorter.prepare()
+        pool = None
+        try:
+            while sorter.is_active():
+                ready = sorter.get_ready()
+                reads = {}
+                for kind, key in ready:
+                    if kind=='read': reads.setdefault(key[0], []).append(key[1])
+                for path, obj_paths in reads.items(): self._read(path, obj_paths, objects, errors)
+
+                jobs = []
+                for kind, key in ready:
+                    if kind!='plot': continue
+                    error = self._failure(plots[key], errors, results)
+                    if error: results[key] = PlotResult(key, False, error=error)
+                    else: jobs.append(self._job(plots[key], objects))
+
+                if workers > 1 and len(jobs) > 1:
+                    if pool is None: pool = batch_pool(workers, start_method)
+                    batch = render_batch(jobs, pool=pool)
+                else:
+                    batch = render_batch(jobs, workers=1)
+                for job, result in zip(jobs, batch): results[job.name] = result
+                sorter.done(*ready)
+        finally:
+            if pool is not None: pool.shutdown()
+
+        return [results.get(name, PlotResult(name, False, error='not run')) for name in plots]
@@ -0,0 +1,209 @@
+import numpy as np
+from root_plotting.Style import lookup, COLORS, MARKER_STYLES, MARKER_SIZES, LINE_STYLES, LINE_WIDTHS, TITLE_SIZES, LEGEND_POSITIONS, LEGEND_TEXT_SIZES, style_sheet
+from root_plotting.Utils import LOD_OVERSAMPLE, divide_arrays, lod_groups, lod_arrays, xrange_bins, hist_input
+from root_plotting.Stats import CL_1SIGMA
+
+# NumPy/matplotlib rendering of the HistPlot, MultiHistPlot and EfficiencyPlot layouts, selected with
+# the 'backend' : 'matplotlib' plotter parameter. Nothing here imports ROOT unless a ROOT object is passed in.
+
+# The plotters' style vocabulary in matplotlib terms (names are validated against root_plotting.Style first)
+MPL_MARKERS = {'' : 'none', '.' : '.', '+' : 'P', 'x' : 'x', 'o' : 'o', '*' : (6, 2, 0), '^' : '^', 'star' : '*'}
+MPL_MARKER_SIZES = {'small' : 4, 'med' : 6, 'large' : 12, 'x-large' : 16, 'xx-large' : 20}
+MPL_LINE_STYLES = {'-' : '-', '..' : ':', '--' : '--', '-.' : '-.'}
+MPL_LINE_WIDTHS = {'thin' : .75, 'med' : 1.5, 'thick' : 3.5}
+MPL_TEXT_SIZES = {'small' : 8, 'med' : 12, 'large' : 15}
+ROOT_COLORS = {code : name for name, code in COLORS.items()}
+
+def checked(table, name, what):
+    # Same names and the same ValueError as the ROOT plotters
+    lookup(table, name, what)
+    return name
+
+def mpl_color(color):
+    if isinstance(color, str): return checked(COLORS, color, 'color')
+    return ROOT_COLORS.get(color, f'C{color % 10}')
+
+def mpl_entry(marker_color='black', marker_style='', marker_size='small', line_color='black', line_style='-', line_width='med'):
+    return dict(
+        color=mpl_color(line_color),
+        markerfacecolor=mpl_color(marker_color),
+        markeredgecolor=mpl_color(marker_color),
+        marker=MPL_MARKERS[checked(MARKER_STYLES, marker_style, 'marker style')],
+        markersize=MPL_MARKER_SIZES[checked(MARKER_SIZES, marker_size, 'marker size')],
+        linestyle=MPL_LINE_STYLES[checked(LINE_STYLES, line_style, 'line style')],
+        linewidth=MPL_LINE_WIDTHS[checked(LINE_WIDTHS, line_width, 'line width')],
+    )
+
+def split_title(title_string):
+    # ROOT 'title;x-axis title;y-axis title' strings
+    parts = (title_string or '').split(';') + ['', '']
+    return parts[0].strip(), parts[1].strip(), parts[2].strip()
+
+def new_figure(plotter, ratio=False, show=False):
+    # Bare Figure objects need no GUI toolkit; pyplot is only imported to show a plot
+    w, h = getattr(plotter, 'canvas_size', (800,800))
+    if show:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=(w/100, h/100), dpi=100)
+    else:
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=(w/100, h/100), dpi=100)
+    fig.subplots_adjust(left=.15, right=.95, bottom=.12 if ratio else .15, top=.95)
+    if not ratio: return fig, fig.add_subplot(), None
+    grid = fig.add_gridspec(2, 1, height_ratios=(.7, .25), hspace=0)
+    ax = fig.add_subplot(grid[0])
+    rax = fig.add_subplot(grid[1], sharex=ax)
+    ax.tick_params(labelbottom=False)
+    return fig, ax, rax
+
+def format_axes(plotter, ax, rax=None, yrange=None, rrange=None, x_title=None, y_title=None):
+    text = MPL_TEXT_SIZES[checked(TITLE_SIZES, getattr(plotter, 'text_size', 'med'), 'text size')]
+    title, x_label, y_label = split_title(getattr(plotter, 'title_string', None))
+    x_label = x_title or x_label
+    y_label = y_title or y_label
+    if title: ax.set_title(title, fontsize=text)
+    xrange = getattr(plotter, 'xrange', None)
+    if xrange is not None: ax.set_xlim(*xrange)
+    if yrange is not None: ax.set_ylim(*yrange)
+    ax.set_ylabel(y_label, fontsize=text)
+    ax.tick_params(labelsize=text)
+    bottom = ax if rax is None else rax
+    bottom.set_xlabel(x_label, fontsize=text)
+    if rax is not None:
+        rax.set_ylabel('Ratio', fontsize=text)
+        rax.tick_params(labelsize=text)
+        rax.axhline(1, color='black', linestyle='--', linewidth=1)
+        if rrange is not None: rax.set_ylim(*rrange)
+        rax.locator_params(axis='y', nbins=4)
+
+def draw_legend(plotter, ax):
+    pos = getattr(plotter, 'leg_pos', 'upper_right')
+    legtext = getattr(plotter, 'legtext_size', None)
+    size = MPL_TEXT_SIZES[checked(LEGEND_TEXT_SIZES['full'], legtext, 'legend text size')] if legtext else MPL_TEXT_SIZES['med']
+    if isinstance(pos, tuple):
+        x1, y1, x2, y2 = pos
+        return ax.legend(loc='center', bbox_to_anchor=(x1, y1, x2-x1, y2-y1), fontsize=size, frameon=False)
+    return ax.legend(loc=checked(LEGEND_POSITIONS['full'], pos, 'legend position').replace('_', ' '), fontsize=size, frameon=False)
+
+def draw_points(ax, x, half, y, err_low, err_up, entry, label=None):
+    # Error bars like ROOT's 'E' option: bin width horizontally, no line between points
+    style = dict(entry)
+    linestyle = style.pop('linestyle')
+    bars = ax.errorbar(x, y, xerr=half, yerr=(err_low, err_up), linestyle='none', elinewidth=style.pop('linewidth'), capsize=0, label=label, **style)
+    for line in bars[2]: line.set_linestyle(linestyle)
+    return bars
+
+def save_figure(plotter, fig, save, cache_key=None):
+    if hasattr(save, 'add_page'): raise ValueError('PdfBook output needs the ROOT backend, save matplotlib plots to files')
+    paths = plotter.save_paths(save)
+    for path in paths: fig.savefig(path)
+    if cache_key is not None: plotter.render_cache.store(cache_key, paths)
+
+def plot_hists(plotter, hists, styles, titles=None, ratio=False, ratio_colors=None, legend=True, norm=None, show=False, save=False, cache_key=None):
+    # Same layout as the ROOT plotters: histograms with error bars, optional ratios to hists[0] below.
+    # Building the style sheet validates the text and legend settings before anything is drawn
+    style_sheet(getattr(plotter, 'text_size', 'med'), getattr(plotter, 'legtext_size', None), getattr(plotter, 'leg_pos', 'upper_right'), getattr(plotter, 'leg_scale', None))
+    entries = [mpl_entry(**style) for style in styles]
+    data = [hist_input(h) for h in hists]
+    if titles is not None and len(titles)!=len(data): raise ValueError('titles and hists have different lengths')
+
+    fig, ax, rax = new_figure(plotter, ratio=ratio, show=show)
+    xrange = getattr(plotter, 'xrange', None)
+    lod_pixels = getattr(plotter, 'lod_pixels', None)
+    max_bins = None if lod_pixels is None else max(int(fig.get_figwidth() * fig.dpi * .8 / lod_pixels), 1)
+
+    shown = []
+    lows, highs = [], []
+    for i, ((edges, contents, sumw2, title), entry) in enumerate(zip(data, entries)):
+        if norm is not None and contents.sum():
+            scale = norm / contents.sum()
+            contents, sumw2 = contents * scale, sumw2 * scale**2
+        groups = None if max_bins is None else lod_groups(edges, max_bins, xrange, LOD_OVERSAMPLE)
+        if groups is not None:
+            # Mean per display bin with a shaded min/max envelope, as in PlotBase.lod_hist
+            starts, stop = groups
+            cells = np.concatenate(([0.], contents, [0.]))
+            cells_w2 = np.concatenate(([0.], sumw2, [0.]))
+            contents, sumw2, low, high = lod_arrays(cells, cells_w2, edges, starts, stop)
+            edges = np.append(edges[starts], edges[stop])
+            ax.fill_between(np.repeat(edges, 2)[1:-1], np.repeat(low, 2), np.repeat(high, 2), color=entry['color'], alpha=.3, linewidth=0)
+            lows.append(low.min())
+            highs.append(high.max())
+        label = title if titles is None or titles[i] is None else titles[i]
+        err = np.sqrt(sumw2)
+        draw_points(ax, .5 * (edges[1:] + edges[:-1]), .5 * np.diff(edges), contents, err, err, entry, label=label)
+        sel = xrange_bins(edges, xrange)
+        if sel.stop > sel.start:
+            c, e = contents[sel], err[sel]
+            lows.append((c - e).min() if (c < 0).any() else max((c - e).min(), 0))
+            highs.append((c + e).max())
+        shown.append((edges, contents, sumw2))
+
+    yrange = getattr(plotter, 'yrange', None)
+    if yrange is None and highs: yrange = (min(lows), max(highs) * 1.1)
+
+    rrange = getattr(plotter, 'rrange', None)
+    if ratio:
+        if len(shown) < 2: raise ValueError('A ratio panel needs at least two histograms')
+        if len({len(c) for _, c, _ in shown}) > 1: raise ValueError('Cannot divide histograms with different binning')
+        edges = shown[0][0]
+        contents = np.stack([c for _, c, _ in shown])
+        sumw2 = np.stack([w for _, _, w in shown])
+        r, err2 = divide_arrays(contents[0], sumw2[0], contents[1:], sumw2[1:])
+        colors = ratio_colors or ['black']
+        x, half = .5 * (edges[1:] + edges[:-1]), .5 * np.diff(edges)
+        for k, (rk, e2) in enumerate(zip(r, err2)):
+            entry = dict(entries[k+1], color=mpl_color(colors[k % len(colors)]), marker='none')
+            draw_points(rax, x, half, rk, np.sqrt(e2), np.sqrt(e2), entry)
+        if rrange is None:
+            sel = xrange_bins(edges, xrange)
+            ok = contents[1:, sel] != 0
+            if ok.any():
+                err = np.sqrt(err2[:, sel])[ok]
+                lo, hi = (r[:, sel][ok] - err).min(), (r[:, sel][ok] + err).max()
+                pad = .1 * (hi - lo) if hi > lo else .1
+                rrange = (max(lo - pad, 0), hi + pad)
+
+    format_axes(plotter, ax, rax, yrange=yrange, rrange=rrange, x_title=getattr(plotter, 'x_title', None), y_title=getattr(plotter, 'y_title', None))
+    if legend: draw_legend(plotter, ax)
+
+    if show: fig.show()
+    if save: save_figure(plotter, fig, save, cache_key)
+    return fig
+
+def plot_efficiencies(plotter, effs, styles, titles=None, integrals=None, ratio=True, show=False, save=False, cache_key=None):
+    # effs: EffArrays; points are drawn for filled bins with the plotter's eff_interval
+    style_sheet(getattr(plotter, 'text_size', 'med'), None, getattr(plotter, 'leg_pos', 'upper_right'), getattr(plotter, 'leg_scale', None))
+    entries = [mpl_entry(**style) for style in styles]
+    fig, ax, rax = new_figure(plotter, ratio=ratio, show=show)
+    method = getattr(plotter, 'eff_interval', 'clopper_pearson')
+
+    for i, (a, entry) in enumerate(zip(effs, entries)):
+        eff, err_low, err_up = a.efficiency(method=method)
+        filled = a.total > 0
+        label = a.title if titles is None or titles[i] is None else titles[i]
+        if integrals is not None:
+            value, err = integrals[i]
+            label = f'{label} [$\\epsilon = {value} {plotter.integral_text(err)}$]'
+        draw_points(ax, a.centers[filled], .5 * np.diff(a.edges)[filled], eff[filled], err_low[filled], err_up[filled], entry, label=label)
+
+    if ratio:
+        a1, a2 = effs[0], effs[1]
+        half = .5 * np.diff(a1.edges)
+        entry = dict(mpl_entry(), marker='none')
+        interval = getattr(plotter, 'ratio_interval', None)
+        if interval=='katz':
+            defined, r, err_low, err_up = a1.ratio_points(a2, level=CL_1SIGMA)
+            draw_points(rax, a1.centers[defined], half[defined], r[defined], err_low[defined], err_up[defined], entry)
+        elif interval is None:
+            r, err2 = a1.ratio_arrays(a2)
+            draw_points(rax, a1.centers, half, r, np.sqrt(err2), np.sqrt(err2), entry)
+        else:
+            raise ValueError(f"Unknown ratio_interval {interval!r}, expected 'katz' or None")
+
+    format_axes(plotter, ax, rax, yrange=getattr(plotter, 'yrange', None), rrange=getattr(plotter, 'rrange', None))
+    draw_legend(plotter, ax)
+
+    if show: fig.show()
+    if save: save_figure(plotter, fig, save, cache_key)
+    return fig
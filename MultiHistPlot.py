@@ -1,11 +1,16 @@
 import numpy as np
-from ROOT import gROOT, gStyle, gPad, TLegend
-from root_plotting.PlotBase import PlotBase
-from root_plotting.Utils import clone
+from root_plotting.LazyROOT import gPad, TLegend
+from root_plotting.PlotBase import PlotBase, styled_plot
+from root_plotting.Profiler import profiled, profiled_plot
+from root_plotting.PlotSession import managed_plot
+from root_plotting.Utils import ratio, hist_arrays, hist_from_arrays, divide_arrays, xrange_bins
 
 class MultiHistPlot(PlotBase):
+    # Parameters that change the drawn output; only these enter the render cache key
+    PLOT_PARAMS = ('title_string', 'x_title', 'y_title', 'colors', 'canvas_size', 'marker_style', 'marker_size', 'xrange', 'yrange', 'rrange',
+            'text_size', 'leg_pos', 'cms_style', 'legtext_size', 'leg_scale', 'norm', 'lod_pixels', 'backend')
+
     def __init__(self, init_params=None):
-        gStyle.SetOptStat(0)
         self.title_string = None
         self.x_title = None
         self.y_title = None
@@ -18,41 +23,111 @@ class MultiHistPlot(PlotBase):
         self.rrange = (.5,2)
         self.text_size='med'
         self.leg_pos = 'upper_right'
+        self.cms_style = False
         self.legtext_size = 'med'
         self.leg_scale = None
         self.norm = None
+        self.lod_pixels = 1
+        self.backend = 'root'
+        self.render_cache = None
+        self.profiler = None
+        self.session = None
+        self.save_formats = None
+        self.writer = None
+        self._drawn = None
         if init_params: self.set_params(init_params)
 
     def set_params(self, params):
         for key in params:
             setattr(self, key, params[key])
     
+    @profiled('ratio')
     def hist_ratio(self, h_1, h_2):
-        r = clone(h_1)
-        # r.Divide(r, h_2, c1=1., c2=1., option='B')
-        r.Divide(h_2)
-        return r
+        return self.own(ratio(h_1, h_2, name=self.unique_name(f'{h_1.GetName()}_ratio')))
     
-    def incl_yrange(self,hists):
-        return np.min([h.GetMinimum() for h in hists]), np.max([h.GetMaximum() for h in hists])*1.1
+    def stack_arrays(self, hists):
+        # In-range contents and squared errors of all histograms as (N, nbins) arrays; binnings must match
+        arrays = [hist_arrays(h) for h in hists]
+        nbins = {len(c) for c, _, _ in arrays}
+        if len(nbins) > 1: raise ValueError(f'Cannot stack {", ".join(h.GetName() for h in hists)}: different binning')
+        contents = np.stack([c[1:-1] for c, _, _ in arrays]).astype(np.float64)
+        sumw2 = np.stack([w[1:-1] for _, w, _ in arrays])
+        return contents, sumw2, arrays[0][2]
+
+    def incl_yrange(self, hists, stacked=None):
+        # Lowest/highest content -/+ error over the bins inside xrange, widened to any stored (envelope) limits;
+        # one pass over the stacked (N, nbins) arrays, or one stack per histogram when the binnings differ
+        if stacked is None and len({h.GetNbinsX() for h in hists}) > 1:
+            ranges = [r for r in (self.incl_yrange([h]) for h in hists) if r is not None]
+            return (min(r[0] for r in ranges), max(r[1] for r in ranges)) if ranges else None
+        contents, sumw2, edges = self.stack_arrays(hists) if stacked is None else stacked
+        sel = xrange_bins(edges, self.xrange)
+        c = contents[:, sel]
+        if c.size==0: return None
+        err = np.sqrt(sumw2[:, sel])
+        lows = (c - err).min(axis=1)
+        lows = np.where((c < 0).any(axis=1), lows, np.maximum(lows, 0))
+        stored_min = np.array([h.GetMinimumStored() for h in hists], dtype=np.float64)
+        stored_max = np.array([h.GetMaximumStored() for h in hists], dtype=np.float64)
+        low = min(lows.min(), stored_min[stored_min != -1111].min(initial=np.inf))
+        high = max((c + err).max(), stored_max[stored_max != -1111].max(initial=-np.inf))
+        return low, high*1.1
+
+    def auto_rrange(self, r, err2, edges, denominators):
+        # Ratio +- error over the bins inside xrange that have a denominator, with 10% padding
+        sel = xrange_bins(edges, self.xrange)
+        ok = denominators[:, sel] != 0
+        if not ok.any(): return (.5, 2)
+        err = np.sqrt(err2[:, sel])[ok]
+        lo, hi = (r[:, sel][ok] - err).min(), (r[:, sel][ok] + err).max()
+        pad = .1 * (hi - lo) if hi > lo else .1
+        return max(lo - pad, 0), hi + pad
+
+    @profiled('ratio')
+    def hist_ratios(self, hists, stacked=None):
+        # Every hists[0]/hists[k] ratio and its TH1::Divide error in one broadcast over the stacked contents
+        contents, sumw2, edges = self.stack_arrays(hists) if stacked is None else stacked
+        r, err2 = divide_arrays(contents[0], sumw2[0], contents[1:], sumw2[1:])
+        ref = hists[0]
+        ratios = []
+        for content, e2 in zip(r, err2):
+            h = hist_from_arrays(edges, content, e2, name=self.unique_name(f'{ref.GetName()}_ratio'), title=ref.GetTitle())
+            h.GetXaxis().SetTitle(ref.GetXaxis().GetTitle())
+            ratios.append(self.own(h))
+        rrange = self.auto_rrange(r, err2, edges, contents[1:]) if self.rrange is None else self.rrange
+        return ratios, rrange
 
     # Core function for plot generation
+    @managed_plot
+    @profiled_plot
+    @styled_plot
     def plotHists(self, hists, ratio=False, titles=None, show=False, save=False):
+        hists = self.read_inputs(hists)
+        hit, cache_key = self.check_render_cache('plotHists', hists, [ratio, titles], save, show)
+        if hit: return self.cache_hit(ratio)
+
+        styles = [dict(
+                line_color=self.colors[i%len(self.colors)], 
+                marker_style= '' if self.marker_style is None else self.marker_style[i%len(self.marker_style)],
+                marker_color= self.colors[i%len(self.colors)], 
+                marker_size=self.marker_size,
+            ) for i in range(len(hists))]
+        backend = self.array_backend()
+        if backend is not None:
+            ratio_colors = ['black'] if len(hists)==2 else [self.colors[k%len(self.colors)] for k in range(1, len(hists))]
+            return backend.plot_hists(self, hists, styles, titles=titles, ratio=ratio, ratio_colors=ratio_colors, norm=self.norm, show=show, save=save, cache_key=cache_key)
+
         # Construct plot objects
-        for i, h in enumerate(hists):
-            self.format_entry(h, 
-                    norm=self.norm, 
-                    title=None,
-                    line_color=self.colors[i%len(self.colors)], 
-                    marker_style= '' if self.marker_style is None else self.marker_style[i%len(self.marker_style)],
-                    marker_color= self.colors[i%len(self.colors)], 
-                    marker_size=self.marker_size,
-            )
+        hists = [self.input_hist(h) for h in hists]
+        self.format_entries(hists, styles, norm=self.norm)
+        hists, bands = map(list, zip(*[self.lod_hist(h) for h in hists]))
 
-        self.yrange = self.incl_yrange(hists) if self.yrange is None else self.yrange
+        # One stack of the drawn contents serves the y range and the ratios
+        stacked = self.stack_arrays(hists) if len({h.GetNbinsX() for h in hists})==1 else None
+        yrange = self.incl_yrange(hists, stacked) if self.yrange is None else self.yrange
 
         # Legend object
-        leg = TLegend(0, 0, .5, .5)
+        leg = self.own(TLegend(0, 0, .5, .5))
         if titles is not None: assert len(hists)==len(titles)
         for i, h in enumerate(hists):
             entry = f'{h.GetTitle()}' if titles is None else titles[i]
@@ -62,12 +137,6 @@ class MultiHistPlot(PlotBase):
         if ratio:
             c, p1, p2 = self.createCanvas(option='ratio', size=self.canvas_size)
 
-            # TODO Fix CMS Style
-            cms_style = False
-            if cms_style:
-                gROOT.ProcessLine("setTDRStyle();")
-                gROOT.ProcessLine("CMS_lumi(c);")
-
             ## Top Panel
             p1.cd()
 
@@ -76,7 +145,7 @@ class MultiHistPlot(PlotBase):
             self.format_axes(hists[0], 
                     option='upper', 
                     xrange=self.xrange, 
-                    yrange=self.yrange, 
+                    yrange=yrange, 
                     text_size=self.text_size, 
                     title_string=self.title_string,
                     x_title=self.x_title,
@@ -84,6 +153,8 @@ class MultiHistPlot(PlotBase):
             )
             for h in hists[1:]: 
                 h.Draw('SAME E')
+            for h, band in zip(hists, bands): self.draw_envelope(band, h)
+            if self.cms_style: self.draw_cms_lumi(p1)
 
             # Legend
             leg.Draw()
@@ -93,18 +164,16 @@ class MultiHistPlot(PlotBase):
             gPad.Update()
             p2.cd()
 
-            # Hist ratio
-            r = self.hist_ratio(hists[0], hists[1])
+            # Hist ratios, all computed together; with more than one ratio each takes its histogram's color
+            ratios, rrange = self.hist_ratios(hists, stacked)
+            r = ratios[0]
             r.Draw('E')
-            self.format_entry(r, title=self.title_string if self.title_string else None)
-            self.format_axes(r, option='lower', xrange=self.xrange, yrange=self.rrange, text_size=self.text_size)
+            self.format_entry(r, line_color='black' if len(ratios)==1 else self.colors[1%len(self.colors)], title=self.title_string if self.title_string else None)
+            self.format_axes(r, option='lower', xrange=self.xrange, yrange=rrange, text_size=self.text_size)
 
-            if len(hists)>2:
-                for h in hists[2:]:
-                    rnew = self.hist_ratio(hists[0], h)
-                    self.format_entry(rnew, line_color=self.colors[i%len(self.colors)], title=self.title_string if self.title_string else None)
-                    # self.format_entry(h, line_color=self.colors[i%len(self.colors)], title=None)
-                    rnew.Draw('SAME E')
+            for k, rnew in enumerate(ratios[1:], 2):
+                self.format_entry(rnew, line_color=self.colors[k%len(self.colors)], title=self.title_string if self.title_string else None)
+                rnew.Draw('SAME E')
 
             # # TODO Ratio legend 
 
@@ -112,9 +181,10 @@ class MultiHistPlot(PlotBase):
             c.cd()
             gPad.Update()
             c.Update()
+            self._drawn = {'canvas' : c, 'pads' : (p1, p2), 'hists' : hists, 'bands' : bands, 'ratios' : ratios, 'legend' : leg}
 
             if show: c.Draw()
-            if save: c.SaveAs(save)
+            if save: self.save_canvas(c, save, cache_key)
             return c, r
 
         # No ratio panel
@@ -126,13 +196,15 @@ class MultiHistPlot(PlotBase):
             self.format_axes(hists[0], 
                     option='full', 
                     xrange=self.xrange, 
-                    yrange=self.yrange, 
+                    yrange=yrange, 
                     text_size=self.text_size,
                     x_title=self.x_title,
                     y_title=self.y_title,
             )
 
             for h in hists[1:]: h.Draw('SAME E')
+            for h, band in zip(hists, bands): self.draw_envelope(band, h)
+            if self.cms_style: self.draw_cms_lumi(c)
 
             # Legend
             self.format_legend(leg, option='full', pos=self.leg_pos, scale=self.leg_scale, legtext_size=self.legtext_size)
@@ -140,7 +212,8 @@ class MultiHistPlot(PlotBase):
 
             gPad.Update()
             c.Update()
+            self._drawn = {'canvas' : c, 'pads' : (c,), 'hists' : hists, 'bands' : bands, 'ratios' : [], 'legend' : leg}
         
             if show: c.Draw()
-            if save: c.SaveAs(save)
+            if save: self.save_canvas(c, save, cache_key)
             return c
\ No newline at end of file
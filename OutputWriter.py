@@ -0,0 +1,66 @@
+import os
+import pickle
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait
+
+def init_writer():
+    from ROOT import gROOT, TH1
+    gROOT.SetBatch(True)
+    TH1.AddDirectory(False)
+
+def write_canvas(data, paths):
+    c = pickle.loads(data)
+    for path in paths:
+        if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+        c.SaveAs(path)
+    c.Close()
+    return paths
+
+class OutputWriter():
+    def __init__(self, mode='process', workers=1, start_method='spawn'):
+        # The canvas is serialized on submit, so the plotter can release or reuse it immediately, and written in worker
+        # processes. There is no thread mode: SaveAs in a thread would race the next plot drawing through gPad and gStyle
+        if mode!='process': raise ValueError(f"Unknown writer mode {mode!r}, only 'process' is supported")
+        self.mode = mode
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context(start_method), initializer=init_writer)
+        self.futures = []
+        self.callbacks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def submit(self, c, paths, callback=None):
+        # callback (the render cache store) runs on this thread after the write succeeded, see run_callbacks()
+        self.run_callbacks()
+        future = self.pool.submit(write_canvas, pickle.dumps(c), list(paths))
+        if callback is not None: self.callbacks.append((future, callback))
+        # Kept until wait() collects it, so wait() reports every path written since the last wait()
+        self.futures.append(future)
+        return future
+
+    def run_callbacks(self):
+        # Called from submit(), wait() and close() only, so cache stores never race fetch() from a pool thread
+        remaining = []
+        for future, callback in self.callbacks:
+            if not future.done(): remaining.append((future, callback))
+            elif future.exception() is None: callback()
+        self.callbacks = remaining
+
+    def wait(self):
+        # Every path written since the last wait(), in submit order; raises the first write error, if any
+        done, _ = wait(self.futures + [f for f, _ in self.callbacks])
+        self.run_callbacks()
+        futures, self.futures = self.futures, []
+        written = []
+        for f in futures: written.extend(f.result())
+        return written
+
+    def close(self):
+        try:
+            return self.wait()
+        finally:
+            self.pool.shutdown()
@@ -1,102 +1,117 @@
 import os
+import functools
+import itertools
 import numpy as np
-from ROOT import gROOT, gStyle, gPad, TLegend, TEfficiency, TCanvas, TLine, TPad
+import importlib
+from root_plotting.LazyROOT import gROOT, gStyle, gPad, gSystem, TEfficiency, TGraph, TGraphAsymmErrors, TCanvas, TLine, TPad
+from root_plotting.Profiler import profiled
+from root_plotting.Utils import LOD_OVERSAMPLE, lod_rebin, hist_input, hist_from_arrays, contents_view
+from root_plotting.Style import style_sheet
+from root_plotting.HistStore import StoreEntry
 
-gROOT.LoadMacro(os.path.join(os.getcwd(),'root_plotting/C_Files/tdrstyle.C'))
-gROOT.LoadMacro(os.path.join(os.getcwd(),'root_plotting/C_Files/CMS_lumi.C'))
+# CMS style macros ship with the package and are only compiled/loaded when CMS style is requested
+MACRO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'C_Files')
+_macros_loaded = False
+
+def cache_dir():
+    return os.environ.get('ROOT_PLOTTING_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'root_plotting'))
+
+def load_cms_macros():
+    global _macros_loaded
+    if _macros_loaded: return
+    build_dir = os.path.join(cache_dir(), 'macros')
+    os.makedirs(build_dir, exist_ok=True)
+    for macro in ('tdrstyle.C', 'CMS_lumi.C'):
+        path = os.path.join(MACRO_DIR, macro)
+        # ACLiC reuses the cached library unless the macro source is newer
+        if not gSystem.CompileMacro(path, 'kO', '', build_dir):
+            gROOT.LoadMacro(path)
+    _macros_loaded = True
+
+_tdr_style = None
+
+def tdr_style():
+    # setTDRStyle() builds the TDR TStyle and makes it current; it is built once and the previous style is put back,
+    # so it is only active inside plots drawn with cms_style
+    global _tdr_style
+    if _tdr_style is None:
+        load_cms_macros()
+        previous = gROOT.GetStyle(gStyle.GetName())
+        gROOT.ProcessLine('setTDRStyle();')
+        _tdr_style = gROOT.GetStyle('tdrStyle')
+        previous.cd()
+    return _tdr_style
+
+def styled_plot(func):
+    # Plots with cms_style are drawn and saved under the TDR style; the process-wide gStyle is restored when the plot returns
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if not getattr(self, 'cms_style', False) or self.array_backend() is not None: return func(self, *args, **kwargs)
+        previous = gROOT.GetStyle(gStyle.GetName())
+        tdr_style().cd()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            previous.cd()
+    return wrapper
+
+# Canvas, pad and derived histogram names must be unique so several plots can live in one interpreter
+_object_ids = itertools.count()
+
+# Array rendering backends selectable with the 'backend' parameter, as module paths so a backend is only
+# imported when used; 'root' is the plotters' own implementation
+BACKENDS = {'matplotlib' : 'root_plotting.MplBackend'}
+
+class CachedRender():
+    # Returned in place of each object a plot method draws when its output was copied from the render cache
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return 'CACHED'
+
+CACHED = CachedRender()
 
 class PlotBase():
+    def style_sheet(self):
+        # Shared, immutable resolver for this plotter's text and legend settings
+        return style_sheet(
+                getattr(self, 'text_size', 'med'),
+                getattr(self, 'legtext_size', None),
+                getattr(self, 'leg_pos', 'upper_right'),
+                getattr(self, 'leg_scale', None),
+        )
+
+    @profiled('format_entry')
+    def format_entries(self, hists, styles, norm=None, titles=None):
+        # styles: one dict of format_entry style arguments per object; all names are resolved before anything is changed
+        entries = self.style_sheet().entries(styles)
+        for i, (hist, entry) in enumerate(zip(hists, entries)):
+            if norm is not None:
+                # Sum of weights over the in-range bins; GetEntries counts fills, which is wrong for weighted histograms
+                total = contents_view(hist)[1:-1].sum()
+                if total: hist.Scale(norm/total)
+            title = None if titles is None else titles[i]
+            if title is not None: hist.SetTitle(title)
+            else: gStyle.SetOptTitle(0)
+            entry.apply(hist)
+
     def format_entry(self, hist, title=None, norm=None, marker_color='black', marker_style ='', marker_size='small', line_color='black', line_style='-', line_width='med'):
-        if norm is not None:
-            hist.Scale(norm/hist.GetEntries())
-        
-        color_map = {
-            'white'   : 0,
-            'black'   : 1,
-            'red'     : 2,
-            'green'   : 3,
-            'blue'    : 4,
-            'cyan'    : 432,
-            'gray'    : 920,
-            'magenta' : 616,
-            'orange'  : 797,
-        }
-
-        linestyle_map = {
-            '-'  : 1,
-            '..' : 2,
-            '--' : 9,
-            '-.' : 10,
-        }
-
-        linewidth_map = {
-            'thin'  : 1,
-            'med'   : 2,
-            'thick' : 5,
-        }
-
-        markerstyle_map = {
-            ''     : 0,
-            '.'    : 1,
-            '+'    : 34,
-            'x'    : 5,
-            'o'    : 4,
-            '*'    : 3,
-            '^'    : 22,
-            'star' : 29,
-        }
-
-        markersize_map = {
-            'small'    : 1,
-            'med'      : 1.5,
-            'large'    : 3,
-            'x-large'  : 4,
-            'xx-large' : 5,
-        }
-        
-        if title is not None: hist.SetTitle(title)
-        else: gStyle.SetOptTitle(0)
-        hist.SetMarkerColor(color_map[marker_color] if isinstance(marker_color, str) else marker_color)
-        hist.SetMarkerStyle(markerstyle_map[marker_style])
-        hist.SetMarkerSize(markersize_map[marker_size])
-        hist.SetLineColor(color_map[line_color] if isinstance(line_color, str) else line_color)
-        hist.SetLineStyle(linestyle_map[line_style])
-        hist.SetLineWidth(linewidth_map[line_width])
-
-    def format_axes(self, hist, option='full', xrange=None, yrange=None, text_size='small', title_string=None, x_title=None, y_title=None):
-        titlesize_map = {
-            'small' : .02,
-            'med'   : .04,
-            'large' : .05,
-        }
-
-        labelsize_map = {
-            'small' : .025,
-            'med'   : .04,
-            'large' : .07,
-        }
-
-        titleoffset_map = {
-            'hist' : {
-                'small' : {'x' : 1.5, 'y' : 1.5},
-                'med'   : {'x' : 1.6, 'y' : 1.8},
-                'large' : {'x' : 1.5, 'y' : 1.5},
-            },
-            'eff' : {
-                'small' : {'x' : 1.2, 'y' : 1.2},
-                'med'   : {'x' : 1.2, 'y' : 1.1},
-                'large' : {'x' : 1.2, 'y' : 1},
-            },
-            'ratio' : {
-                'small' : {'x' : 1.5, 'y' : .5},
-                'med'   : {'x' : 1.2, 'y' : .4},
-                'large' : {'x' : 1.2, 'y' : .35},
-            }
-        }
+        self.format_entries([hist], [dict(
+                marker_color=marker_color,
+                marker_style=marker_style,
+                marker_size=marker_size,
+                line_color=line_color,
+                line_style=line_style,
+                line_width=line_width,
+        )], norm=norm, titles=[title])
+
+    @profiled('format_axes')
+    def format_axes(self, hist, option='full', xrange=None, yrange=None, text_size='small', title_string=None, x_title=None, y_title=None, zrange=None, z_title=None):
+        axis = style_sheet(text_size).axes['full' if option=='map' else option]
 
         if option=='full':
-            padh = padw = padsize = 1
-            hist.Draw('E')
+            hist.Draw('AP' if hist.InheritsFrom(TGraph.Class()) else 'E')
             gPad.Update()
             g = hist.GetPaintedGraph() if hist.InheritsFrom(TEfficiency.Class()) else hist
 
@@ -108,65 +123,57 @@ class PlotBase():
             if yrange is not None:
                 g.SetMinimum(yrange[0])
                 g.SetMaximum(yrange[1])
-            labelsize = labelsize_map[text_size] / padsize
-            titlesize = titlesize_map[text_size] / padsize
 
-            g.GetXaxis().SetLabelSize(labelsize)
+            g.GetXaxis().SetLabelSize(axis.label_size)
             g.GetXaxis().SetLabelOffset(.008)
-            g.GetXaxis().SetTitleSize(titlesize)
-            g.GetXaxis().SetTitleOffset(titleoffset_map['hist'][text_size]['x'])
-            g.GetYaxis().SetLabelSize(labelsize)
+            g.GetXaxis().SetTitleSize(axis.title_size)
+            g.GetXaxis().SetTitleOffset(axis.title_offset_x)
+            g.GetYaxis().SetLabelSize(axis.label_size)
             g.GetYaxis().SetLabelOffset(.008)
-            g.GetYaxis().SetTitleSize(titlesize)
-            g.GetYaxis().SetTitleOffset(titleoffset_map['hist'][text_size]['y'])
+            g.GetYaxis().SetTitleSize(axis.title_size)
+            g.GetYaxis().SetTitleOffset(axis.title_offset_y)
 
         if option=='upper':
-            padh = .7; padw = 1; padsize=.7
-            hist.Draw('E')
+            hist.Draw('AP' if hist.InheritsFrom(TGraph.Class()) else 'E')
             gPad.Update()
             g = hist.GetPaintedGraph() if hist.InheritsFrom(TEfficiency.Class()) else hist
-            labelsize = labelsize_map[text_size] / padsize
-            titlesize = titlesize_map[text_size] / padsize
 
             # X-Axis
             if x_title is not None: g.GetXaxis().SetTitle(x_title)
             if xrange is not None: g.GetXaxis().SetRangeUser(xrange[0],xrange[1])
-            g.GetXaxis().SetLabelSize(labelsize)
-            g.GetXaxis().SetTitleSize(titlesize)
-            g.GetXaxis().SetTitleOffset(titleoffset_map['eff'][text_size]['x'])
+            g.GetXaxis().SetLabelSize(axis.label_size)
+            g.GetXaxis().SetTitleSize(axis.title_size)
+            g.GetXaxis().SetTitleOffset(axis.title_offset_x)
 
             # Y-Axis
             if yrange is not None:
                 g.SetMinimum(yrange[0])
                 g.SetMaximum(yrange[1])
-            g.GetYaxis().SetLabelSize(labelsize)
+            g.GetYaxis().SetLabelSize(axis.label_size)
             g.GetYaxis().SetLabelOffset(.008)
-            g.GetYaxis().SetTitleSize(titlesize)
-            g.GetYaxis().SetTitleOffset(titleoffset_map['eff'][text_size]['y'])
+            g.GetYaxis().SetTitleSize(axis.title_size)
+            g.GetYaxis().SetTitleOffset(axis.title_offset_y)
 
             gPad.Update()
 
         elif option=='lower':
-            padh = .25; padw = 1; padsize=.25
             hist.SetTitle('')
-            labelsize = labelsize_map[text_size] / padsize
-            titlesize = titlesize_map[text_size] / padsize
             
             # X-Axis
-            if x_title is not None: g.GetXaxis().SetTitle(x_title)
+            if x_title is not None: hist.GetXaxis().SetTitle(x_title)
             if xrange is not None: hist.GetXaxis().SetRangeUser(xrange[0],xrange[1])
-            hist.GetXaxis().SetLabelSize(labelsize)
+            hist.GetXaxis().SetLabelSize(axis.label_size)
             hist.GetXaxis().SetLabelOffset(.008)
-            hist.GetXaxis().SetTitleSize(titlesize)
-            hist.GetXaxis().SetTitleOffset(titleoffset_map['ratio'][text_size]['x'])
+            hist.GetXaxis().SetTitleSize(axis.title_size)
+            hist.GetXaxis().SetTitleOffset(axis.title_offset_x)
 
             # Y-Axis
             hist.GetYaxis().SetTitle('Ratio')
             if yrange is not None: hist.GetYaxis().SetRangeUser(yrange[0],yrange[1])
-            hist.GetYaxis().SetLabelSize(labelsize)
+            hist.GetYaxis().SetLabelSize(axis.label_size)
             hist.GetYaxis().SetLabelOffset(.008)
-            hist.GetYaxis().SetTitleSize(titlesize)
-            hist.GetYaxis().SetTitleOffset(titleoffset_map['ratio'][text_size]['y'])
+            hist.GetYaxis().SetTitleSize(axis.title_size)
+            hist.GetYaxis().SetTitleOffset(axis.title_offset_y)
             hist.GetYaxis().SetNdivisions(4)
 
             # Draw Ratio Line at 1
@@ -174,54 +181,31 @@ class PlotBase():
             line.SetLineStyle(2)
             line.DrawLine(xrange[0],1,xrange[1],1) if xrange else line.DrawLine(0,1,hist.GetXaxis().GetXmax(),1)
 
-    def format_legend(self, leg, pos='lower_right', option='full', scale=None, legtext_size=None):
-        pos_map = {
-            'full' : {
-                'upper_left'   : [.16,.75,.79,.88],
-                'upper_right'  : [.16,.75,.89,.88],
-                'center_left'  : [.16,.43,.79,.56],
-                'center_right' : [.16,.43,.89,.56],
-                'lower_left'   : [.16,.17,.79,.3],
-                'lower_right'  : [.16,.17,.89,.3],
-            },
-            'upper' : {
-                'upper_left'   : [.16,.7,.79,.88],
-                'upper_right'  : [.16,.7,.89,.88],
-                'center_left'  : [.16,.4,.79,.55],
-                'center_right' : [.16,.4,.89,.55],
-                'lower_left'   : [.16,.03,.79,.2],
-                'lower_right'  : [.16,.03,.89,.2],
-            },
-            'lower' : {
-                'upper_left'   : [.16,.77,.5,.98],
-                'upper_right'  : [.5,.77,.89,.98],
-                'center_left'  : [.16,.65,.5,.85],
-                'center_right' : [.5,.65,.89,.85],
-                'lower_left'   : [.16,.52,.5,.73],
-                'lower_right'  : [.5,.52,.89,.73],
-            },
-        }
-
-        legtext_map = {
-            'full' :  {'small' : .02, 'med' : .04, 'large' : .06},
-            'upper' : {'small' : .02, 'med' : .04, 'large' : .06},
-            'lower' : {'small' : .08, 'med' : .1,  'large' : .15},
-        }
-    
-        # Resize legend
-        if isinstance(pos, tuple):
-            final_pos = pos
-        else:
-            if scale is not None:
-                if 'right' in pos:
-                    pos_map[option][pos][0] = pos_map[option][pos][2] - scale * (pos_map[option][pos][2] - pos_map[option][pos][0])
-                elif 'left' in pos:
-                    pos_map[option][pos][2] = pos_map[option][pos][0] + scale * (pos_map[option][pos][2] - pos_map[option][pos][0])
-            final_pos = (pos_map[option][pos][0], pos_map[option][pos][1], pos_map[option][pos][2], pos_map[option][pos][3])
+        elif option=='map':
+            # 2D maps keep their COLZ drawing; yrange is the y axis and zrange the colour scale
+            if title_string is not None: hist.SetTitle(title_string)
+            if x_title is not None: hist.GetXaxis().SetTitle(x_title)
+            if y_title is not None: hist.GetYaxis().SetTitle(y_title)
+            if z_title is not None: hist.GetZaxis().SetTitle(z_title)
+            if xrange is not None: hist.GetXaxis().SetRangeUser(xrange[0],xrange[1])
+            if yrange is not None: hist.GetYaxis().SetRangeUser(yrange[0],yrange[1])
+            if zrange is not None:
+                hist.SetMinimum(zrange[0])
+                hist.SetMaximum(zrange[1])
 
-        if legtext_size: leg.SetTextSize(legtext_map[option][legtext_size])
-        else: leg.SetTextSize(.04) if (option=='full' or option=='upper') else leg.SetTextSize(.1)
+            for ax, offset in ((hist.GetXaxis(), axis.title_offset_x), (hist.GetYaxis(), axis.title_offset_y), (hist.GetZaxis(), axis.title_offset_y)):
+                ax.SetLabelSize(axis.label_size)
+                ax.SetLabelOffset(.008)
+                ax.SetTitleSize(axis.title_size)
+                ax.SetTitleOffset(offset)
+            gPad.Update()
+
+    @profiled('format_legend')
+    def format_legend(self, leg, pos='lower_right', option='full', scale=None, legtext_size=None):
+        sheet = style_sheet(getattr(self, 'text_size', 'med'), legtext_size, pos, scale)
+        final_pos = sheet.legend[option]
 
+        leg.SetTextSize(sheet.legend_text[option])
         leg.SetX1(final_pos[0])
         leg.SetX2(final_pos[2])
         leg.SetY1(final_pos[1])
@@ -230,8 +214,125 @@ class PlotBase():
         gPad.Modified()
         leg.DrawClone()
 
+    def array_backend(self):
+        # None for ROOT, otherwise the backend module providing plot_hists and plot_efficiencies
+        name = getattr(self, 'backend', 'root')
+        if name=='root': return None
+        if name not in BACKENDS: raise ValueError(f"Unknown backend {name!r}, expected one of {', '.join(repr(b) for b in ('root', *BACKENDS))}")
+        return importlib.import_module(BACKENDS[name])
+
+    def read_inputs(self, objs, xrange=False):
+        # HistStore entries are read here, only the bins inside xrange (the plotter's by default)
+        xrange = getattr(self, 'xrange', None) if xrange is False else xrange
+        return [obj.load(xrange) if isinstance(obj, StoreEntry) else obj for obj in objs]
+
+    def input_hist(self, obj):
+        # Array inputs become TH1Ds for the ROOT backend
+        if hasattr(obj, 'GetNcells'): return obj
+        edges, contents, sumw2, title = hist_input(obj)
+        name = obj.get('name') if isinstance(obj, dict) else None
+        h = self.own(hist_from_arrays(edges, contents, sumw2, name=self.unique_name(name or 'input'), title=title))
+        if isinstance(obj, dict) and obj.get('entries') is not None: h.SetEntries(obj['entries'])
+        return h
+
+    def unique_name(self, base):
+        session = getattr(self, 'session', None)
+        return session.unique_name(base) if session is not None else f'{base}_{next(_object_ids)}'
+
+    def own(self, obj):
+        # Objects created for a plot are handed to the attached PlotSession, if any
+        session = getattr(self, 'session', None)
+        return session.track(obj) if session is not None else obj
+
+    def save_paths(self, save):
+        # save: one path or a list of paths; with save_formats every path is written once per format
+        paths = [save] if isinstance(save, str) else list(save)
+        formats = getattr(self, 'save_formats', None)
+        if formats: paths = [f'{os.path.splitext(p)[0]}.{fmt.lstrip(".")}' for p in paths for fmt in formats]
+        return paths
+
+    def check_render_cache(self, method, inputs, options, save, show=False):
+        # Returns (hit, key); shown plots are always drawn
+        cache = getattr(self, 'render_cache', None)
+        if cache is None or not save or show or hasattr(save, 'add_page'): return False, None
+        key = cache.key(self, method, inputs, options)
+        return cache.fetch(key, self.save_paths(save)), key
+
+    def cache_hit(self, pair=False):
+        # Nothing is drawn on a render-cache hit: CACHED stands in for every object a drawn plot returns
+        self._drawn = None
+        return (CACHED, CACHED) if pair else CACHED
+
+    @profiled('SaveAs')
+    def save_canvas(self, c, save, cache_key=None):
+        # The canvas is drawn once and written to every requested path, in the background with a writer
+        if hasattr(save, 'add_page'): return save.add_page(c, title=getattr(self, 'plot_name', None))
+        paths = self.save_paths(save)
+        store = None if cache_key is None else (lambda: self.render_cache.store(cache_key, paths))
+        writer = getattr(self, 'writer', None)
+        if writer is not None: return writer.submit(c, paths, callback=store)
+        for path in paths: c.SaveAs(path)
+        if store is not None: store()
+
+    def lod_max_bins(self):
+        # Display bins that fit in the plotting area of the canvas (or grid subpad) at lod_pixels pixels per bin
+        target = getattr(self, '_canvas_target', None)
+        width = target.GetWw() * target.GetAbsWNDC() if target is not None else self.canvas_size[0]
+        return max(int(width * .8 / self.lod_pixels), 1)
+
+    @profiled('lod')
+    def lod_hist(self, hist):
+        # Returns (display histogram, min/max envelope graph); only histograms with LOD_OVERSAMPLE times more bins in
+        # xrange than display bins fit are reduced, the others are returned as is.
+        # Called after format_entry so the copy carries the normalization and style of the original
+        if getattr(self, 'lod_pixels', None) is None: return hist, None
+        disp, envelope = lod_rebin(hist, self.lod_max_bins(), xrange=getattr(self, 'xrange', None), name=self.unique_name(f'{hist.GetName()}_lod'),
+                oversample=LOD_OVERSAMPLE)
+        if envelope is None: return hist, None
+        disp.SetLineColor(hist.GetLineColor())
+        disp.SetLineStyle(hist.GetLineStyle())
+        disp.SetLineWidth(hist.GetLineWidth())
+        disp.SetMarkerColor(hist.GetMarkerColor())
+        disp.SetMarkerStyle(hist.GetMarkerStyle())
+        disp.SetMarkerSize(hist.GetMarkerSize())
+        edges, low, high = envelope
+        x = .5 * (edges[1:] + edges[:-1])
+        mid = .5 * (high + low)
+        half_w = .5 * np.diff(edges)
+        half_h = .5 * (high - low)
+        band = TGraphAsymmErrors(len(x), x, mid, half_w, half_w, half_h, half_h)
+        band.SetName(self.unique_name(f'{hist.GetName()}_envelope'))
+        return self.own(disp), self.own(band)
+
+    def draw_envelope(self, band, hist):
+        # Shaded min/max of the bins merged by lod_hist, in the histogram's color
+        if band is None: return
+        band.SetFillColorAlpha(hist.GetLineColor(), .3)
+        band.SetLineWidth(0)
+        band.Draw('2')
+        hist.Draw('SAME E')
+
+    def set_cms_style(self):
+        # Makes the TDR style current for the rest of the process; plots with cms_style use it only while they draw
+        tdr_style().cd()
+
+    def draw_cms_lumi(self, pad, period=3, pos=10):
+        load_cms_macros()
+        from ROOT import CMS_lumi
+        CMS_lumi(pad, period, pos)
+
+    @profiled('createCanvas')
     def createCanvas(self, option='hist', size=(800,800)):
-        c = TCanvas('c', 'c', size[0], size[1])
+        gStyle.SetOptStat(0)
+        # Inside GridCanvas.draw the plot goes into the grid's next subpad instead of a new canvas
+        target = getattr(self, '_canvas_target', None)
+        if target is not None:
+            c = target
+            name = c.GetName()
+            c.cd()
+        else:
+            name = self.unique_name('c')
+            c = self.own(TCanvas(name, name, size[0], size[1]))
 
         if option=='hist': 
             c.SetLeftMargin(0.15)
@@ -240,13 +341,13 @@ class PlotBase():
             return c
 
         elif option=='ratio':
-            pad1 = TPad('pad1', 'pad1', 0, 0.3, 1., 1.)
+            pad1 = self.own(TPad(f'{name}_pad1', 'pad1', 0, 0.3, 1., 1.))
             pad1.SetBottomMargin(0) 
             pad1.SetLeftMargin(0.15)
             pad1.Draw()
 
             c.cd()  
-            pad2 = TPad('pad2', 'pad2', 0, 0.05, 1, 0.3)
+            pad2 = self.own(TPad(f'{name}_pad2', 'pad2', 0, 0.05, 1, 0.3))
             pad2.SetTopMargin(0)  
             pad2.SetBottomMargin(0.5)
             pad2.SetLeftMargin(0.15)    
@@ -0,0 +1,173 @@
+import os
+import json
+import socket
+import asyncio
+import argparse
+import traceback
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+# Wire format: one JSON object per line in each direction.
+# Request:  {"id": 1, "plotter": "MultiHistPlot", "method": "plotHists", "args": [...], "kwargs": {...}, "params": {...}}
+# Histogram arguments are {"hist": {"edges", "contents", "sumw2", "name", "title"}}, {"file": path, "path": object}
+# or {"eff": {"passed", "total", "edges", "title"}}, and may be nested in lists.
+# Response: {"id": 1, "ok": true, "output": ["plots/a.png"], "error": null}
+
+# Plot methods a request may call, per plotter; anything else is rejected before the plotter is built
+SERVER_METHODS = {
+    'HistPlot'          : ('plotHist', 'plotHists'),
+    'MultiHistPlot'     : ('plotHists',),
+    'EfficiencyPlot'    : ('plotEfficiencies',),
+    'EfficiencyMapPlot' : ('plotEfficiencies', 'plotEfficiencyMap', 'plotEfficiencyRatioMap'),
+    'StackPlot'         : ('plotStack',),
+}
+
+def check_request(request):
+    # Only whitelisted plot methods, and only the plotter's PLOT_PARAMS as params (no caches, writers or sessions)
+    from root_plotting.BatchRender import plotter_class
+    plotter, method = request.get('plotter'), request.get('method')
+    if plotter not in SERVER_METHODS: raise ValueError(f"Unknown plotter {plotter!r}, expected one of {', '.join(repr(p) for p in SERVER_METHODS)}")
+    if method not in SERVER_METHODS[plotter]: raise ValueError(f"{plotter} method {method!r} is not served, expected one of {', '.join(repr(m) for m in SERVER_METHODS[plotter])}")
+    allowed = plotter_class(plotter).PLOT_PARAMS
+    unknown = [k for k in (request.get('params') or {}) if k not in allowed]
+    if unknown: raise ValueError(f"{plotter} params {', '.join(repr(k) for k in unknown)} are not accepted, expected some of {', '.join(repr(k) for k in allowed)}")
+
+def init_server_worker(preload_cms=True):
+    # Keep each worker warm: ROOT, the plotter modules and (optionally) the compiled CMS macros
+    from root_plotting.BatchRender import init_worker, plotter_class
+    init_worker()
+    for name in SERVER_METHODS: plotter_class(name)
+    if preload_cms:
+        from root_plotting.PlotBase import load_cms_macros
+        load_cms_macros()
+
+def decode_arg(arg):
+    from ROOT import TFile
+    from root_plotting.Utils import hist_from_arrays
+    from root_plotting.EffArrays import EffArrays
+    if isinstance(arg, list): return [decode_arg(a) for a in arg]
+    if not isinstance(arg, dict): return arg
+    if 'hist' in arg: return hist_from_arrays(**arg['hist'])
+    if 'eff' in arg: return EffArrays(**arg['eff'])
+    if 'file' in arg:
+        f = TFile.Open(arg['file'])
+        if not f or f.IsZombie(): raise IOError(f"Cannot open {arg['file']}")
+        obj = f.Get(arg['path'])
+        if not obj: raise KeyError(f"{arg['path']} not found in {arg['file']}")
+        if obj.InheritsFrom('TH1') or obj.InheritsFrom('TEfficiency'): obj.SetDirectory(0)
+        f.Close()
+        return obj
+    return {k : decode_arg(v) for k, v in arg.items()}
+
+def run_request(request):
+    from root_plotting.BatchRender import PlotJob, run_job
+    try:
+        check_request(request)
+        job = PlotJob(request['plotter'], request['method'],
+                args=decode_arg(list(request.get('args', []))),
+                kwargs=decode_arg(dict(request.get('kwargs', {}))),
+                params=request.get('params'),
+        )
+    except Exception:
+        return {'ok' : False, 'output' : None, 'error' : traceback.format_exc()}
+    result = run_job(job)
+    output = result.output
+    if isinstance(output, str): output = [output]
+    return {'ok' : result.ok, 'output' : output, 'error' : result.error}
+
+class PlotServer():
+    def __init__(self, socket_path, workers=None, preload_cms=True, start_method='spawn'):
+        self.socket_path = socket_path
+        self.workers = workers or os.cpu_count()
+        self.preload_cms = preload_cms
+        self.start_method = start_method
+        self.pool = None
+
+    async def handle(self, reader, writer):
+        # Requests on one connection run concurrently; responses carry the request id
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(request):
+            loop = asyncio.get_running_loop()
+            try:
+                response = await loop.run_in_executor(self.pool, run_request, request)
+            except Exception:
+                response = {'ok' : False, 'output' : None, 'error' : traceback.format_exc()}
+            response['id'] = request.get('id')
+            async with lock:
+                writer.write((json.dumps(response) + '\n').encode())
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    async with lock:
+                        writer.write((json.dumps({'id' : None, 'ok' : False, 'output' : None, 'error' : 'Invalid JSON request'}) + '\n').encode())
+                        await writer.drain()
+                    continue
+                task = asyncio.ensure_future(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks: await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def serve(self):
+        if os.path.exists(self.socket_path): os.remove(self.socket_path)
+        ctx = mp.get_context(self.start_method)
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx, initializer=init_server_worker, initargs=(self.preload_cms,)) as pool:
+            self.pool = pool
+            server = await asyncio.start_unix_server(self.handle, path=self.socket_path)
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                if os.path.exists(self.socket_path): os.remove(self.socket_path)
+
+    def run(self):
+        asyncio.run(self.serve())
+
+def encode_hist(hist):
+    # Client side helper: TH1 -> JSON-able array payload
+    from root_plotting.Utils import hist_arrays
+    contents, sumw2, edges = hist_arrays(hist)
+    return {'hist' : {
+        'edges'    : edges.tolist(),
+        'contents' : contents[1:-1].tolist(),
+        'sumw2'    : sumw2[1:-1].tolist(),
+        'name'     : hist.GetName(),
+        'title'    : hist.GetTitle(),
+    }}
+
+def submit(socket_path, requests):
+    # Blocking client: sends one or more requests and returns the responses in request order
+    single = isinstance(requests, dict)
+    requests = [requests] if single else list(requests)
+    for i, r in enumerate(requests): r.setdefault('id', i)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(''.join(json.dumps(r) + '\n' for r in requests).encode())
+        sock.shutdown(socket.SHUT_WR)
+        responses = {}
+        with sock.makefile('r') as f:
+            for line in f:
+                response = json.loads(line)
+                responses[response['id']] = response
+    ordered = [responses.get(r['id']) for r in requests]
+    return ordered[0] if single else ordered
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve root_plotting jobs over a Unix socket')
+    parser.add_argument('--socket', default=os.path.join(os.environ.get('XDG_RUNTIME_DIR', '/tmp'), 'root_plotting.sock'))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-cms', action='store_true', help='Do not preload the CMS style macros')
+    args = parser.parse_args(argv)
+    PlotServer(args.socket, workers=args.workers, preload_cms=not args.no_cms).run()
+
+if __name__=='__main__':
+    main()
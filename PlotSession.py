@@ -0,0 +1,100 @@
+import gc
+import inspect
+import functools
+import itertools
+import contextlib
+
+_session_ids = itertools.count()
+
+class PlotSession():
+    def __init__(self, prefix=None, release_after_save=True, collect_every=500):
+        # Objects created by plotters attached to this session get unique names. A saved plot's objects are
+        # released when the next plot starts (or on release()/exit), so the caller can still use or keep() what it returned.
+        # Released objects are deleted as soon as Python drops them; a full gc pass, for reference cycles only, runs every
+        # collect_every releases and on release()/exit
+        self.prefix = f'rp{next(_session_ids)}' if prefix is None else prefix
+        self.release_after_save = release_after_save
+        self.collect_every = collect_every
+        self._releases = 0
+        self.owned = []
+        self.pending = []
+        self.kept = []
+        self._ids = itertools.count()
+        self._plot_start = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+    def unique_name(self, base):
+        return f'{self.prefix}_{base}_{next(self._ids)}'
+
+    def track(self, obj):
+        # Histograms leave the gDirectory registry so only the session references them
+        if obj.InheritsFrom('TH1'): obj.SetDirectory(0)
+        self.owned.append(obj)
+        return obj
+
+    def keep(self, *objs):
+        ids = set(id(o) for o in objs)
+        self.kept.extend(o for o in self.owned + self.pending if id(o) in ids)
+        self.owned = [o for o in self.owned if id(o) not in ids]
+        self.pending = [o for o in self.pending if id(o) not in ids]
+        return objs[0] if len(objs)==1 else objs
+
+    def _release(self, objs, collect=False):
+        # Closing a canvas deletes the primitives it owns (DrawClone'd legends, ratio lines),
+        # objects ROOT already deleted show up as null proxies
+        import ROOT
+        objs[:] = [o for o in objs if ROOT.addressof(o)]
+        for obj in objs:
+            if obj.InheritsFrom('TCanvas'): obj.Close()
+        # Python owns the rest, so they are deleted when the last reference below goes
+        for obj in objs:
+            if ROOT.addressof(obj): ROOT.SetOwnership(obj, True)
+        del objs[:]
+        self._releases += 1
+        if collect or (self.collect_every and self._releases % self.collect_every==0): gc.collect()
+
+    def release(self, everything=False):
+        owned, self.owned = self.owned + self.pending, []
+        self.pending = []
+        if everything:
+            owned.extend(self.kept)
+            self.kept = []
+        self._release(owned, collect=True)
+
+    def release_pending(self):
+        pending, self.pending = self.pending, []
+        self._release(pending)
+
+    @contextlib.contextmanager
+    def plot(self, saved):
+        # The previous saved plot is released here rather than when it returned
+        self.release_pending()
+        before = set(id(o) for o in self.owned)
+        try:
+            yield self
+        finally:
+            if saved and self.release_after_save:
+                self.pending = [o for o in self.owned if id(o) not in before]
+                self.owned = [o for o in self.owned if id(o) in before]
+
+def bound_argument(func, args, kwargs, name):
+    # Value of a plot method argument however it was passed, or its default
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return bound.arguments.get(name)
+
+def managed_plot(func):
+    # Wraps a plot method so the attached session releases its objects once the plot is saved
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        session = getattr(self, 'session', None)
+        if session is None: return func(self, *args, **kwargs)
+        with session.plot(saved=bool(bound_argument(func, (self,) + args, kwargs, 'save'))):
+            return func(self, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,131 @@
+import sys
+import json
+import time
+import functools
+import tracemalloc
+import contextlib
+from root_plotting.PlotSession import bound_argument
+
+def rss_kb():
+    # Resident set size from ROOT, which includes C++ allocations; None until ROOT has been loaded
+    root = sys.modules.get('ROOT')
+    if root is None: return None
+    info = root.ProcInfo_t()
+    root.gSystem.GetProcInfo(info)
+    return info.fMemResident
+
+class PlotProfiler():
+    def __init__(self, memory=True):
+        # memory: trace Python allocations with tracemalloc (started on the first phase, which slows allocation down)
+        # and record ROOT's resident memory
+        self.records = []
+        self.current_plot = None
+        self.memory = memory
+        self._peaks = []
+        self._started = False
+
+    @contextlib.contextmanager
+    def plot(self, name):
+        previous, self.current_plot = self.current_plot, name
+        try:
+            yield self
+        finally:
+            self.current_plot = previous
+
+    @contextlib.contextmanager
+    def phase(self, phase):
+        # py_kb: Python memory still allocated at the end of the phase, py_peak_kb: the most it allocated at once,
+        # including memory freed again before the phase ends; rss_kb: change in resident memory, which covers ROOT's
+        # C++ allocations that tracemalloc does not see
+        start_py = start_rss = None
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started = True
+            start_py, peak = tracemalloc.get_traced_memory()
+            # reset_peak is global, so the enclosing phase keeps the peak it reached so far
+            if self._peaks: self._peaks[-1] = max(self._peaks[-1], peak)
+            tracemalloc.reset_peak()
+            self._peaks.append(start_py)
+            start_rss = rss_kb()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {
+                'plot'       : self.current_plot,
+                'phase'      : phase,
+                'wall_s'     : time.perf_counter() - start,
+                'py_kb'      : None,
+                'py_peak_kb' : None,
+                'rss_kb'     : None,
+            }
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(self._peaks.pop(), peak)
+                if self._peaks: self._peaks[-1] = max(self._peaks[-1], peak)
+                record['py_kb'] = (current - start_py) / 1024
+                record['py_peak_kb'] = (peak - start_py) / 1024
+                end_rss = rss_kb()
+                if start_rss is not None and end_rss is not None: record['rss_kb'] = end_rss - start_rss
+            self.records.append(record)
+
+    def summary(self, by='phase'):
+        # by: 'phase' or 'plot'; memory columns are totals, except py_peak_kb which is the largest peak
+        agg = {}
+        for r in self.records:
+            key = r[by]
+            a = agg.setdefault(key, {'calls' : 0, 'total_s' : 0., 'max_s' : 0., 'py_kb' : 0., 'py_peak_kb' : 0., 'rss_kb' : 0.})
+            a['calls'] += 1
+            a['total_s'] += r['wall_s']
+            a['max_s'] = max(a['max_s'], r['wall_s'])
+            a['py_kb'] += r['py_kb'] or 0.
+            a['py_peak_kb'] = max(a['py_peak_kb'], r['py_peak_kb'] or 0.)
+            a['rss_kb'] += r['rss_kb'] or 0.
+        for a in agg.values(): a['mean_s'] = a['total_s'] / a['calls']
+        return agg
+
+    def dump_json(self, path, records=True):
+        out = {'summary' : self.summary('phase'), 'plots' : self.summary('plot')}
+        if records: out['records'] = self.records
+        with open(path, 'w') as f: json.dump(out, f, indent=2, default=str)
+
+    def dump_flat(self, stream=None, by='phase'):
+        stream = sys.stdout if stream is None else stream
+        stream.write(f'{by:<40} {"calls":>8} {"total_s":>10} {"mean_ms":>10} {"max_ms":>10} {"py_kb":>10} {"py_peak_kb":>11} {"rss_kb":>10}\n')
+        for key, a in sorted(self.summary(by).items(), key=lambda kv: -kv[1]['total_s']):
+            stream.write(f'{str(key):<40} {a["calls"]:>8} {a["total_s"]:>10.4f} {a["mean_s"]*1e3:>10.3f} {a["max_s"]*1e3:>10.3f} '
+                    f'{a["py_kb"]:>10.1f} {a["py_peak_kb"]:>11.1f} {a["rss_kb"]:>10.0f}\n')
+
+    def clear(self):
+        self.records = []
+
+    def close(self):
+        # Stops tracemalloc if this profiler started it
+        if self._started and tracemalloc.is_tracing(): tracemalloc.stop()
+        self._started = False
+
+def profiled(phase):
+    # Records the wrapped PlotBase method when the plotter has a profiler attached
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            profiler = getattr(self, 'profiler', None)
+            if profiler is None: return func(self, *args, **kwargs)
+            with profiler.phase(phase):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def profiled_plot(func):
+    # Tags every phase of a plot call with the output path (or the method name) and times the whole call
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        profiler = getattr(self, 'profiler', None)
+        if profiler is None: return func(self, *args, **kwargs)
+        save = bound_argument(func, (self,)+args, kwargs, 'save')
+        if isinstance(save, (list, tuple)): save = save[0] if save else None
+        name = getattr(self, 'plot_name', None) or (save if isinstance(save, str) else None) or func.__name__
+        with profiler.plot(name), profiler.phase('total'):
+            return func(self, *args, **kwargs)
+    return wrapper
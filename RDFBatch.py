@@ -0,0 +1,94 @@
+import numpy as np
+import ROOT
+from ROOT import TEfficiency
+
+class HistSpec():
+    def __init__(self, name, variable, binning, selection=None, weight=None, title=None):
+        # binning: (nbins, low, high) or an array of bin edges
+        self.name = name
+        self.variable = variable
+        self.binning = binning
+        self.selection = selection
+        self.weight = weight
+        self.title = name if title is None else title
+
+class EffSpec():
+    def __init__(self, name, variable, binning, pass_selection, selection=None, weight=None, title=None):
+        # selection defines the denominator, pass_selection is applied on top of it for the numerator
+        self.name = name
+        self.variable = variable
+        self.binning = binning
+        self.pass_selection = pass_selection
+        self.selection = selection
+        self.weight = weight
+        self.title = name if title is None else title
+
+class RDFBatch():
+    def __init__(self, tree, files=None, threads=0):
+        # tree: TTree/TChain, or a tree name together with a file (list)
+        if threads is not None: ROOT.EnableImplicitMT(threads)
+        self.df = ROOT.RDataFrame(tree) if files is None else ROOT.RDataFrame(tree, files if isinstance(files, str) else list(files))
+        self.node = self.df
+        self.specs = {}
+        self.results = {}
+        self._booked = {}
+        self._columns = {str(c) : str(c) for c in self.df.GetColumnNames()}
+
+    def _column(self, expr):
+        # Expressions are defined once and shared by every spec that uses them
+        if expr not in self._columns:
+            name = f'_rp_col{len(self._columns)}'
+            self.node = self.node.Define(name, expr)
+            self._columns[expr] = name
+        return self._columns[expr]
+
+    def _model(self, name, title, binning):
+        if len(binning)==3 and not isinstance(binning, np.ndarray):
+            return ROOT.RDF.TH1DModel(name, title, int(binning[0]), float(binning[1]), float(binning[2]))
+        edges = np.asarray(binning, dtype=np.float64)
+        return ROOT.RDF.TH1DModel(name, title, len(edges)-1, edges)
+
+    def _histo(self, node, model, column, weight):
+        return node.Histo1D(model, column) if weight is None else node.Histo1D(model, column, weight)
+
+    def book(self, spec):
+        if spec.name in self.specs: raise ValueError(f'Duplicate spec name {spec.name!r}')
+        column = self._column(spec.variable)
+        weight = None if spec.weight is None else self._column(spec.weight)
+        node = self.node if spec.selection is None else self.node.Filter(spec.selection)
+
+        if isinstance(spec, EffSpec):
+            total = self._histo(node, self._model(f'{spec.name}_total', spec.title, spec.binning), column, weight)
+            passed = self._histo(node.Filter(spec.pass_selection), self._model(f'{spec.name}_passed', spec.title, spec.binning), column, weight)
+            self._booked[spec.name] = (passed, total)
+        else:
+            self._booked[spec.name] = self._histo(node, self._model(spec.name, spec.title, spec.binning), column, weight)
+        self.specs[spec.name] = spec
+        return self
+
+    def book_all(self, specs):
+        for spec in specs: self.book(spec)
+        return self
+
+    def run(self):
+        # All results hang off one RDataFrame, so the first GetValue fills everything in one event loop
+        for name, booked in self._booked.items():
+            if name in self.results: continue
+            if isinstance(booked, tuple):
+                passed, total = booked[0].GetValue(), booked[1].GetValue()
+                eff = TEfficiency(passed, total)
+                eff.SetName(name)
+                eff.SetTitle(self.specs[name].title)
+                if self.specs[name].weight is not None: eff.SetUseWeightedEvents()
+                self.results[name] = eff
+            else:
+                self.results[name] = booked.GetValue()
+        return self.results
+
+    def plot_hists(self, plotter, names, **kwargs):
+        self.run()
+        return plotter.plotHists([self.results[n] for n in names], **kwargs)
+
+    def plot_efficiencies(self, plotter, name1, name2, **kwargs):
+        self.run()
+        return plotter.plotEfficiencies(self.results[name1], self.results[name2], **kwargs)
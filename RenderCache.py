@@ -0,0 +1,128 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+from root_plotting import __version__
+from root_plotting.Utils import hist_arrays
+from root_plotting.PlotBase import cache_dir
+from root_plotting.EffArrays import EffArrays, EffArrays2D
+
+# Bump when the key layout or the stored files change meaning
+CACHE_FORMAT = 2
+
+_code_version = None
+
+def code_version():
+    # Digest of the package sources and macros, so any change to the drawing code misses earlier renders
+    global _code_version
+    if _code_version is None:
+        pkg = os.path.dirname(os.path.abspath(__file__))
+        macros = os.path.join(pkg, 'C_Files')
+        files = [os.path.join(pkg, f) for f in sorted(os.listdir(pkg)) if f.endswith('.py')]
+        if os.path.isdir(macros): files += [os.path.join(macros, f) for f in sorted(os.listdir(macros)) if f.endswith('.C')]
+        h = hashlib.sha256()
+        for path in files:
+            h.update(os.path.relpath(path, pkg).encode())
+            with open(path, 'rb') as f: h.update(f.read())
+        _code_version = h.hexdigest()[:16]
+    return _code_version
+
+def plot_params(plotter):
+    # Only the parameters a plotter declares as affecting its output are hashed, never attached helpers
+    names = getattr(type(plotter), 'PLOT_PARAMS', None)
+    if not names: raise TypeError(f'{type(plotter).__name__} does not declare PLOT_PARAMS, cannot build a render cache key')
+    return {name : getattr(plotter, name, None) for name in names}
+
+class RenderCache():
+    def __init__(self, path=None, max_bytes=2*1024**3):
+        self.path = os.path.join(cache_dir(), 'renders') if path is None else path
+        self.max_bytes = max_bytes
+        self.stats = {'hits' : 0, 'misses' : 0, 'stores' : 0, 'evictions' : 0}
+        self._size = None
+        os.makedirs(self.path, exist_ok=True)
+
+    def _update_input(self, h, obj):
+        if isinstance(obj, (list, tuple)):
+            h.update(b'[')
+            for o in obj: self._update_input(h, o)
+            h.update(b']')
+        elif hasattr(obj, 'InheritsFrom') and obj.InheritsFrom('TEfficiency'):
+            h.update(obj.GetTitle().encode())
+            self._update_input(h, (obj.GetPassedHistogram(), obj.GetTotalHistogram()))
+        elif hasattr(obj, 'InheritsFrom') and obj.InheritsFrom('TH1'):
+            contents, sumw2, edges = hist_arrays(obj)
+            h.update(f'{obj.ClassName()};{obj.GetTitle()};{obj.GetXaxis().GetTitle()};{obj.GetYaxis().GetTitle()}'.encode())
+            for a in (contents, sumw2, edges): h.update(np.ascontiguousarray(a).tobytes())
+        elif isinstance(obj, EffArrays):
+            h.update(obj.title.encode())
+            self._update_input(h, (obj.passed, obj.total, obj.passed_w2, obj.total_w2, obj.edges))
+        elif isinstance(obj, EffArrays2D):
+            h.update(obj.title.encode())
+            self._update_input(h, (obj.passed, obj.total, obj.passed_w2, obj.total_w2, obj.xedges, obj.yedges))
+        elif isinstance(obj, dict):
+            for k in sorted(obj):
+                h.update(f'{k}='.encode())
+                self._update_input(h, obj[k])
+        elif isinstance(obj, np.ndarray):
+            h.update(np.ascontiguousarray(obj).tobytes())
+        else:
+            h.update(repr(obj).encode())
+
+    def key(self, plotter, method, inputs, options=None):
+        h = hashlib.sha256()
+        h.update(f'{CACHE_FORMAT};{__version__};{code_version()};{type(plotter).__name__};{method}'.encode())
+        h.update(json.dumps(plot_params(plotter), sort_keys=True, default=repr).encode())
+        h.update(json.dumps(options, sort_keys=True, default=repr).encode())
+        self._update_input(h, inputs)
+        return h.hexdigest()
+
+    def entry(self, key, path):
+        return os.path.join(self.path, key + os.path.splitext(path)[1])
+
+    def fetch(self, key, paths):
+        entries = [self.entry(key, p) for p in paths]
+        if not all(os.path.exists(e) for e in entries):
+            self.stats['misses'] += 1
+            return False
+        for e, p in zip(entries, paths):
+            if os.path.dirname(p): os.makedirs(os.path.dirname(p), exist_ok=True)
+            shutil.copyfile(e, p)
+            os.utime(e)
+        self.stats['hits'] += 1
+        return True
+
+    def size(self):
+        # Bytes in the cache directory: scanned once, then tracked by store() and evict()
+        if self._size is None: self._size = sum(e.stat().st_size for e in os.scandir(self.path) if e.is_file())
+        return self._size
+
+    def store(self, key, paths):
+        size = self.size()
+        for p in paths:
+            if not os.path.exists(p): continue
+            entry = self.entry(key, p)
+            if os.path.exists(entry): size -= os.path.getsize(entry)
+            shutil.copyfile(p, entry)
+            size += os.path.getsize(entry)
+        self._size = size
+        self.stats['stores'] += 1
+        # The directory is only scanned when the tracked size goes over the limit
+        if size > self.max_bytes: self.evict()
+
+    def evict(self):
+        # Least recently used entries go first, fetch refreshes the modification time. The scan also picks up
+        # entries written by other processes sharing the directory
+        entries = [(e.path, e.stat()) for e in os.scandir(self.path) if e.is_file()]
+        total = sum(st.st_size for _, st in entries)
+        for path, st in sorted(entries, key=lambda e: e[1].st_mtime):
+            if total <= self.max_bytes: break
+            total -= st.st_size
+            os.remove(path)
+            self.stats['evictions'] += 1
+        self._size = total
+
+    def clear(self):
+        for e in os.scandir(self.path):
+            if e.is_file(): os.remove(e.path)
+        self._size = 0
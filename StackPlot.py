@@ -0,0 +1,176 @@
+import numpy as np
+from root_plotting.LazyROOT import gPad, TLegend
+from root_plotting.PlotBase import PlotBase, styled_plot
+from root_plotting.Profiler import profiled, profiled_plot
+from root_plotting.PlotSession import managed_plot
+from root_plotting.Utils import hist_input, hist_from_arrays, divide_arrays, xrange_bins
+from root_plotting.Style import resolve_color
+
+class StackPlot(PlotBase):
+    # Parameters that change the drawn output; only these enter the render cache key
+    PLOT_PARAMS = ('title_string', 'x_title', 'y_title', 'colors', 'data_color', 'data_marker', 'marker_size', 'band_color', 'band_title',
+            'canvas_size', 'xrange', 'yrange', 'rrange', 'text_size', 'leg_pos', 'cms_style', 'legtext_size', 'leg_scale', 'norm', 'backend')
+
+    def __init__(self, init_params=None):
+        self.title_string = None
+        self.x_title = None
+        self.y_title = 'Events'
+        self.colors = ['orange','blue','red','green','magenta','cyan','gray']
+        self.data_color = 'black'
+        self.data_marker = 'o'
+        self.marker_size = 'small'
+        self.band_color = 'gray'
+        self.band_title = 'MC stat. unc.'
+        self.canvas_size = (800,800)
+        self.xrange = None
+        self.yrange = None
+        self.rrange = (.5,1.5)
+        self.text_size='med'
+        self.leg_pos = 'upper_right'
+        self.cms_style = False
+        self.legtext_size = 'med'
+        self.leg_scale = None
+        self.norm = None
+        self.backend = 'root'
+        self.render_cache = None
+        self.profiler = None
+        self.session = None
+        self.save_formats = None
+        self.writer = None
+        self._drawn = None
+        if init_params: self.set_params(init_params)
+
+    def set_params(self, params):
+        for key in params:
+            setattr(self, key, params[key])
+
+    def sample_scales(self, contents):
+        # Factors bringing each sample's in-range sum of weights to norm: one value for every sample or a list with one
+        # per sample, None keeps a sample as it is
+        norms = list(self.norm) if isinstance(self.norm, (list, tuple, np.ndarray)) else [self.norm] * len(contents)
+        if len(norms)!=len(contents): raise ValueError(f'Got {len(norms)} norms for {len(contents)} samples')
+        sums = contents.sum(axis=1)
+        target = np.array([s if n is None else n for n, s in zip(norms, sums)], dtype=np.float64)
+        return np.where(sums != 0, target / np.where(sums != 0, sums, 1.), 1.)
+
+    @profiled('stack')
+    def stack(self, samples):
+        # One pass over the (S, nbins) sample arrays: cumulative stack, total and the total's squared error
+        data = [hist_input(s) for s in samples]
+        edges = data[0][0]
+        if any(len(d[0])!=len(edges) for d in data): raise ValueError('Cannot stack samples with different binning')
+        contents = np.stack([d[1] for d in data])
+        sumw2 = np.stack([d[2] for d in data])
+        scale = self.sample_scales(contents)
+        cumulative = np.cumsum(contents * scale[:, None], axis=0)
+        return edges, cumulative, (sumw2 * (scale**2)[:, None]).sum(axis=0), [d[3] for d in data]
+
+    def stack_yrange(self, edges, total, total_w2, data):
+        # Top of the stack + its error and data + error over the bins inside xrange, with room for the legend
+        sel = xrange_bins(edges, self.xrange)
+        highs = [(total + np.sqrt(total_w2))[sel]]
+        if data is not None: highs.append((data[1] + np.sqrt(data[2]))[sel])
+        high = max((h.max() for h in highs if len(h)), default=1.)
+        return total[sel].min(initial=0.), 1.3 * high
+
+    def band_hist(self, edges, contents, err2, name):
+        h = self.own(hist_from_arrays(edges, contents, err2, name=self.unique_name(name)))
+        h.SetFillColor(resolve_color(self.band_color))
+        h.SetFillStyle(3354)
+        h.SetLineWidth(0)
+        h.SetMarkerSize(0)
+        return h
+
+    # Core function for plot generation
+    @managed_plot
+    @profiled_plot
+    @styled_plot
+    def plotStack(self, samples, data=None, ratio=False, titles=None, data_title=None, show=False, save=False):
+        # samples are drawn bottom to top in the given order; the ratio panel shows data / total MC
+        samples = self.read_inputs(samples)
+        data, = self.read_inputs([data])
+        hit, cache_key = self.check_render_cache('plotStack', [samples, data], [ratio, titles, data_title], save, show)
+        if hit: return self.cache_hit(ratio)
+
+        if self.array_backend() is not None: raise ValueError(f'Stacks are only drawn by the ROOT backend, got {self.backend!r}')
+        if ratio and data is None: raise ValueError('A data/MC ratio needs data')
+        if titles is not None and len(titles)!=len(samples): raise ValueError(f'Got {len(titles)} titles for {len(samples)} samples')
+        fill_colors = [resolve_color(self.colors[k%len(self.colors)]) for k in range(len(samples))]
+
+        # Stack, total and uncertainty from the sample arrays; ROOT only receives the finished layers
+        edges, cumulative, total_w2, sample_titles = self.stack(samples)
+        total = cumulative[-1]
+        titles = sample_titles if titles is None else titles
+        layers = []
+        for k in reversed(range(len(samples))):
+            h = self.own(hist_from_arrays(edges, cumulative[k], np.zeros(len(total)), name=self.unique_name('stack'), title=titles[k]))
+            h.SetFillColor(fill_colors[k])
+            h.SetLineColor(fill_colors[k])
+            layers.append(h)
+        band = self.band_hist(edges, total, total_w2, 'stack_unc')
+
+        data_arrays = None
+        if data is not None:
+            data_arrays = hist_input(data)
+            if len(data_arrays[0])!=len(edges): raise ValueError('Data and samples have different binning')
+            data = self.input_hist(data)
+            self.format_entries([data], [dict(marker_color=self.data_color, marker_style=self.data_marker, marker_size=self.marker_size, line_color=self.data_color)])
+        yrange = self.stack_yrange(edges, total, total_w2, data_arrays) if self.yrange is None else self.yrange
+
+        # Legend object, top layer first
+        leg = self.own(TLegend(0, 0, .5, .5))
+        if data is not None: leg.AddEntry(data, data.GetTitle() if data_title is None else data_title, 'pe')
+        for h in layers: leg.AddEntry(h, h.GetTitle(), 'f')
+        leg.AddEntry(band, self.band_title, 'f')
+
+        if ratio:
+            c, p1, p2 = self.createCanvas(option='ratio', size=self.canvas_size)
+            p1.cd()
+            option = 'upper'
+        else:
+            c = self.createCanvas(option='hist', size=self.canvas_size)
+            option = 'full'
+
+        # Primary plot; format_axes draws the top layer as the frame, then it is switched to a filled histogram
+        self.format_axes(layers[0], option=option, xrange=self.xrange, yrange=yrange, text_size=self.text_size,
+                title_string=self.title_string, x_title=self.x_title, y_title=self.y_title)
+        layers[0].SetDrawOption('HIST')
+        for h in layers[1:]: h.Draw('SAME HIST')
+        band.Draw('SAME E2')
+        if data is not None: data.Draw('SAME E')
+        gPad.RedrawAxis()
+        if self.cms_style: self.draw_cms_lumi(p1 if ratio else c)
+
+        # Legend
+        leg.Draw()
+        self.format_legend(leg, pos=self.leg_pos, option=option, scale=self.leg_scale, legtext_size=self.legtext_size)
+
+        r = r_band = None
+        if ratio:
+            ## Ratio Panel
+            gPad.Update()
+            p2.cd()
+
+            # Data / total with data errors only; the MC uncertainty is the band around 1
+            _, data_c, data_w2, _ = data_arrays
+            filled = total != 0
+            r_content, r_err2 = divide_arrays(data_c, data_w2, total, np.zeros(len(total)))
+            r_band = self.band_hist(edges, np.where(filled, 1., 0.), np.where(filled, total_w2 / np.where(filled, total, 1.)**2, 0.), 'stack_unc_ratio')
+            r = self.own(hist_from_arrays(edges, r_content, r_err2, name=self.unique_name('stack_ratio')))
+            self.format_entries([r], [dict(marker_color=self.data_color, marker_style=self.data_marker, marker_size=self.marker_size, line_color=self.data_color)])
+
+            if self.title_string: r_band.SetTitle(self.title_string)
+            r_band.Draw('E2')
+            self.format_axes(r_band, option='lower', xrange=self.xrange, yrange=self.rrange, text_size=self.text_size, x_title=self.x_title)
+            r.Draw('SAME E')
+
+            gPad.Update()
+            c.cd()
+
+        gPad.Update()
+        c.Update()
+        self._drawn = {'canvas' : c, 'pads' : (p1, p2) if ratio else (c,), 'layers' : layers, 'band' : band, 'data' : data, 'ratio' : r, 'ratio_band' : r_band, 'legend' : leg}
+
+        if show: c.Draw()
+        if save: self.save_canvas(c, save, cache_key)
+        return (c, r) if ratio else c
@@ -0,0 +1,198 @@
+import numpy as np
+from statistics import NormalDist
+
+try:
+    from scipy.special import betaincinv
+except ImportError:
+    betaincinv = None
+
+# TEfficiency::kDefConfLevel
+CL_1SIGMA = 0.682689492137
+
+# Lanczos approximation (g=7, n=9) of log Gamma
+_LANCZOS = np.array([0.99999999999980993, 676.5203681218851, -1259.1392167224028, 771.32342877765313,
+        -176.61502916214059, 12.507343278686905, -0.13857109526572012, 9.9843695780195716e-6, 1.5056327351493116e-7])
+
+def log_gamma(x):
+    x = np.asarray(x, dtype=np.float64)
+    z = np.where(x < .5, 1 - x, x) - 1
+    series = _LANCZOS[0] + (_LANCZOS[1:] / (z[..., None] + np.arange(1, 9))).sum(axis=-1)
+    t = z + 7.5
+    lg = .5*np.log(2*np.pi) + (z + .5)*np.log(t) - t + np.log(series)
+    # Reflection for x < 1/2
+    return np.where(x < .5, np.log(np.pi / np.abs(np.sin(np.pi * x))) - lg, lg)
+
+def _beta_cf(a, b, x, max_iter=300, eps=3e-16):
+    # Continued fraction of the incomplete beta function (modified Lentz), all elements at once
+    tiny = 1e-300
+    fix = lambda v: np.where(np.abs(v) < tiny, tiny, v)
+    c = np.ones_like(x)
+    d = 1 / fix(1 - (a + b) * x / (a + 1))
+    h = d.copy()
+    for m in range(1, max_iter):
+        aa = m * (b - m) * x / ((a - 1 + 2*m) * (a + 2*m))
+        d = 1 / fix(1 + aa*d)
+        c = fix(1 + aa/c)
+        h *= d*c
+        aa = -(a + m) * (a + b + m) * x / ((a + 2*m) * (a + 1 + 2*m))
+        d = 1 / fix(1 + aa*d)
+        c = fix(1 + aa/c)
+        h *= d*c
+        if np.all(np.abs(d*c - 1) < eps): break
+    return h
+
+def beta_inc(a, b, x):
+    # Regularized incomplete beta function I_x(a, b)
+    a, b, x = (np.asarray(v, dtype=np.float64) for v in np.broadcast_arrays(a, b, x))
+    xc = np.clip(x, 1e-300, 1 - 1e-16)
+    front = np.exp(log_gamma(a + b) - log_gamma(a) - log_gamma(b) + a*np.log(xc) + b*np.log1p(-xc))
+    direct = x < (a + 1) / (a + b + 2)
+    value = np.where(direct, front * _beta_cf(a, b, xc) / a, 1 - front * _beta_cf(b, a, 1 - xc) / b)
+    return np.where(x <= 0, 0., np.where(x >= 1, 1., value))
+
+def beta_quantile_numpy(q, a, b, max_iter=20, eps=1e-10):
+    # Inverse of beta_inc by Halley iterations from the Numerical Recipes starting point, vectorized over all bins
+    q, a, b = (np.asarray(v, dtype=np.float64) for v in np.broadcast_arrays(q, a, b))
+    if q.size==0: return np.zeros(q.shape)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # Starting point: normal approximation for a, b >= 1, power-law tails otherwise
+        pp = np.where(q < .5, q, 1 - q)
+        t = np.sqrt(-2 * np.log(np.clip(pp, 1e-300, None)))
+        z = (2.30753 + t*.27061) / (1 + t*(.99229 + t*.04481)) - t
+        z = np.where(q < .5, -z, z)
+        al = (z*z - 3) / 6
+        h = 2 / (1/(2*a - 1) + 1/(2*b - 1))
+        w = z*np.sqrt(al + h)/h - (1/(2*b - 1) - 1/(2*a - 1)) * (al + 5/6 - 2/(3*h))
+        x_normal = a / (a + b*np.exp(2*w))
+        lna, lnb = np.log(a/(a + b)), np.log(b/(a + b))
+        ta, tb = np.exp(a*lna)/a, np.exp(b*lnb)/b
+        x_tail = np.where(q < ta/(ta + tb), (a*(ta + tb)*q)**(1/a), 1 - (b*(ta + tb)*(1 - q))**(1/b))
+        x = np.where((a >= 1) & (b >= 1), x_normal, x_tail)
+        x = np.clip(np.nan_to_num(x, nan=.5), 1e-300, 1 - 1e-16)
+
+        afac = log_gamma(a + b) - log_gamma(a) - log_gamma(b)
+        active = np.ones(q.shape, dtype=bool)
+        for _ in range(max_iter):
+            err = beta_inc(a, b, x) - q
+            pdf = np.exp((a - 1)*np.log(x) + (b - 1)*np.log1p(-x) + afac)
+            u = err / pdf
+            step = u / (1 - .5*np.minimum(1., u*((a - 1)/x - (b - 1)/(1 - x))))
+            step = np.where(active & np.isfinite(step), step, 0.)
+            new = x - step
+            new = np.where(new <= 0, .5*x, np.where(new >= 1, .5*(x + 1), new))
+            active &= np.abs(new - x) > eps * np.maximum(new, 1e-300)
+            x = new
+            if not active.any(): break
+    return np.where(q <= 0, 0., np.where(q >= 1, 1., x))
+
+def beta_quantile(q, a, b):
+    # scipy is vectorized in C; without it the numpy inversion above, which has no per-bin Python overhead either
+    if betaincinv is not None: return betaincinv(a, b, q)
+    return beta_quantile_numpy(q, a, b)
+
+def z_score(level):
+    return NormalDist().inv_cdf(.5 + level/2)
+
+def _counts(passed, total):
+    passed = np.asarray(passed, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    filled = total > 0
+    eff = np.where(filled, passed / np.where(filled, total, 1.), 0.)
+    return passed, total, filled, eff
+
+# Each interval returns (lower, upper) bounds of the efficiency; empty bins give [0, 1] like TEfficiency
+def clopper_pearson(passed, total, level=CL_1SIGMA):
+    passed, total, filled, _ = _counts(passed, total)
+    alpha = (1 - level) / 2
+    low = np.zeros(passed.shape)
+    up = np.ones(passed.shape)
+    has_pass = filled & (passed > 0)
+    has_fail = filled & (passed < total)
+    low[has_pass] = beta_quantile(alpha, passed[has_pass], total[has_pass] - passed[has_pass] + 1)
+    up[has_fail] = beta_quantile(1 - alpha, passed[has_fail] + 1, total[has_fail] - passed[has_fail])
+    return low, up
+
+def wilson(passed, total, level=CL_1SIGMA):
+    passed, total, filled, eff = _counts(passed, total)
+    z = z_score(level)
+    tot = np.where(filled, total, 1.)
+    denom = 1 + z*z/tot
+    center = (eff + z*z/(2*tot)) / denom
+    half = z * np.sqrt(eff*(1-eff)/tot + z*z/(4*tot*tot)) / denom
+    return np.where(filled, np.clip(center - half, 0., 1.), 0.), np.where(filled, np.clip(center + half, 0., 1.), 1.)
+
+def bayesian(passed, total, level=CL_1SIGMA, alpha=1., beta=1.):
+    # Central interval of the Beta(passed+alpha, total-passed+beta) posterior
+    passed, total, filled, _ = _counts(passed, total)
+    a = passed + alpha
+    b = total - passed + beta
+    low = beta_quantile((1 - level) / 2, a, b)
+    up = beta_quantile((1 + level) / 2, a, b)
+    return np.where(filled, low, 0.), np.where(filled, up, 1.)
+
+def normal(passed, total, level=CL_1SIGMA):
+    passed, total, filled, eff = _counts(passed, total)
+    half = z_score(level) * np.sqrt(eff*(1-eff) / np.where(filled, total, 1.))
+    return np.where(filled, np.clip(eff - half, 0., 1.), 0.), np.where(filled, np.clip(eff + half, 0., 1.), 1.)
+
+INTERVALS = {
+    'clopper_pearson' : clopper_pearson,
+    'wilson'          : wilson,
+    'bayesian'        : bayesian,
+    'normal'          : normal,
+}
+
+def eff_interval(passed, total, method='clopper_pearson', level=CL_1SIGMA):
+    # Returns (eff, err_low, err_up) with errors as distances from eff, clipped at 0 when
+    # eff lies outside a central Bayesian interval
+    if method not in INTERVALS: raise ValueError(f'Unknown interval {method!r}, expected one of {list(INTERVALS)}')
+    _, _, filled, eff = _counts(passed, total)
+    low, up = INTERVALS[method](passed, total, level=level)
+    return eff, np.where(filled, np.maximum(eff - low, 0.), 0.), np.where(filled, np.maximum(up - eff, 0.), 0.)
+
+def ratio_interval(passed_1, total_1, passed_2, total_2, level=CL_1SIGMA):
+    # Katz log interval for eff_1/eff_2 of independent samples, zero counts get a 0.5 continuity correction
+    p1, t1, f1, e1 = _counts(passed_1, total_1)
+    p2, t2, f2, e2 = _counts(passed_2, total_2)
+    defined = f1 & f2 & (p2 > 0)
+    r = np.where(defined, e1 / np.where(defined, e2, 1.), 0.)
+
+    c1 = np.where(p1 > 0, p1, .5)
+    c2 = np.where(p2 > 0, p2, .5)
+    n1 = np.where(p1 > 0, t1, t1 + .5)
+    n2 = np.where(p2 > 0, t2, t2 + .5)
+    se = np.sqrt(np.clip(1/c1 - 1/np.maximum(n1, c1) + 1/c2 - 1/np.maximum(n2, c2), 0., None))
+    r_corr = (c1/n1) / (c2/n2)
+    spread = np.exp(z_score(level) * se)
+    low = np.where(p1 > 0, r / spread, 0.)
+    up = r_corr * spread
+    return r, np.where(defined, r - low, 0.), np.where(defined, up - r, 0.)
+
+def kolmogorov_prob(z):
+    # TMath::KolmogorovProb for an array of z, 1 below z=0.2 where the series converges slowly
+    z = np.asarray(z, dtype=np.float64)
+    k = np.arange(1, 101)
+    terms = 2 * (-1.)**(k-1) * np.exp(-2 * k*k * z[..., None]**2)
+    return np.where(z < .2, 1., np.clip(terms.sum(axis=-1), 0., 1.))
+
+def chi2_test(c1, w1, c2, w2):
+    # Row-wise chi2 = sum (c1-c2)^2 / (w1+w2) over bins with any content; returns (chi2, ndf)
+    denom = np.asarray(w1, dtype=np.float64) + w2
+    used = denom > 0
+    chi2 = np.where(used, (np.asarray(c1, dtype=np.float64) - c2)**2 / np.where(used, denom, 1.), 0.).sum(axis=-1)
+    return chi2, used.sum(axis=-1)
+
+def ks_test(c1, w1, c2, w2):
+    # Row-wise Kolmogorov distance of the normalized cumulative distributions and its probability,
+    # with effective entries sum(w)^2/sum(w2) as in TH1::KolmogorovTest
+    c1 = np.asarray(c1, dtype=np.float64)
+    c2 = np.asarray(c2, dtype=np.float64)
+    s1, s2 = c1.sum(axis=-1), c2.sum(axis=-1)
+    filled = (s1 > 0) & (s2 > 0)
+    cdf1 = np.cumsum(c1, axis=-1) / np.where(filled, s1, 1.)[..., None]
+    cdf2 = np.cumsum(c2, axis=-1) / np.where(filled, s2, 1.)[..., None]
+    dist = np.where(filled, np.abs(cdf1 - cdf2).max(axis=-1), 0.)
+    n1 = np.where(filled, s1*s1 / np.maximum(np.sum(w1, axis=-1), 1e-300), 0.)
+    n2 = np.where(filled, s2*s2 / np.maximum(np.sum(w2, axis=-1), 1e-300), 0.)
+    z = dist * np.sqrt(np.where(filled, n1*n2 / np.where(filled, n1+n2, 1.), 0.))
+    return dist, kolmogorov_prob(z)
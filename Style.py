@@ -0,0 +1,190 @@
+import numbers
+import functools
+import collections
+from types import MappingProxyType
+
+# Matplotlib-like names -> ROOT codes
+COLORS = {
+    'white'   : 0,
+    'black'   : 1,
+    'red'     : 2,
+    'green'   : 3,
+    'blue'    : 4,
+    'cyan'    : 432,
+    'gray'    : 920,
+    'magenta' : 616,
+    'orange'  : 797,
+}
+
+LINE_STYLES = {
+    '-'  : 1,
+    '..' : 2,
+    '--' : 9,
+    '-.' : 10,
+}
+
+LINE_WIDTHS = {
+    'thin'  : 1,
+    'med'   : 2,
+    'thick' : 5,
+}
+
+MARKER_STYLES = {
+    ''     : 0,
+    '.'    : 1,
+    '+'    : 34,
+    'x'    : 5,
+    'o'    : 4,
+    '*'    : 3,
+    '^'    : 22,
+    'star' : 29,
+}
+
+MARKER_SIZES = {
+    'small'    : 1,
+    'med'      : 1.5,
+    'large'    : 3,
+    'x-large'  : 4,
+    'xx-large' : 5,
+}
+
+TITLE_SIZES = {'small' : .02, 'med' : .04, 'large' : .05}
+LABEL_SIZES = {'small' : .025, 'med' : .04, 'large' : .07}
+
+# Title offsets (x, y) per pad layout: full canvas, upper and lower (ratio) pads
+TITLE_OFFSETS = {
+    'full' : {
+        'small' : (1.5, 1.5),
+        'med'   : (1.6, 1.8),
+        'large' : (1.5, 1.5),
+    },
+    'upper' : {
+        'small' : (1.2, 1.2),
+        'med'   : (1.2, 1.1),
+        'large' : (1.2, 1),
+    },
+    'lower' : {
+        'small' : (1.5, .5),
+        'med'   : (1.2, .4),
+        'large' : (1.2, .35),
+    },
+}
+
+# Fraction of the canvas height each layout's pad covers; text sizes are divided by it
+PAD_SIZES = {'full' : 1, 'upper' : .7, 'lower' : .25}
+
+LEGEND_POSITIONS = {
+    'full' : {
+        'upper_left'   : (.16,.75,.79,.88),
+        'upper_right'  : (.16,.75,.89,.88),
+        'center_left'  : (.16,.43,.79,.56),
+        'center_right' : (.16,.43,.89,.56),
+        'lower_left'   : (.16,.17,.79,.3),
+        'lower_right'  : (.16,.17,.89,.3),
+    },
+    'upper' : {
+        'upper_left'   : (.16,.7,.79,.88),
+        'upper_right'  : (.16,.7,.89,.88),
+        'center_left'  : (.16,.4,.79,.55),
+        'center_right' : (.16,.4,.89,.55),
+        'lower_left'   : (.16,.03,.79,.2),
+        'lower_right'  : (.16,.03,.89,.2),
+    },
+    'lower' : {
+        'upper_left'   : (.16,.77,.5,.98),
+        'upper_right'  : (.5,.77,.89,.98),
+        'center_left'  : (.16,.65,.5,.85),
+        'center_right' : (.5,.65,.89,.85),
+        'lower_left'   : (.16,.52,.5,.73),
+        'lower_right'  : (.5,.52,.89,.73),
+    },
+}
+
+LEGEND_TEXT_SIZES = {
+    'full'  : {'small' : .02, 'med' : .04, 'large' : .06},
+    'upper' : {'small' : .02, 'med' : .04, 'large' : .06},
+    'lower' : {'small' : .08, 'med' : .1,  'large' : .15},
+}
+DEFAULT_LEGEND_TEXT = {'full' : .04, 'upper' : .04, 'lower' : .1}
+
+def lookup(table, name, what):
+    try:
+        return table[name]
+    except (KeyError, TypeError):
+        raise ValueError(f'Unknown {what} {name!r}, expected one of {", ".join(repr(k) for k in table)}') from None
+
+def resolve_color(color):
+    # Integral covers numpy integers as well as int, e.g. color codes taken from an array
+    return int(color) if isinstance(color, numbers.Integral) else lookup(COLORS, color, 'color')
+
+@functools.lru_cache(maxsize=1024)
+def resolve_entry(marker_color='black', marker_style='', marker_size='small', line_color='black', line_style='-', line_width='med'):
+    return EntryStyle(
+        resolve_color(marker_color),
+        lookup(MARKER_STYLES, marker_style, 'marker style'),
+        lookup(MARKER_SIZES, marker_size, 'marker size'),
+        resolve_color(line_color),
+        lookup(LINE_STYLES, line_style, 'line style'),
+        lookup(LINE_WIDTHS, line_width, 'line width'),
+    )
+
+class EntryStyle(collections.namedtuple('EntryStyle', 'marker_color marker_style marker_size line_color line_style line_width')):
+    __slots__ = ()
+
+    def apply(self, obj):
+        obj.SetMarkerColor(self.marker_color)
+        obj.SetMarkerStyle(self.marker_style)
+        obj.SetMarkerSize(self.marker_size)
+        obj.SetLineColor(self.line_color)
+        obj.SetLineStyle(self.line_style)
+        obj.SetLineWidth(self.line_width)
+
+AxisStyle = collections.namedtuple('AxisStyle', 'label_size title_size title_offset_x title_offset_y')
+
+class StyleSheet():
+    __slots__ = ('text_size', 'legtext_size', 'leg_pos', 'leg_scale', 'axes', 'legend', 'legend_text')
+
+    def __init__(self, text_size='med', legtext_size=None, leg_pos='upper_right', leg_scale=None):
+        # Every name is checked here, so a bad setting fails before anything is drawn
+        lookup(TITLE_SIZES, text_size, 'text size')
+        if legtext_size is not None: lookup(LEGEND_TEXT_SIZES['full'], legtext_size, 'legend text size')
+        if not isinstance(leg_pos, tuple): lookup(LEGEND_POSITIONS['full'], leg_pos, 'legend position')
+
+        axes = {}
+        for option, padsize in PAD_SIZES.items():
+            offset_x, offset_y = TITLE_OFFSETS[option][text_size]
+            axes[option] = AxisStyle(LABEL_SIZES[text_size] / padsize, TITLE_SIZES[text_size] / padsize, offset_x, offset_y)
+
+        legend, legend_text = {}, {}
+        for option, positions in LEGEND_POSITIONS.items():
+            legend[option] = leg_pos if isinstance(leg_pos, tuple) else self.scaled(positions[leg_pos], leg_pos, leg_scale)
+            legend_text[option] = DEFAULT_LEGEND_TEXT[option] if legtext_size is None else LEGEND_TEXT_SIZES[option][legtext_size]
+
+        for name, value in (('text_size', text_size), ('legtext_size', legtext_size), ('leg_pos', leg_pos), ('leg_scale', leg_scale),
+                ('axes', MappingProxyType(axes)), ('legend', MappingProxyType(legend)), ('legend_text', MappingProxyType(legend_text))):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('StyleSheet is immutable, build a new one with style_sheet()')
+
+    @staticmethod
+    def scaled(pos, name, scale):
+        # leg_scale narrows (or widens) the legend while keeping the side it is anchored to
+        if scale is None: return pos
+        x1, y1, x2, y2 = pos
+        if 'right' in name: x1 = x2 - scale * (x2 - x1)
+        elif 'left' in name: x2 = x1 + scale * (x2 - x1)
+        return (x1, y1, x2, y2)
+
+    def entries(self, styles):
+        # Resolves every entry before any is applied, so one bad name leaves all objects untouched
+        return [resolve_entry(**style) for style in styles]
+
+    def apply(self, objs, styles):
+        resolved = self.entries(styles)
+        for obj, entry in zip(objs, resolved): entry.apply(obj)
+
+@functools.lru_cache(maxsize=None)
+def style_sheet(text_size='med', legtext_size=None, leg_pos='upper_right', leg_scale=None):
+    # Sheets are immutable, so plotters with the same settings share one
+    return StyleSheet(text_size, legtext_size, leg_pos, leg_scale)
@@ -0,0 +1,116 @@
+import os
+import re
+import collections
+import numpy as np
+from root_plotting.Utils import hist_input, hist_from_arrays, divide_arrays, xrange_bins
+from root_plotting.Stats import chi2_test, ks_test
+
+METRICS = ('chi2_ndf', 'ks_prob', 'max_dev')
+
+# A pair is flagged when any metric passes its threshold: chi2_ndf and max_dev above it, ks_prob below it; None disables a metric
+DEFAULT_THRESHOLDS = {'chi2_ndf' : 2., 'ks_prob' : .01, 'max_dev' : None}
+
+TriageRecord = collections.namedtuple('TriageRecord', 'name chi2 ndf chi2_ndf ks ks_prob max_dev flagged output')
+
+class Triage():
+    def __init__(self, plotter=None, metric='chi2_ndf', thresholds=None, normalize=False, xrange=None, titles=('Reference', 'Candidate')):
+        # Scores reference/candidate pairs together and only draws the flagged ones with plotter
+        if metric not in METRICS: raise ValueError(f'Unknown metric {metric!r}, expected one of {", ".join(METRICS)}')
+        thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        unknown = set(thresholds) - set(METRICS)
+        if unknown: raise ValueError(f'Unknown threshold(s) {", ".join(sorted(unknown))}, expected {", ".join(METRICS)}')
+        self.plotter = plotter
+        self.metric = metric
+        self.thresholds = thresholds
+        self.normalize = normalize
+        self.xrange = getattr(plotter, 'xrange', None) if xrange is None else xrange
+        self.titles = titles
+
+    def flagged(self, chi2_ndf, ks_prob, max_dev):
+        t = self.thresholds
+        flag = np.zeros(len(chi2_ndf), dtype=bool)
+        if t['chi2_ndf'] is not None: flag |= chi2_ndf > t['chi2_ndf']
+        if t['ks_prob'] is not None: flag |= ks_prob < t['ks_prob']
+        if t['max_dev'] is not None: flag |= max_dev > t['max_dev']
+        return flag
+
+    def score(self, pairs):
+        # pairs: [(name, reference, candidate)] of TH1s or array inputs (see Utils.hist_input).
+        # Pairs with the same number of bins inside xrange are stacked and scored in one pass; returns records ranked worst first
+        groups = collections.defaultdict(list)
+        for name, ref, cand in pairs:
+            e1, c1, w1, _ = hist_input(ref)
+            e2, c2, w2, _ = hist_input(cand)
+            if len(e1)!=len(e2) or not np.allclose(e1, e2): raise ValueError(f'Cannot compare {name}: different binning')
+            sel = xrange_bins(e1, self.xrange)
+            groups[sel.stop - sel.start].append((name, c1[sel], w1[sel], c2[sel], w2[sel]))
+
+        records = []
+        for group in groups.values():
+            names = [g[0] for g in group]
+            c1, w1, c2, w2 = (np.stack([g[i] for g in group]) for i in range(1, 5))
+            fitted = 0
+            if self.normalize:
+                # Candidate scaled to the reference integral, so only shapes are compared; the scale costs one degree of freedom
+                s1, s2 = c1.sum(axis=1), c2.sum(axis=1)
+                scale = np.where(s2 != 0, s1 / np.where(s2 != 0, s2, 1.), 1.)
+                c2 = c2 * scale[:, None]
+                w2 = w2 * (scale**2)[:, None]
+                fitted = (s2 != 0).astype(int)
+
+            chi2, ndf = chi2_test(c1, w1, c2, w2)
+            ndf = np.maximum(ndf - fitted, 0)
+            chi2_ndf = np.where(ndf > 0, chi2 / np.maximum(ndf, 1), 0.)
+            ks, ks_prob = ks_test(c1, w1, c2, w2)
+            r, _ = divide_arrays(c2, w2, c1, w1)
+            max_dev = np.where(c1 != 0, np.abs(r - 1), 0.).max(axis=1, initial=0.)
+            flag = self.flagged(chi2_ndf, ks_prob, max_dev)
+            records.extend(TriageRecord(*fields, None) for fields in zip(names, chi2, ndf, chi2_ndf, ks, ks_prob, max_dev, flag))
+
+        sign = 1 if self.metric=='ks_prob' else -1
+        return sorted(records, key=lambda rec: sign * getattr(rec, self.metric))
+
+    def _plot_input(self, obj, name):
+        # The ROOT backend draws histograms, so array inputs are converted for the pairs that get rendered
+        if hasattr(obj, 'GetNcells') or getattr(self.plotter, 'backend', 'root')!='root': return obj
+        edges, contents, sumw2, title = hist_input(obj)
+        return hist_from_arrays(edges, contents, sumw2, name=self.plotter.unique_name(name), title=title)
+
+    def render(self, records, pairs, save='triage/{name}.png', max_plots=None):
+        # Draws the flagged pairs in rank order; save is formatted with the pair name
+        from root_plotting.MultiHistPlot import MultiHistPlot
+        if self.plotter is None: raise ValueError('Triage needs a plotter to render')
+        inputs = {name : (ref, cand) for name, ref, cand in pairs}
+        out = []
+        rendered = 0
+        for rec in records:
+            if not rec.flagged or (max_plots is not None and rendered >= max_plots):
+                out.append(rec)
+                continue
+            path = save.format(name=re.sub(r'[^\w.-]+', '_', rec.name))
+            if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+            ref, cand = (self._plot_input(obj, f'{rec.name}_{i}') for i, obj in enumerate(inputs[rec.name]))
+            if isinstance(self.plotter, MultiHistPlot):
+                self.plotter.plotHists([ref, cand], ratio=True, titles=list(self.titles), save=path)
+            else:
+                self.plotter.plotHists(ref, cand, ratio=True, h1_title=self.titles[0], h2_title=self.titles[1], save=path)
+            out.append(rec._replace(output=path))
+            rendered += 1
+        return out
+
+    def run(self, pairs, save='triage/{name}.png', max_plots=None):
+        pairs = list(pairs)
+        return self.render(self.score(pairs), pairs, save=save, max_plots=max_plots)
+
+def table(records, limit=None):
+    # Compact text summary, worst first; limit keeps the first rows plus a count of the rest
+    rows = records if limit is None else records[:limit]
+    width = max([len('name')] + [len(r.name) for r in rows])
+    lines = [f'{"rank":>4}  {"name":<{width}}  {"chi2/ndf":>9}  {"ndf":>5}  {"KS prob":>9}  {"max dev":>8}  flag']
+    for i, r in enumerate(rows, 1):
+        lines.append(f'{i:>4}  {r.name:<{width}}  {r.chi2_ndf:>9.3g}  {r.ndf:>5d}  {r.ks_prob:>9.3g}  {r.max_dev:>8.3g}  {"*" if r.flagged else ""}')
+    if len(rows) < len(records): lines.append(f'... {len(records) - len(rows)} more')
+    flagged = sum(bool(r.flagged) for r in records)
+    rendered = sum(r.output is not None for r in records)
+    lines.append(f'{len(records)} pairs, {flagged} flagged, {rendered} rendered')
+    return '\n'.join(lines)
@@ -1,15 +1,189 @@
-from ROOT import TH1F, TH1D
+import numpy as np
+from root_plotting.LazyROOT import TH1D, TH2D
 
-def clone(hist):
-    newhist = TH1F(hist.GetName(),hist.GetTitle(), hist.GetNbinsX(), hist.GetXaxis().GetXmin(),  hist.GetXaxis().GetXmax())
+# Storage type of the TArray base each TH1 flavour inherits its bins from
+_array_dtypes = (
+    ('TArrayD', np.float64),
+    ('TArrayF', np.float32),
+    ('TArrayI', np.int32),
+    ('TArrayS', np.int16),
+    ('TArrayC', np.int8),
+)
+
+def _buffer_view(ptr, n, dtype):
+    # Wrap a C array returned by ROOT without copying it
+    if n == 0: return np.zeros(0, dtype=dtype)
+    ptr.reshape((n,))
+    return np.frombuffer(ptr, dtype=dtype, count=n)
+
+def hist_dtype(hist):
+    import ROOT
+    for array_type, dtype in _array_dtypes:
+        if isinstance(hist, getattr(ROOT, array_type)): return dtype
+    raise TypeError(f'Unsupported histogram storage for {hist.ClassName()}')
+
+def contents_view(hist):
+    # Includes under/overflow cells: index 0 and GetNcells()-1 for 1D
+    return _buffer_view(hist.GetArray(), hist.GetNcells(), hist_dtype(hist))
+
+def sumw2_view(hist, create=False):
+    if hist.GetSumw2N() == 0:
+        if not create: return None
+        hist.Sumw2()
+    return _buffer_view(hist.GetSumw2().GetArray(), hist.GetSumw2N(), np.float64)
+
+def bin_edges(hist, axis='x'):
+    ax = {'x' : hist.GetXaxis, 'y' : hist.GetYaxis, 'z' : hist.GetZaxis}[axis]()
+    nbins = ax.GetNbins()
+    xbins = ax.GetXbins()
+    if xbins.GetSize(): return _buffer_view(xbins.GetArray(), nbins+1, np.float64)
+    return np.linspace(ax.GetXmin(), ax.GetXmax(), nbins+1)
+
+def hist_arrays(hist):
+    # Squared errors fall back to |content| like TH1::GetBinError without Sumw2
+    contents = contents_view(hist)
+    sumw2 = sumw2_view(hist)
+    if sumw2 is None: sumw2 = np.abs(contents.astype(np.float64))
+    return contents, sumw2, bin_edges(hist)
+
+def set_hist_arrays(hist, contents, sumw2=None, entries=None):
+    contents_view(hist)[:] = contents
+    if sumw2 is not None: sumw2_view(hist, create=True)[:] = sumw2
+    hist.ResetStats()
+    if entries is not None: hist.SetEntries(entries)
+
+def clone(hist, name=None):
+    edges = np.ascontiguousarray(bin_edges(hist), dtype=np.float64)
+    newhist = type(hist)(hist.GetName() if name is None else name, hist.GetTitle(), len(edges)-1, edges)
     newhist.Sumw2()
 
     newhist.GetXaxis().SetTitle(hist.GetXaxis().GetTitle())
     newhist.GetYaxis().SetTitle(hist.GetYaxis().GetTitle())
 
-    for ibin in range(hist.GetNbinsX()):
-        newhist.SetBinContent(ibin, hist.GetBinContent(ibin))
-        newhist.SetBinError(ibin, hist.GetBinError(ibin))
-
+    contents, sumw2, _ = hist_arrays(hist)
+    set_hist_arrays(newhist, contents, sumw2, entries=hist.GetEntries())
     return newhist
 
+def hist2d_arrays(hist):
+    # In-range (contents, sumw2, xedges, yedges) of a TH2, cells indexed [ix, iy] like numpy.histogram2d
+    contents, sumw2, xedges = hist_arrays(hist)
+    yedges = bin_edges(hist, 'y')
+    shape = (len(yedges)+1, len(xedges)+1)
+    return contents.reshape(shape)[1:-1, 1:-1].T, sumw2.reshape(shape)[1:-1, 1:-1].T, xedges, yedges
+
+def hist2d_from_arrays(xedges, yedges, contents, sumw2=None, name='h2', title=''):
+    xedges = np.ascontiguousarray(xedges, dtype=np.float64)
+    yedges = np.ascontiguousarray(yedges, dtype=np.float64)
+    hist = TH2D(name, title, len(xedges)-1, xedges, len(yedges)-1, yedges)
+    cells = np.zeros((len(yedges)+1, len(xedges)+1))
+    cells_w2 = np.zeros((len(yedges)+1, len(xedges)+1))
+    cells[1:-1, 1:-1] = np.asarray(contents).T
+    cells_w2[1:-1, 1:-1] = np.abs(cells[1:-1, 1:-1]) if sumw2 is None else np.asarray(sumw2).T
+    set_hist_arrays(hist, cells.ravel(), cells_w2.ravel())
+    return hist
+
+def divide_arrays(c1, w1, c2, w2):
+    # Same content and error propagation as TH1::Divide, empty denominators give 0
+    c1 = np.asarray(c1, dtype=np.float64)
+    c2 = np.asarray(c2, dtype=np.float64)
+    ok = c2 != 0
+    safe = np.where(ok, c2, 1.)
+    ratio = np.where(ok, c1/safe, 0.)
+    err2 = np.where(ok, (w1*c2*c2 + w2*c1*c1)/safe**4, 0.)
+    return ratio, err2
+
+def ratio(h_1, h_2, name=None):
+    r = clone(h_1, name=name)
+    c1, w1, _ = hist_arrays(h_1)
+    c2, w2, _ = hist_arrays(h_2)
+    if len(c1) != len(c2): raise ValueError(f'Cannot divide {h_1.GetName()} and {h_2.GetName()}: different binning')
+    content, err2 = divide_arrays(c1, w1, c2, w2)
+    set_hist_arrays(r, content, err2, entries=h_1.GetEntries())
+    return r
+
+def hist_from_arrays(edges, contents, sumw2=None, name='h', title='', flow=False):
+    # contents/sumw2 cover the in-range bins, or every cell including under/overflow with flow=True
+    edges = np.ascontiguousarray(edges, dtype=np.float64)
+    hist = TH1D(name, title, len(edges)-1, edges)
+    cells = np.zeros(len(edges)+1)
+    cells_w2 = np.zeros(len(edges)+1)
+    inner = slice(None) if flow else slice(1, -1)
+    cells[inner] = contents
+    cells_w2[inner] = np.abs(contents) if sumw2 is None else sumw2
+    set_hist_arrays(hist, cells, cells_w2)
+    return hist
+
+def xrange_bins(edges, xrange=None):
+    # Slice of the in-range bins that overlap xrange
+    if xrange is None: return slice(0, len(edges)-1)
+    lo = max(int(np.searchsorted(edges, xrange[0], 'right'))-1, 0)
+    hi = min(int(np.searchsorted(edges, xrange[1], 'left')), len(edges)-1)
+    return slice(lo, max(hi, lo))
+
+# The plotters reduce a histogram only when it has this many times more bins inside xrange than display bins fit
+LOD_OVERSAMPLE = 4
+
+def lod_groups(edges, max_bins, xrange=None, oversample=1):
+    # First in-range bin of each display group and the end of the last one, None if no reduction is needed:
+    # the in-range bins are grouped into at most max_bins display bins once there are more than oversample*max_bins
+    sel = xrange_bins(edges, xrange)
+    lo, hi = sel.start, sel.stop
+    if hi-lo <= max_bins*oversample: return None
+    step = -(-(hi-lo) // max_bins)
+    return np.arange(lo, hi, step), hi
+
+def lod_arrays(contents, sumw2, edges, starts, stop):
+    # Per-group bin-width weighted mean, its squared error, min and max; contents/sumw2 include the under/overflow cells
+    c = np.asarray(contents[1:stop+1], dtype=np.float64)
+    w2 = sumw2[1:stop+1]
+    widths = np.diff(np.asarray(edges[:stop+1], dtype=np.float64))
+    width = np.add.reduceat(widths, starts)
+    return (np.add.reduceat(c * widths, starts) / width, np.add.reduceat(w2 * widths**2, starts) / width**2,
+            np.minimum.reduceat(c, starts), np.maximum.reduceat(c, starts))
+
+def pad_logy():
+    # Whether the current pad has a logarithmic y axis; False before any pad exists
+    import ROOT
+    return bool(ROOT.gPad) and bool(ROOT.gPad.GetLogy())
+
+def lod_rebin(hist, max_bins, xrange=None, name=None, oversample=1, logy=None):
+    # Display copy with at most max_bins bins inside xrange, made once there are more than oversample*max_bins.
+    # Each bin holds the width-weighted mean of the bins it replaces, so the y scale is unchanged;
+    # (edges, min, max) per group is returned alongside. logy defaults to the current pad's setting
+    contents, sumw2, edges = hist_arrays(hist)
+    groups = lod_groups(edges, max_bins, xrange, oversample)
+    if groups is None: return hist, None
+    starts, stop = groups
+    mean, err2, low, high = lod_arrays(contents, sumw2, edges, starts, stop)
+    lod_edges = np.append(edges[starts], edges[stop])
+
+    disp = hist_from_arrays(lod_edges, mean, err2, name=f'{hist.GetName()}_lod' if name is None else name, title=hist.GetTitle())
+    disp.GetXaxis().SetTitle(hist.GetXaxis().GetTitle())
+    disp.GetYaxis().SetTitle(hist.GetYaxis().GetTitle())
+    disp.SetEntries(hist.GetEntries())
+
+    # Auto y-range follows the envelope so narrow peaks and dips stay inside the frame. The minimum is only pinned
+    # for envelopes reaching zero or below on a linear axis; otherwise ROOT's own minimum (positive on log-y) is kept
+    margin = .05 * (high.max() - min(low.min(), 0))
+    disp.SetMaximum(high.max() + margin)
+    if low.min() <= 0 and not (pad_logy() if logy is None else logy):
+        disp.SetMinimum(low.min() - margin if low.min() < 0 else 0)
+    return disp, (lod_edges, low, high)
+
+def hist_input(obj):
+    # (edges, contents, sumw2, title) over the in-range bins from a TH1, an array dict
+    # {'edges', 'contents', 'sumw2', 'title', 'flow'}, a (contents, edges) / (contents, sumw2, edges) tuple
+    # or a HistStore entry, which is read whole
+    if hasattr(obj, 'GetNcells'):
+        contents, sumw2, edges = hist_arrays(obj)
+        return np.asarray(edges, dtype=np.float64), contents[1:-1].astype(np.float64), np.asarray(sumw2[1:-1], dtype=np.float64), obj.GetTitle()
+    if hasattr(obj, 'load'): obj = obj.load()
+    if isinstance(obj, dict):
+        inner = slice(1, -1) if obj.get('flow') else slice(None)
+        contents = np.asarray(obj['contents'], dtype=np.float64)[inner]
+        sumw2 = np.abs(contents) if obj.get('sumw2') is None else np.asarray(obj['sumw2'], dtype=np.float64)[inner]
+        return np.asarray(obj['edges'], dtype=np.float64), contents, sumw2, obj.get('title', obj.get('name', ''))
+    if len(obj)==2: contents, sumw2, edges = obj[0], None, obj[1]
+    else: contents, sumw2, edges = obj
+    contents = np.asarray(contents, dtype=np.float64)
+    return np.asarray(edges, dtype=np.float64), contents, np.abs(contents) if sumw2 is None else np.asarray(sumw2, dtype=np.float64), ''
@@ -1,3 +1,7 @@
+__version__ = '0.1.0'
+
 from root_plotting.HistPlot import HistPlot
 from root_plotting.MultiHistPlot import MultiHistPlot
 from root_plotting.EfficiencyPlot import EfficiencyPlot
+from root_plotting.EfficiencyMapPlot import EfficiencyMapPlot
+from root_plotting.StackPlot import StackPlot
@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import itertools
+import subprocess
+import numpy as np
+
+from ROOT import gROOT, TH1, TH1D, TEfficiency
+gROOT.SetBatch(True)
+TH1.AddDirectory(False)
+
+from root_plotting.HistPlot import HistPlot
+from root_plotting.MultiHistPlot import MultiHistPlot
+from root_plotting.EfficiencyPlot import EfficiencyPlot
+from root_plotting.Utils import clone, set_hist_arrays
+
+_ids = itertools.count()
+
+def synthetic_hist(nbins, seed):
+    rng = np.random.default_rng(seed)
+    h = TH1D(f'bench_h{next(_ids)}', f'sample {seed}', nbins, 0., 100.)
+    contents = np.zeros(nbins+2)
+    contents[1:-1] = rng.poisson(1000 * np.exp(-np.linspace(0, 5, nbins)) + 10)
+    set_hist_arrays(h, contents, contents.copy(), entries=contents.sum())
+    return h
+
+def synthetic_eff(nbins, seed):
+    rng = np.random.default_rng(seed)
+    total = np.zeros(nbins+2)
+    passed = np.zeros(nbins+2)
+    total[1:-1] = rng.poisson(500, nbins)
+    passed[1:-1] = rng.binomial(total[1:-1].astype(np.int64), 1 / (1 + np.exp(-(np.linspace(0, 100, nbins) - 30) / 5)))
+    h_tot = TH1D(f'bench_t{next(_ids)}', f'sample {seed}', nbins, 0., 100.)
+    h_pass = TH1D(f'bench_p{next(_ids)}', f'sample {seed}', nbins, 0., 100.)
+    set_hist_arrays(h_tot, total, entries=total.sum())
+    set_hist_arrays(h_pass, passed, entries=passed.sum())
+    return TEfficiency(h_pass, h_tot)
+
+def timeit(func, repeat):
+    # Best of `repeat` wall times, the first call also warms up ROOT's JIT
+    func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times), float(np.median(times))
+
+def close_canvases():
+    for c in list(gROOT.GetListOfCanvases()): c.Close()
+
+def run(bins, nhists, formats, repeat, outdir):
+    results = []
+    def record(name, func, **params):
+        best, median = timeit(func, repeat)
+        close_canvases()
+        results.append({'benchmark' : name, 'params' : params, 'best_s' : best, 'median_s' : median, 'repeat' : repeat})
+        print(f'{name:<32} {json.dumps(params):<60} best {best*1e3:9.2f} ms', file=sys.stderr)
+
+    for nbins in bins:
+        h1, h2 = synthetic_hist(nbins, 1), synthetic_hist(nbins, 2)
+        e1, e2 = synthetic_eff(nbins, 1), synthetic_eff(nbins, 2)
+        ep = EfficiencyPlot()
+
+        record('Utils.clone', lambda: clone(h1), nbins=nbins)
+        record('EfficiencyPlot.integrate_eff', lambda: ep.integrate_eff(e1, int_floor=10., int_ceil=90.), nbins=nbins)
+
+        for fmt in formats:
+            save = os.path.join(outdir, f'bench.{fmt}')
+            for ratio in (False, True):
+                hp = HistPlot()
+                record('HistPlot.plotHists', lambda: hp.plotHists(h1, h2, ratio=ratio, save=save), nbins=nbins, ratio=ratio, format=fmt)
+                record('EfficiencyPlot.plotEfficiencies', lambda: ep.plotEfficiencies(e1, e2, ratio=ratio, save=save), nbins=nbins, ratio=ratio, format=fmt)
+                for n in nhists:
+                    hists = [synthetic_hist(nbins, seed) for seed in range(n)]
+                    mhp = MultiHistPlot()
+                    record('MultiHistPlot.plotHists', lambda: mhp.plotHists(hists, ratio=ratio, save=save), nbins=nbins, nhists=n, ratio=ratio, format=fmt)
+    return results
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline, report):
+    # Median time ratio current/baseline for every benchmark present in both reports
+    key = lambda r: (r['benchmark'], json.dumps(r['params'], sort_keys=True))
+    base = {key(r) : r for r in baseline['results']}
+    for r in report['results']:
+        if key(r) not in base: continue
+        ratio = r['median_s'] / base[key(r)]['median_s']
+        print(f"{r['benchmark']:<32} {json.dumps(r['params']):<60} x{ratio:6.2f}", file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the root_plotting hot paths in ROOT batch mode')
+    parser.add_argument('--bins', type=int, nargs='+', default=[100, 10000, 100000])
+    parser.add_argument('--nhists', type=int, nargs='+', default=[2, 8, 32])
+    parser.add_argument('--formats', nargs='+', default=['png', 'pdf'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=None, help='JSON output file (default: stdout)')
+    parser.add_argument('--compare', default=None, help='Previous JSON report to compare against')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as outdir:
+        results = run(args.bins, args.nhists, args.formats, args.repeat, outdir)
+
+    from root_plotting import __version__
+    report = {'version' : __version__, 'commit' : git_commit(), 'python' : sys.version.split()[0], 'results' : results}
+    if args.output:
+        with open(args.output, 'w') as f: json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    if args.compare:
+        with open(args.compare) as f: compare(json.load(f), report)
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import importlib.util
+
+# The repository is the root_plotting package itself; load it under that name when it is checked out as another directory
+if importlib.util.find_spec('root_plotting') is None:
+    pkg = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    spec = importlib.util.spec_from_file_location('root_plotting', os.path.join(pkg, '__init__.py'), submodule_search_locations=[pkg])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['root_plotting'] = module
+    spec.loader.exec_module(module)
+
+import types
+import pytest
+
+class FakeGlobals():
+    def __init__(self):
+        self.batch = False
+        self.canvases = []
+
+    def IsBatch(self):
+        return self.batch
+
+    def SetBatch(self, batch=True):
+        self.batch = batch
+
+    def GetListOfCanvases(self):
+        return list(self.canvases)
+
+class FakeTH1():
+    add_directory = True
+
+    @classmethod
+    def AddDirectory(cls, status=True):
+        cls.add_directory = status
+
+    @classmethod
+    def AddDirectoryStatus(cls):
+        return cls.add_directory
+
+class FakeFile():
+    def __init__(self, objects):
+        self.objects = objects
+        self.closed = False
+
+    def IsZombie(self):
+        return False
+
+    def Get(self, path):
+        return self.objects.get(path)
+
+    def Close(self):
+        self.closed = True
+
+@pytest.fixture
+def fake_root(monkeypatch):
+    # Stand-in ROOT module holding the global state the batch tools touch, for the tests that run without ROOT.
+    # Files are {path: {object path: object}} in root.files; TFile.Open returns None for other paths
+    root = types.ModuleType('ROOT')
+    root.gROOT = FakeGlobals()
+    monkeypatch.setattr(FakeTH1, 'add_directory', True)
+    root.TH1 = FakeTH1
+    root.files = {}
+    root.opened = []
+    def open_file(path):
+        root.opened.append(path)
+        return FakeFile(root.files[path]) if path in root.files else None
+    root.TFile = types.SimpleNamespace(Open=open_file)
+    monkeypatch.setitem(sys.modules, 'ROOT', root)
+    return root
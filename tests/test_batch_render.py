@@ -0,0 +1,51 @@
+import sys
+import pytest
+from root_plotting.BatchRender import PlotJob, PlotResult, render_batch
+
+class DummyPlotter():
+    # Records the ROOT state each plot sees; fails on request
+    seen = []
+
+    def __init__(self, init_params=None):
+        self.params = init_params
+
+    def plot(self, value, save=None):
+        from ROOT import gROOT, TH1
+        if value=='fail': raise RuntimeError('bad input')
+        self.seen.append((value, gROOT.IsBatch(), TH1.AddDirectoryStatus()))
+
+@pytest.fixture
+def dummy(monkeypatch, fake_root):
+    batch_render = sys.modules['root_plotting.BatchRender']
+    monkeypatch.setattr(batch_render, 'plotter_class', lambda name: DummyPlotter)
+    monkeypatch.setattr(DummyPlotter, 'seen', [])
+    return DummyPlotter.seen
+
+def test_plot_job_name_defaults_to_save():
+    assert PlotJob('HistPlot', 'plotHist', kwargs={'save' : 'a.png'}).name=='a.png'
+    assert PlotJob('HistPlot', 'plotHist', kwargs={'save' : 'a.png'}, name='a').name=='a'
+
+def test_in_process_uses_worker_setup_and_restores_it(dummy, fake_root):
+    results = render_batch([PlotJob('Dummy', 'plot', args=(1,), kwargs={'save' : 'a.png'}), {'plotter' : 'Dummy', 'method' : 'plot', 'args' : (2,)}], workers=1)
+    assert [(r.name, r.ok, r.output) for r in results]==[('a.png', True, 'a.png'), (None, True, None)]
+    assert dummy==[(1, True, False), (2, True, False)]
+    # The caller's own settings are back
+    assert fake_root.gROOT.IsBatch() is False
+    assert fake_root.TH1.AddDirectoryStatus() is True
+
+def test_in_process_restores_state_after_failures(dummy, fake_root):
+    fake_root.gROOT.SetBatch(True)
+    results = render_batch([PlotJob('Dummy', 'plot', args=('fail',), name='bad'), PlotJob('Dummy', 'plot', args=(3,), name='good')], workers=1)
+    assert not results[0].ok and 'bad input' in results[0].error
+    assert isinstance(results[1], PlotResult) and results[1].ok
+    assert fake_root.gROOT.IsBatch() is True
+    assert fake_root.TH1.AddDirectoryStatus() is True
+
+def test_pool_reports_per_job(dummy, fake_root):
+    # fork keeps the stand-in ROOT and the dummy plotter in the workers
+    mp = pytest.importorskip('multiprocessing')
+    if 'fork' not in mp.get_all_start_methods(): pytest.skip('needs the fork start method')
+    jobs = [PlotJob('Dummy', 'plot', args=(v,), name=str(v)) for v in (1, 'fail', 2)]
+    results = render_batch(jobs, workers=2, start_method='fork')
+    assert [(r.name, r.ok) for r in results]==[('1', True), ('fail', False), ('2', True)]
+    assert fake_root.gROOT.IsBatch() is False
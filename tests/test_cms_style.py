@@ -0,0 +1,54 @@
+import sys
+import pytest
+from root_plotting.HistPlot import HistPlot
+
+class FakeStyle():
+    def __init__(self, root, name):
+        self.root = root
+        self.name = name
+
+    def GetName(self):
+        return self.name
+
+    def cd(self):
+        self.root.gStyle = self
+
+@pytest.fixture
+def styles(monkeypatch, fake_root):
+    # Named styles with ROOT's current-style pointer; setTDRStyle() makes a new current style like the macro does
+    plot_base = sys.modules['root_plotting.PlotBase']
+    monkeypatch.setattr(plot_base, '_macros_loaded', True)
+    monkeypatch.setattr(plot_base, '_tdr_style', None)
+    table = {'Modern' : FakeStyle(fake_root, 'Modern')}
+    fake_root.gStyle = table['Modern']
+    fake_root.gROOT.GetStyle = table.get
+    def process_line(line):
+        assert line=='setTDRStyle();'
+        table['tdrStyle'] = FakeStyle(fake_root, 'tdrStyle')
+        table['tdrStyle'].cd()
+    fake_root.gROOT.ProcessLine = process_line
+    return fake_root
+
+class Recorder(HistPlot):
+    def draw(self):
+        from ROOT import gStyle
+        return gStyle.GetName()
+
+@pytest.mark.parametrize('cms', [True, False])
+def test_style_is_restored_after_the_plot(styles, cms):
+    plot = sys.modules['root_plotting.PlotBase'].styled_plot(Recorder.draw)
+    assert plot(Recorder({'cms_style' : cms}))==('tdrStyle' if cms else 'Modern')
+    assert styles.gStyle.GetName()=='Modern'
+
+def test_style_is_restored_on_errors(styles):
+    def fail(self):
+        raise RuntimeError('draw failed')
+    with pytest.raises(RuntimeError):
+        sys.modules['root_plotting.PlotBase'].styled_plot(fail)(HistPlot({'cms_style' : True}))
+    assert styles.gStyle.GetName()=='Modern'
+
+def test_tdr_style_is_built_once(styles):
+    tdr_style = sys.modules['root_plotting.PlotBase'].tdr_style
+    first = tdr_style()
+    assert tdr_style() is first
+    assert styles.gStyle.GetName()=='Modern'
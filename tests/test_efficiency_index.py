@@ -0,0 +1,30 @@
+import pytest
+np = pytest.importorskip('numpy')
+from root_plotting.EfficiencyIndex import EfficiencyIndex
+
+def brute_force(low_edges, floor, ceil):
+    # Bins whose low edge lies in [floor, ceil], as integrate_eff has always selected them
+    return (low_edges >= floor) & (low_edges <= ceil)
+
+def test_integrate_against_brute_force():
+    rng = np.random.default_rng(4)
+    edges = np.concatenate(([0.], np.cumsum(rng.uniform(.5, 3., 60))))
+    total = rng.integers(0, 50, 60).astype(float)
+    passed = np.floor(total * rng.uniform(0, 1, 60))
+    index = EfficiencyIndex(passed, total, edges)
+    floors = np.concatenate((rng.uniform(-10, edges[-1] + 10, 200), edges[:10], [edges[0]]))
+    ceils = np.concatenate((rng.uniform(-10, edges[-1] + 10, 200), edges[5:15], [edges[-2]]))
+    num, den = index.integrate(floors, ceils)
+    for k, (floor, ceil) in enumerate(zip(floors, ceils)):
+        sel = brute_force(edges[:-1], floor, ceil)
+        assert num[k]==passed[sel].sum()
+        assert den[k]==total[sel].sum()
+
+def test_integrate_scalar_and_empty_range():
+    index = EfficiencyIndex(np.array([1., 2., 3.]), np.array([2., 4., 6.]), np.array([0., 10., 20., 30.]))
+    assert index.integrate(0., 20.)==(6., 12.)
+    assert index.integrate(15., 5.)==(0., 0.)          # ceil below floor
+    assert index.integrate(50., 60.)==(0., 0.)
+    eff, err_low, err_up = index.efficiency(0., 99999.)
+    assert eff==pytest.approx(.5)
+    assert err_low==pytest.approx(np.sqrt(.25/12))
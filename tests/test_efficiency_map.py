@@ -0,0 +1,24 @@
+import pytest
+np = pytest.importorskip('numpy')
+from root_plotting.EfficiencyIndex import EfficiencyIndex2D
+
+def brute_force(low_edges, floor, ceil):
+    return (low_edges >= floor) & (low_edges <= ceil)
+
+def test_integrate_2d_against_brute_force():
+    rng = np.random.default_rng(5)
+    xedges = np.concatenate(([0.], np.cumsum(rng.uniform(1., 5., 25))))
+    yedges = np.linspace(-2.5, 2.5, 11)
+    total = rng.integers(0, 30, (25, 10)).astype(float)
+    passed = np.floor(total * rng.uniform(0, 1, (25, 10)))
+    index = EfficiencyIndex2D(passed, total, xedges, yedges)
+    n = 100
+    x_floors, x_ceils = rng.uniform(-5, xedges[-1], n), rng.uniform(0, xedges[-1] + 5, n)
+    y_floors, y_ceils = rng.uniform(-3, 2, n), rng.uniform(-2, 3, n)
+    num, den = index.integrate(x_floors, x_ceils, y_floors, y_ceils)
+    for k in range(n):
+        cells = np.outer(brute_force(xedges[:-1], x_floors[k], x_ceils[k]), brute_force(yedges[:-1], y_floors[k], y_ceils[k]))
+        assert num[k]==passed[cells].sum()
+        assert den[k]==total[cells].sum()
+    num, den = index.integrate(xedges[0], xedges[-2], yedges[0], yedges[-2])
+    assert (num, den)==(passed.sum(), total.sum())
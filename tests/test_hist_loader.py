@@ -0,0 +1,92 @@
+import sys
+import pytest
+np = pytest.importorskip('numpy')
+from concurrent.futures import ThreadPoolExecutor
+from root_plotting.HistLoader import HistLoader, FilePool
+
+class FakeHist():
+    # Picklable stand-in carrying its cells (under/overflow included) and edges
+    def __init__(self, name, contents, edges):
+        self.name = name
+        self.contents = np.asarray(contents, dtype=np.float64)
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.directory = 'file'
+
+    def GetName(self):
+        return self.name
+
+    def GetTitle(self):
+        return self.name
+
+    def SetDirectory(self, directory):
+        self.directory = directory
+
+@pytest.fixture
+def files(monkeypatch, fake_root, tmp_path):
+    # Five files holding 'pt' with contents i+1 in every cell; the files exist so they can be globbed
+    monkeypatch.setattr(sys.modules['root_plotting.Utils'], 'hist_arrays', lambda h: (h.contents, h.contents * 2, h.edges))
+    fake_root.SetOwnership = lambda obj, owned: None
+    paths = []
+    for i in range(5):
+        path = str(tmp_path / f'run{i}.root')
+        open(path, 'w').close()
+        fake_root.files[path] = {'pt' : FakeHist('pt', np.full(5, i + 1.), [0., 1., 2., 3.]), 'fine' : FakeHist('fine', np.ones(6), [0., .5, 1., 2., 3.])}
+        paths.append(path)
+    return paths
+
+def test_file_pool_closes_least_recently_used(fake_root, files):
+    pool = FilePool(max_open=2)
+    a, b = pool.get(files[0]), pool.get(files[1])
+    assert pool.get(files[0]) is a
+    pool.get(files[2])
+    assert b.closed and not a.closed and list(pool.files)==[files[0], files[2]]
+    with pytest.raises(IOError):
+        pool.get('missing.root')
+    pool.close()
+    assert a.closed and not pool.files
+
+def test_load(files, tmp_path):
+    with HistLoader(workers=1) as loader:
+        hists = loader.load([(str(tmp_path / 'run[01].root'), 'pt'), (files[1], 'fine')])
+        assert list(hists)==[(files[0], 'pt'), (files[1], 'pt'), (files[1], 'fine')]
+        assert hists[(files[1], 'pt')].directory==0
+        arrays = loader.load([(files[2], 'pt')], as_arrays=True)[(files[2], 'pt')]
+        assert arrays['flow'] and arrays['name']=='pt' and np.array_equal(arrays['sumw2'], np.full(5, 6.))
+        with pytest.raises(KeyError):
+            loader.get(files[0], 'eta')
+        with pytest.raises(IOError):
+            loader.load([(str(tmp_path / 'other*.root'), 'pt')])
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_merge_arrays(files, tmp_path, workers):
+    # fork keeps the stand-in ROOT and the patched Utils in the workers
+    mp = pytest.importorskip('multiprocessing')
+    if workers > 1 and 'fork' not in mp.get_all_start_methods(): pytest.skip('needs the fork start method')
+    with HistLoader(workers=workers, chunk_files=2, start_method='fork') as loader:
+        totals = loader.merge(str(tmp_path / 'run*.root'), ['pt', 'fine'], as_arrays=True)
+        assert np.array_equal(totals['pt']['contents'], np.full(5, 15.))
+        assert np.array_equal(totals['pt']['sumw2'], np.full(5, 30.))
+        assert np.array_equal(totals['fine']['contents'], np.full(6, 5.))
+        # The inputs are not modified by the running sum
+        assert np.array_equal(sys.modules['ROOT'].files[files[0]]['pt'].contents, np.ones(5))
+
+def test_merge_rejects_different_binning(files, fake_root):
+    fake_root.files[files[3]]['pt'] = FakeHist('pt', np.ones(4), [0., 1., 3.])
+    with HistLoader(workers=1) as loader:
+        with pytest.raises(ValueError):
+            loader.merge(files, 'pt', as_arrays=True)
+
+def test_completed_bounds_tasks_in_flight():
+    loader = HistLoader(workers=2)
+    loader.pool = ThreadPoolExecutor(2)
+    pulled = []
+    def tasks():
+        for i in range(20):
+            pulled.append(i)
+            yield (i,)
+    results = []
+    for r in loader.completed(lambda i: i * i, tasks()):
+        assert len(pulled) - len(results) <= 2 * loader.workers
+        results.append(r)
+    loader.close()
+    assert sorted(results)==[i * i for i in range(20)]
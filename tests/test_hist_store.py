@@ -0,0 +1,83 @@
+import pytest
+np = pytest.importorskip('numpy')
+from root_plotting.HistStore import HistStore, HistStoreWriter
+from root_plotting.EffArrays import EffArrays
+
+EDGES = np.linspace(0., 100., 51)
+
+@pytest.fixture
+def store(tmp_path):
+    rng = np.random.default_rng(6)
+    contents = rng.uniform(0, 100, 50)
+    total = rng.integers(1, 100, 50).astype(float)
+    items = {
+        'pt'     : (contents, contents * 2, EDGES),
+        'pt_new' : {'edges' : EDGES, 'contents' : contents + 1, 'sumw2' : contents, 'title' : 'New'},
+        'coarse' : (np.arange(5.), np.linspace(0, 10, 6)),
+        'eff'    : EffArrays(np.floor(total / 2), total, EDGES, title='Trigger'),
+    }
+    HistStore.write(str(tmp_path), items)
+    return HistStore(str(tmp_path)), items
+
+def test_round_trip(store):
+    s, items = store
+    assert len(s)==4 and 'pt' in s and 'missing' not in s
+    assert sorted(s.names('hist'))==['coarse', 'pt', 'pt_new']
+    a = s.arrays('pt')
+    np.testing.assert_array_equal(a['edges'], EDGES)
+    np.testing.assert_array_equal(a['contents'], items['pt'][0])
+    np.testing.assert_array_equal(a['sumw2'], items['pt'][1])
+    a = s.arrays('pt_new')
+    assert a['title']=='New'
+    np.testing.assert_array_equal(a['contents'], items['pt_new']['contents'])
+    a = s.arrays('coarse')
+    np.testing.assert_array_equal(a['sumw2'], np.arange(5.))        # sumw2 defaults to the contents
+    e = s.efficiency('eff')
+    assert e.title=='Trigger'
+    np.testing.assert_array_equal(e.passed, items['eff'].passed)
+    np.testing.assert_array_equal(e.total, items['eff'].total)
+    np.testing.assert_array_equal(e.edges, EDGES)
+
+def test_shared_edges(store):
+    s, _ = store
+    assert s.index['pt']['edges']==s.index['pt_new']['edges']==s.index['eff']['edges']
+    assert s.index['coarse']['edges']!=s.index['pt']['edges']
+
+@pytest.mark.parametrize('xrange, sel', [
+    ((20., 40.), slice(10, 20)),
+    ((21., 39.), slice(10, 20)),        # partial bins at both ends are read
+    ((-10., 5.), slice(0, 3)),
+    ((90., 500.), slice(45, 50)),
+    ((200., 300.), slice(50, 50)),
+])
+def test_xrange_slicing(store, xrange, sel):
+    s, items = store
+    a = s.arrays('pt', xrange=xrange)
+    np.testing.assert_array_equal(a['contents'], items['pt'][0][sel])
+    np.testing.assert_array_equal(a['sumw2'], items['pt'][1][sel])
+    np.testing.assert_array_equal(a['edges'], EDGES[sel.start:sel.stop+1])
+    e = s.efficiency('eff', xrange=xrange)
+    np.testing.assert_array_equal(e.total, items['eff'].total[sel])
+    assert len(s['pt'].load(xrange)['contents'])==sel.stop - sel.start
+
+def test_append_and_errors(store):
+    s, items = store
+    with HistStoreWriter(s.path, append=True) as writer:
+        writer.add('extra', (np.ones(50), EDGES))
+        with pytest.raises(KeyError): writer.add('pt', items['pt'])
+    s = HistStore(s.path)
+    assert len(s)==5
+    np.testing.assert_array_equal(s.arrays('pt')['contents'], items['pt'][0])
+    np.testing.assert_array_equal(s.arrays('extra')['contents'], np.ones(50))
+    with pytest.raises(KeyError): s['missing']
+    with pytest.raises(ValueError): s.efficiency('pt')
+
+def test_hist_round_trip(store):
+    pytest.importorskip('ROOT')
+    from root_plotting.Utils import hist_arrays
+    s, items = store
+    h = s.hist('pt', xrange=(20., 40.), hist_name='store_pt')
+    contents, sumw2, edges = hist_arrays(h)
+    np.testing.assert_array_equal(contents[1:-1], items['pt'][0][10:20])
+    np.testing.assert_array_equal(sumw2[1:-1], items['pt'][1][10:20])
+    np.testing.assert_array_equal(edges, EDGES[10:21])
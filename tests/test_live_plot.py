@@ -0,0 +1,55 @@
+import pytest
+np = pytest.importorskip('numpy')
+from root_plotting.MultiHistPlot import MultiHistPlot
+from root_plotting.LivePlot import LivePlot
+
+def test_needs_root_backend(monkeypatch):
+    plotter = MultiHistPlot({'backend' : 'matplotlib'})
+    monkeypatch.setattr(plotter, 'array_backend', lambda: object())
+    with pytest.raises(ValueError, match='needs the ROOT backend'):
+        LivePlot(plotter, [])
+
+@pytest.fixture
+def ROOT():
+    ROOT = pytest.importorskip('ROOT')
+    ROOT.gROOT.SetBatch(True)
+    return ROOT
+
+def hists(nbins, name):
+    from root_plotting.Utils import hist_from_arrays
+    edges = np.linspace(0., 10., nbins + 1)
+    return [hist_from_arrays(edges, np.full(nbins, 10.), name=f'{name}_ref'), hist_from_arrays(edges, np.full(nbins, 5.), name=f'{name}_run')]
+
+def contents(h):
+    return np.array([h.GetBinContent(i) for i in range(1, h.GetNbinsX() + 1)])
+
+def test_update_refills_in_place(ROOT):
+    live = LivePlot(MultiHistPlot(), hists(10, 'live'), ratio=True)
+    canvas, drawn_hists, ratio = live.canvas, list(live.drawn['hists']), live.drawn['ratios'][0]
+    live.update([np.full(10, 10.), (np.full(10, 40.), np.full(10, 40.))])
+    # Same objects, new contents, ratios recomputed and the y range grown to fit
+    assert live.canvas is canvas and all(a is b for a, b in zip(live.drawn['hists'], drawn_hists)) and live.updates==1
+    np.testing.assert_allclose(contents(drawn_hists[1]), 40.)
+    np.testing.assert_allclose(contents(ratio), .25)
+    assert drawn_hists[0].GetMaximum() >= 40.
+    # A TH1 with every cell works too
+    live.update([hists(10, 'live_next')[0], np.concatenate(([0.], np.full(10, 20.), [0.]))], repaint=False)
+    np.testing.assert_allclose(contents(ratio), .5)
+
+def test_update_checks_inputs(ROOT):
+    live = LivePlot(MultiHistPlot(), hists(10, 'live_check'))
+    with pytest.raises(ValueError):
+        live.update([np.ones(10)])
+    with pytest.raises(ValueError):
+        live.update([np.ones(10), np.ones(11)])
+
+def test_update_refills_lod_copies(ROOT):
+    # 20000 bins on an 800 px canvas are drawn reduced; updates refill the reduced copies and the envelopes
+    live = LivePlot(MultiHistPlot(), hists(20000, 'live_lod'), ratio=True)
+    disp, band = live.drawn['hists'][1], live.drawn['bands'][1]
+    assert live.groups is not None and disp.GetNbinsX() < 20000 and band is not None
+    new = np.tile([2., 6.], 10000)
+    live.update([np.full(20000, 10.), new])
+    np.testing.assert_allclose(contents(disp), 4.)
+    np.testing.assert_allclose(np.frombuffer(band.GetEYhigh(), dtype=np.float64, count=band.GetN()), 2.)
+    np.testing.assert_allclose(contents(live.drawn['ratios'][0]), 2.5)
@@ -0,0 +1,113 @@
+import pytest
+np = pytest.importorskip('numpy')
+from root_plotting.Utils import xrange_bins, lod_groups, lod_arrays
+
+EDGES = np.array([0., 1., 2., 5., 10.])
+
+@pytest.mark.parametrize('xrange, expected', [
+    (None, slice(0, 4)),
+    ((0., 10.), slice(0, 4)),
+    ((1., 5.), slice(1, 3)),            # bounds on edges: only the bins inside
+    ((1.5, 6.), slice(1, 4)),           # partial bins at both ends are included
+    ((-5., .5), slice(0, 1)),
+    ((-5., -1.), slice(0, 0)),          # entirely below the axis
+    ((20., 30.), slice(4, 4)),          # entirely above the axis
+    ((3., 3.), slice(2, 3)),            # a point selects the bin containing it
+])
+def test_xrange_bins(xrange, expected):
+    assert xrange_bins(EDGES, xrange)==expected
+
+def test_lod_groups_no_reduction():
+    edges = np.linspace(0, 10, 11)
+    assert lod_groups(edges, 10) is None
+    assert lod_groups(edges, 100) is None
+    assert lod_groups(edges, 3, xrange=(0, 3)) is None
+    # With oversampling only histograms with more than oversample*max_bins bins are reduced
+    assert lod_groups(edges, 3, oversample=4) is None
+    assert lod_groups(edges, 2, oversample=4) is not None
+
+def test_lod_groups():
+    edges = np.linspace(0, 100, 101)
+    starts, stop = lod_groups(edges, 10)
+    np.testing.assert_array_equal(starts, np.arange(0, 100, 10))
+    assert stop==100
+    # Uneven split: ceil(100/7)=15 bins per group, the last group is shorter
+    starts, stop = lod_groups(edges, 7)
+    np.testing.assert_array_equal(starts, np.arange(0, 100, 15))
+    assert len(starts) <= 7
+    starts, stop = lod_groups(edges, 5, xrange=(20, 40))
+    np.testing.assert_array_equal(starts, np.arange(20, 40, 4))
+    assert stop==40
+
+def test_lod_arrays_against_loop():
+    rng = np.random.default_rng(2)
+    nbins = 103
+    cells = np.concatenate(([7.], rng.uniform(0, 10, nbins), [9.]))
+    cells_w2 = np.concatenate(([7.], rng.uniform(0, 5, nbins), [9.]))
+    edges = np.arange(nbins + 1.)
+    starts, stop = lod_groups(edges, 10, xrange=(5, 90))
+    mean, err2, low, high = lod_arrays(cells, cells_w2, edges, starts, stop)
+    bounds = list(starts) + [stop]
+    for k in range(len(starts)):
+        # Bin i sits in cell i+1, after the underflow
+        group = cells[bounds[k]+1:bounds[k+1]+1]
+        group_w2 = cells_w2[bounds[k]+1:bounds[k+1]+1]
+        assert mean[k]==pytest.approx(group.mean())
+        assert err2[k]==pytest.approx(group_w2.sum() / len(group)**2)
+        assert low[k]==group.min()
+        assert high[k]==group.max()
+
+def test_lod_arrays_weights_bin_widths():
+    # Variable binning: a wide bin counts for as much as the narrow bins covering the same range
+    cells = np.array([0., 1., 1., 4., 2., 0.])
+    cells_w2 = np.array([0., 1., 1., 4., 1., 0.])
+    edges = np.array([0., 1., 2., 4., 8.])
+    mean, err2, low, high = lod_arrays(cells, cells_w2, edges, np.array([0, 2]), 4)
+    np.testing.assert_allclose(mean, [1., (4*2 + 2*4) / 6])
+    np.testing.assert_allclose(err2, [2 / 4, (4*4 + 1*16) / 36])
+    np.testing.assert_array_equal(low, [1., 2.])
+    np.testing.assert_array_equal(high, [1., 4.])
+
+def fine_hist(name, nbins, offset=1.5):
+    from root_plotting.Utils import hist_from_arrays
+    edges = np.linspace(0., 100., nbins + 1)
+    return hist_from_arrays(edges, offset + np.sin(edges[1:]), name=name)
+
+def test_plots_reduce_only_very_fine_histograms():
+    ROOT = pytest.importorskip('ROOT')
+    from root_plotting.HistPlot import HistPlot
+    from root_plotting.MultiHistPlot import MultiHistPlot
+    ROOT.gROOT.SetBatch(True)
+    # 800 px canvas: 640 display bins fit, so 2000 bins are drawn as they are and 20000 are reduced
+    def drawn(c):
+        prims = list(c.GetListOfPrimitives())
+        return [p for p in prims if p.InheritsFrom('TH1')][0], [p for p in prims if p.InheritsFrom('TGraphAsymmErrors')]
+    hp = HistPlot()
+    hist, bands = drawn(hp.plotHist(fine_hist('lod_coarse', 2000)))
+    assert hist.GetNbinsX()==2000 and not bands
+    hist, bands = drawn(hp.plotHist(fine_hist('lod_fine', 20000)))
+    assert hist.GetNbinsX() <= 640 and len(bands)==1
+    assert hist.GetMinimumStored()==-1111       # positive envelope: ROOT chooses the minimum
+
+    mp = MultiHistPlot()
+    mp.plotHists([fine_hist('lod_a', 20000), fine_hist('lod_b', 20000, offset=2.)], ratio=True)
+    hists, ratios = mp._drawn['hists'], mp._drawn['ratios']
+    assert hists[0].GetNbinsX()==hists[1].GetNbinsX()==ratios[0].GetNbinsX() <= 640
+    assert all(band is not None for band in mp._drawn['bands'])
+    mp.set_params({'lod_pixels' : None})
+    mp.plotHists([fine_hist('lod_c', 20000)])
+    assert mp._drawn['hists'][0].GetNbinsX()==20000
+
+def test_lod_rebin_keeps_log_minimum():
+    ROOT = pytest.importorskip('ROOT')
+    from root_plotting.Utils import lod_rebin
+    ROOT.gROOT.SetBatch(True)
+    c = ROOT.TCanvas('lod_log', '', 400, 400)
+    h = fine_hist('lod_log_h', 1000, offset=0.)
+    disp, _ = lod_rebin(h, 50, logy=False)
+    assert disp.GetMinimumStored() < 0
+    c.SetLogy()
+    c.cd()
+    disp, _ = lod_rebin(h, 50)
+    assert disp.GetMinimumStored()==-1111
+    c.Close()
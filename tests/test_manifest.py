@@ -0,0 +1,106 @@
+import sys
+import json
+import pytest
+pytest.importorskip('numpy')
+from root_plotting.Manifest import Manifest, plot_name
+
+class FakeHist():
+    # Picklable stand-in for a histogram read from a file
+    def __init__(self, name):
+        self.name = name
+        self.directory = 'file'
+
+    def GetName(self):
+        return self.name
+
+    def InheritsFrom(self, cls):
+        return cls=='TH1'
+
+    def SetDirectory(self, directory):
+        self.directory = directory
+
+class DummyPlotter():
+    def __init__(self, init_params=None):
+        self.params = init_params
+
+    def plot(self, *hists, save=None):
+        if any(h=='fail' for h in hists): raise RuntimeError('bad input')
+
+@pytest.fixture
+def dummy(monkeypatch, fake_root):
+    monkeypatch.setattr(sys.modules['root_plotting.BatchRender'], 'plotter_class', lambda name: DummyPlotter)
+    fake_root.files = {'/data/a.root' : {'pt' : FakeHist('pt'), 'eta' : FakeHist('eta')}, '/data/b.root' : {'pt' : FakeHist('pt')}}
+    return fake_root
+
+def manifest(plots, inputs=None):
+    inputs = inputs or {'a_pt' : {'file' : 'a.root', 'path' : 'pt'}, 'a_eta' : {'file' : 'a.root', 'path' : 'eta'}, 'b_pt' : {'file' : 'b.root', 'path' : 'pt'}}
+    return Manifest(inputs, plots, base_dir='/data')
+
+def test_plot_name():
+    assert plot_name({'name' : 'pt', 'save' : 'pt.png'})=='pt'
+    assert plot_name({'save' : ['pt.png', 'pt.pdf']})=='pt.png'
+    assert plot_name({'save' : 'pt.png'})=='pt.png'
+
+def test_validation():
+    with pytest.raises(ValueError):
+        manifest([{'plotter' : 'Dummy', 'save' : 'a.png'}, {'plotter' : 'Dummy', 'save' : ['a.png', 'a.pdf']}])
+    with pytest.raises(KeyError):
+        manifest([{'plotter' : 'Dummy', 'inputs' : ['c_pt'], 'save' : 'a.png'}])
+    with pytest.raises(KeyError):
+        manifest([{'plotter' : 'Dummy', 'depends' : ['b.png'], 'save' : 'a.png'}])
+
+def test_graph_shares_reads():
+    graph = manifest([
+        {'name' : 'pt', 'plotter' : 'Dummy', 'inputs' : [['a_pt', 'b_pt']]},
+        {'name' : 'eta', 'plotter' : 'Dummy', 'inputs' : ['a_eta', 'a_pt'], 'depends' : ['pt']},
+    ]).graph()
+    assert graph[('read', ('/data/a.root', 'pt'))]=={('file', '/data/a.root')}
+    assert graph[('plot', 'pt')]=={('read', ('/data/a.root', 'pt')), ('read', ('/data/b.root', 'pt'))}
+    assert graph[('plot', 'eta')]=={('read', ('/data/a.root', 'eta')), ('read', ('/data/a.root', 'pt')), ('plot', 'pt')}
+    assert sum(kind=='file' for kind, _ in graph)==2
+
+def test_load_json(tmp_path):
+    path = tmp_path / 'plots.json'
+    path.write_text(json.dumps({'inputs' : {'pt' : {'file' : 'a.root', 'path' : 'pt'}}, 'plots' : [{'plotter' : 'HistPlot', 'inputs' : ['pt'], 'save' : 'pt.png'}]}))
+    m = Manifest.load(str(path))
+    assert m.base_dir==str(tmp_path) and m._file('pt')==str(tmp_path / 'a.root')
+
+def test_run_opens_each_file_once(dummy):
+    results = manifest([
+        {'name' : 'pt', 'plotter' : 'Dummy', 'method' : 'plot', 'inputs' : [['a_pt', 'b_pt']], 'save' : 'pt.png'},
+        {'name' : 'eta', 'plotter' : 'Dummy', 'method' : 'plot', 'inputs' : ['a_eta', 'a_pt'], 'depends' : ['pt']},
+    ]).run()
+    assert [(r.name, r.ok, r.output) for r in results]==[('pt', True, 'pt.png'), ('eta', True, None)]
+    assert sorted(dummy.opened)==['/data/a.root', '/data/b.root']
+    assert dummy.files['/data/a.root']['pt'].directory==0
+
+def test_failures_propagate(dummy):
+    inputs = {'a_pt' : {'file' : 'a.root', 'path' : 'pt'}, 'missing' : {'file' : 'a.root', 'path' : 'phi'}, 'gone' : {'file' : 'c.root', 'path' : 'pt'}}
+    results = manifest([
+        {'name' : 'ok', 'plotter' : 'Dummy', 'method' : 'plot', 'inputs' : ['a_pt']},
+        {'name' : 'phi', 'plotter' : 'Dummy', 'method' : 'plot', 'inputs' : ['missing']},
+        {'name' : 'c', 'plotter' : 'Dummy', 'method' : 'plot', 'inputs' : ['gone']},
+        {'name' : 'after', 'plotter' : 'Dummy', 'method' : 'plot', 'inputs' : ['a_pt'], 'depends' : ['ok', 'phi']},
+    ], inputs).run()
+    errors = {r.name : r.error for r in results}
+    assert [r.ok for r in results]==[True, False, False, False]
+    assert errors['phi']=="Input 'missing': phi not found in /data/a.root"
+    assert errors['c']=="Input 'gone': Cannot open /data/c.root"
+    assert errors['after']=="Dependency 'phi' failed"
+
+def test_pool_serves_ready_plots(dummy, monkeypatch):
+    # fork keeps the stand-in ROOT and the dummy plotter in the workers; one pool for the whole run
+    mp = pytest.importorskip('multiprocessing')
+    if 'fork' not in mp.get_all_start_methods(): pytest.skip('needs the fork start method')
+    manifest_module = sys.modules['root_plotting.Manifest']
+    pools = []
+    batch_pool = manifest_module.batch_pool
+    monkeypatch.setattr(manifest_module, 'batch_pool', lambda *args: pools.append(batch_pool(*args)) or pools[-1])
+    results = manifest([
+        {'name' : 'pt', 'plotter' : 'Dummy', 'method' : 'plot', 'inputs' : ['a_pt']},
+        {'name' : 'eta', 'plotter' : 'Dummy', 'method' : 'plot', 'inputs' : ['a_eta']},
+        {'name' : 'both', 'plotter' : 'Dummy', 'method' : 'plot', 'inputs' : ['a_pt', 'b_pt'], 'depends' : ['pt']},
+        {'name' : 'again', 'plotter' : 'Dummy', 'method' : 'plot', 'inputs' : ['b_pt'], 'depends' : ['eta']},
+    ]).run(workers=2, start_method='fork')
+    assert [(r.name, r.ok) for r in results]==[('pt', True), ('eta', True), ('both', True), ('again', True)]
+    assert len(pools)==1
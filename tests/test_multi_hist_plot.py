@@ -0,0 +1,60 @@
+import sys
+import pytest
+np = pytest.importorskip('numpy')
+from root_plotting.MultiHistPlot import MultiHistPlot
+from root_plotting.Utils import xrange_bins
+
+class FakeHist():
+    # Cells (under/overflow included), edges and stored limits, read through a patched hist_arrays
+    def __init__(self, contents, sumw2, edges, minimum=-1111, maximum=-1111):
+        self.cells = np.concatenate(([0.], contents, [0.]))
+        self.cells_w2 = np.concatenate(([0.], sumw2, [0.]))
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.minimum, self.maximum = minimum, maximum
+
+    def GetNbinsX(self):
+        return len(self.edges) - 1
+
+    def GetName(self):
+        return 'h'
+
+    def GetMinimumStored(self):
+        return self.minimum
+
+    def GetMaximumStored(self):
+        return self.maximum
+
+@pytest.fixture(autouse=True)
+def arrays(monkeypatch):
+    monkeypatch.setattr(sys.modules['root_plotting.MultiHistPlot'], 'hist_arrays', lambda h: (h.cells, h.cells_w2, h.edges))
+
+def loop_yrange(hists, xrange):
+    # Histogram by histogram, as the y range used to be computed
+    lows, highs = [], []
+    for h in hists:
+        sel = xrange_bins(h.edges, xrange)
+        c = h.cells[1:-1][sel]
+        if len(c)==0: continue
+        err = np.sqrt(h.cells_w2[1:-1][sel])
+        lows.append((c - err).min() if (c < 0).any() else max((c - err).min(), 0))
+        highs.append((c + err).max())
+        if h.minimum != -1111: lows.append(h.minimum)
+        if h.maximum != -1111: highs.append(h.maximum)
+    return (min(lows), max(highs)*1.1) if highs else None
+
+@pytest.mark.parametrize('xrange', [None, (2., 7.), (20., 30.)])
+def test_incl_yrange_against_loop(xrange):
+    rng = np.random.default_rng(4)
+    edges = np.linspace(0., 10., 51)
+    hists = [FakeHist(rng.uniform(lo, 20., 50), rng.uniform(0., 4., 50), edges) for lo in (0., 1., -3.)]
+    hists.append(FakeHist(rng.uniform(1., 20., 50), rng.uniform(0., 4., 50), edges, minimum=-5., maximum=50.))
+    plotter = MultiHistPlot({'xrange' : xrange})
+    for subset in (hists, hists[:3]):
+        expected = loop_yrange(subset, xrange)
+        assert plotter.incl_yrange(subset) is None if expected is None else plotter.incl_yrange(subset)==pytest.approx(expected)
+    # Arrays stacked once for the ratios give the same range
+    assert plotter.incl_yrange(hists, plotter.stack_arrays(hists))==plotter.incl_yrange(hists)
+
+def test_incl_yrange_different_binning():
+    hists = [FakeHist(np.arange(1., 11.), np.ones(10), np.linspace(0., 10., 11)), FakeHist(np.full(5, 30.), np.zeros(5), np.linspace(0., 10., 6))]
+    assert MultiHistPlot().incl_yrange(hists)==pytest.approx(loop_yrange(hists, None))
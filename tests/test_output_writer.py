@@ -0,0 +1,41 @@
+import os
+import pytest
+from root_plotting.OutputWriter import OutputWriter
+
+class FakeCanvas():
+    # Picklable stand-in for a TCanvas; SaveAs writes the canvas name so the output can be checked
+    def __init__(self, name):
+        self.name = name
+
+    def SaveAs(self, path):
+        if path.endswith('.bad'): raise IOError(f'Cannot write {path}')
+        with open(path, 'w') as f: f.write(self.name)
+
+    def Close(self):
+        pass
+
+def test_thread_mode_is_rejected():
+    with pytest.raises(ValueError):
+        OutputWriter(mode='thread')
+
+def test_wait_returns_every_path(fake_root, tmp_path):
+    # Forked workers inherit the fake ROOT module
+    paths = [str(tmp_path / f'sub/plot{i}.{ext}') for i in range(4) for ext in ('png', 'pdf')]
+    stored = []
+    with OutputWriter(workers=2, start_method='fork') as writer:
+        for i in range(4):
+            writer.submit(FakeCanvas(f'c{i}'), paths[2*i:2*i+2], callback=lambda i=i: stored.append(i))
+            # Writes that already finished are still reported by wait()
+            writer.futures[-1].result()
+        assert writer.wait()==paths
+        assert writer.wait()==[]
+    assert sorted(stored)==[0, 1, 2, 3]
+    assert open(paths[2]).read()=='c1' and os.path.exists(paths[-1])
+
+def test_write_error_is_raised(fake_root, tmp_path):
+    stored = []
+    writer = OutputWriter(workers=1, start_method='fork')
+    writer.submit(FakeCanvas('c'), [str(tmp_path / 'plot.bad')], callback=lambda: stored.append(1))
+    with pytest.raises(IOError):
+        writer.close()
+    assert stored==[]
@@ -0,0 +1,80 @@
+import sys
+import json
+import socket
+import asyncio
+import threading
+import pytest
+pytest.importorskip('numpy')
+from root_plotting.BatchRender import PlotResult
+from root_plotting.PlotServer import PlotServer, check_request, run_request, submit
+
+def request(**kwargs):
+    return dict({'plotter' : 'HistPlot', 'method' : 'plotHists', 'args' : [1, [2, 3]], 'kwargs' : {'save' : 'a.png'}, 'params' : {'xrange' : [0, 5]}}, **kwargs)
+
+@pytest.fixture
+def jobs(monkeypatch, fake_root):
+    # Replaces the plot run with a record of the job the server built
+    jobs = []
+    def run_job(job):
+        jobs.append(job)
+        if job.args and job.args[0]=='fail': return PlotResult(job.name, False, error='bad input')
+        return PlotResult(job.name, True, output=job.kwargs.get('save'))
+    monkeypatch.setattr(sys.modules['root_plotting.BatchRender'], 'run_job', run_job)
+    return jobs
+
+def test_check_request_accepts_whitelisted_calls():
+    check_request(request())
+    check_request(request(plotter='EfficiencyMapPlot', method='plotEfficiencyMap', params={'zrange' : [0, 1]}))
+
+@pytest.mark.parametrize('changes, message', [
+    ({'plotter' : 'RenderCache'}, 'Unknown plotter'),
+    ({'method' : '__init__'}, 'is not served'),
+    ({'method' : 'createCanvas'}, 'is not served'),
+    ({'params' : {'render_cache' : '/tmp'}}, "'render_cache' are not accepted"),
+])
+def test_check_request_rejects(changes, message):
+    with pytest.raises(ValueError, match=message):
+        check_request(request(**changes))
+
+def test_run_request_builds_job(jobs):
+    response = run_request(request())
+    assert response=={'ok' : True, 'output' : ['a.png'], 'error' : None}
+    job, = jobs
+    assert (job.plotter, job.method, job.args, job.kwargs, job.params)==('HistPlot', 'plotHists', (1, [2, 3]), {'save' : 'a.png'}, {'xrange' : [0, 5]})
+
+def test_run_request_rejects_before_running(jobs):
+    response = run_request(request(method='createCanvas'))
+    assert not response['ok'] and 'is not served' in response['error']
+    response = run_request(request(params={'profiler' : True}))
+    assert not response['ok'] and 'not accepted' in response['error']
+    assert jobs==[]
+
+def test_server_answers_by_id(jobs, tmp_path):
+    # The requests run on the event loop's default executor instead of the worker pool
+    path = str(tmp_path / 'server.sock')
+    server = PlotServer(path)
+    ready = threading.Event()
+    stop = {}
+
+    async def serve():
+        stop['loop'], stop['event'] = asyncio.get_running_loop(), asyncio.Event()
+        async with await asyncio.start_unix_server(server.handle, path=path):
+            ready.set()
+            await stop['event'].wait()
+
+    thread = threading.Thread(target=asyncio.run, args=(serve(),))
+    thread.start()
+    try:
+        assert ready.wait(10)
+        responses = submit(path, [request(), request(args=['fail'], kwargs={'save' : 'b.png'}), request(method='createCanvas', id='x')])
+        assert [(r['id'], r['ok'], r['output']) for r in responses]==[(0, True, ['a.png']), (1, False, None), ('x', False, None)]
+        assert responses[1]['error']=='bad input'
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            sock.sendall(b'not json\n')
+            sock.shutdown(socket.SHUT_WR)
+            with sock.makefile('r') as f:
+                assert json.loads(f.readline())=={'id' : None, 'ok' : False, 'output' : None, 'error' : 'Invalid JSON request'}
+    finally:
+        stop['loop'].call_soon_threadsafe(stop['event'].set)
+        thread.join(10)
@@ -0,0 +1,97 @@
+import gc
+import pytest
+from root_plotting.PlotSession import PlotSession, managed_plot, bound_argument
+
+class FakeObject():
+    def __init__(self, kind='TH1'):
+        self.kind = kind
+        self.closed = False
+        self.directory = 'gDirectory'
+        self.deleted = False
+
+    def InheritsFrom(self, kind):
+        return kind==self.kind
+
+    def SetDirectory(self, d):
+        self.directory = d
+
+    def Close(self):
+        self.closed = True
+
+@pytest.fixture
+def owned(fake_root):
+    # addressof is 0 for objects ROOT already deleted; SetOwnership records what was handed to Python
+    fake_root.addressof = lambda obj: 0 if obj.deleted else id(obj)
+    fake_root.owned = []
+    fake_root.SetOwnership = lambda obj, python: fake_root.owned.append(obj)
+    return fake_root
+
+class Plotter():
+    def __init__(self, session):
+        self.session = session
+
+    @managed_plot
+    def plotHist(self, h, show=False, save=False):
+        c = self.session.track(FakeObject('TCanvas'))
+        r = self.session.track(FakeObject())
+        return c, r
+
+def test_unique_names():
+    s = PlotSession(prefix='s')
+    assert s.unique_name('c')=='s_c_0' and s.unique_name('c')=='s_c_1'
+
+def test_saved_plot_released_when_next_plot_starts(owned):
+    session = PlotSession()
+    p = Plotter(session)
+    c, r = p.plotHist(None, False, 'a.png')                 # save passed positionally
+    assert r.directory==0
+    assert not c.closed and session.pending==[c, r]
+    p.plotHist(None, save='b.png')
+    assert c.closed and owned.owned==[c, r]
+    assert len(session.pending)==2
+
+def test_unsaved_and_kept_objects(owned):
+    with PlotSession() as session:
+        p = Plotter(session)
+        c, r = p.plotHist(None)
+        assert session.owned==[c, r] and session.pending==[]
+        kept = session.keep(*p.plotHist(None, save='a.png'))
+        p.plotHist(None, save='b.png')
+    assert c.closed and not kept[0].closed
+    assert session.kept==list(kept)
+    session.release(everything=True)
+    assert kept[0].closed and session.kept==[]
+
+def test_deleted_objects_are_skipped(owned):
+    session = PlotSession()
+    c, r = Plotter(session).plotHist(None)
+    c.deleted = True
+    session.release()
+    assert owned.owned==[r] and not c.closed
+
+def test_gc_only_every_n_releases(owned, monkeypatch):
+    collections = []
+    monkeypatch.setattr(gc, 'collect', lambda: collections.append(1))
+    session = PlotSession(collect_every=3)
+    p = Plotter(session)
+    for k in range(7): p.plotHist(None, save=f'{k}.png')
+    # six releases of a previous plot, one collection at the third and sixth
+    assert len(collections)==2
+    session.release()
+    assert len(collections)==3
+
+def test_bound_argument():
+    def plot(self, h, show=False, save=False): pass
+    assert bound_argument(plot, (None, 1, False, 'a.png'), {}, 'save')=='a.png'
+    assert bound_argument(plot, (None, 1), {'save' : 'b.png'}, 'save')=='b.png'
+    assert bound_argument(plot, (None, 1), {}, 'save') is False
+
+def test_efficiency_objects_use_session_names():
+    pytest.importorskip('ROOT')
+    from root_plotting.EfficiencyPlot import EfficiencyPlot
+    from root_plotting.EffArrays import EffArrays
+    with PlotSession(prefix='eff') as session:
+        ep = EfficiencyPlot({'session' : session, 'ratio_interval' : 'katz'})
+        a = EffArrays([1., 2.], [2., 4.], [0., 1., 2.])
+        assert ep.eff_ratio(a, a).GetName().startswith('eff_eff_ratio_')
+        assert a.graph(name=session.unique_name('eff')).GetName().startswith('eff_eff_')
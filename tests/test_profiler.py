@@ -0,0 +1,73 @@
+import io
+import sys
+import types
+import pytest
+from root_plotting.Profiler import PlotProfiler, profiled, profiled_plot
+
+class Plotter():
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    @profiled('format_entry')
+    def allocate(self, nbytes, keep):
+        data = bytearray(nbytes)
+        return data if keep else None
+
+    @profiled_plot
+    def plotHist(self, h, show=False, save=False):
+        self.kept = self.allocate(1 << 20, keep=True)
+        self.allocate(4 << 20, keep=False)
+
+@pytest.fixture
+def profiler():
+    prof = PlotProfiler()
+    yield prof
+    prof.close()
+
+def test_phase_memory(profiler):
+    p = Plotter(profiler)
+    p.plotHist(None, False, ['a.png', 'a.pdf'])
+    kept, freed, total = profiler.records
+    assert [r['phase'] for r in profiler.records]==['format_entry', 'format_entry', 'total']
+    assert all(r['plot']=='a.png' for r in profiler.records)
+    assert kept['py_kb']==pytest.approx(1024, rel=.05)
+    # Freed inside the phase: nothing left, but the peak shows it
+    assert abs(freed['py_kb']) < 50
+    assert freed['py_peak_kb']==pytest.approx(4096, rel=.05)
+    # The enclosing phase keeps the peak of its inner phases
+    assert total['py_peak_kb'] >= 5 * 1024 * .95
+    assert total['py_kb']==pytest.approx(1024, rel=.05)
+
+def test_summary_and_dump(profiler):
+    p = Plotter(profiler)
+    p.plotHist(None, save='a.png')
+    p.plotHist(None)
+    by_plot = profiler.summary('plot')
+    assert set(by_plot)=={'a.png', 'plotHist'}
+    assert by_plot['a.png']['calls']==3
+    phase = profiler.summary()['format_entry']
+    assert phase['calls']==4
+    assert phase['py_peak_kb']==pytest.approx(4096, rel=.05)
+    out = io.StringIO()
+    profiler.dump_flat(out)
+    assert 'py_peak_kb' in out.getvalue().splitlines()[0]
+
+def test_memory_off():
+    prof = PlotProfiler(memory=False)
+    Plotter(prof).plotHist(None, save='a.png')
+    assert all(r['py_kb'] is None and r['rss_kb'] is None for r in prof.records)
+
+def test_rss_from_root(monkeypatch, profiler):
+    # gSystem.GetProcInfo fills a ProcInfo_t; a stand-in reports 100 kB more on every call
+    class ProcInfo():
+        fMemResident = 0
+    calls = []
+    def get_proc_info(info):
+        calls.append(1)
+        info.fMemResident = 100 * len(calls)
+    root = types.ModuleType('ROOT')
+    root.ProcInfo_t = ProcInfo
+    root.gSystem = types.SimpleNamespace(GetProcInfo=get_proc_info)
+    monkeypatch.setitem(sys.modules, 'ROOT', root)
+    with profiler.phase('SaveAs'): pass
+    assert profiler.records[0]['rss_kb']==100
@@ -0,0 +1,35 @@
+import pytest
+np = pytest.importorskip('numpy')
+ROOT = pytest.importorskip('ROOT')
+from root_plotting.RDFBatch import RDFBatch, HistSpec, EffSpec
+
+@pytest.fixture
+def events(tmp_path):
+    # 100 events: x = 0..99, w = 2, pass for even x
+    path = str(tmp_path / 'events.root')
+    ROOT.RDataFrame(100).Define('x', 'double(rdfentry_)').Define('w', '2.').Define('pass', 'rdfentry_ % 2 == 0').Snapshot('Events', path)
+    return path
+
+def test_one_event_loop(events):
+    batch = RDFBatch('Events', events, threads=None)
+    batch.book_all([
+        HistSpec('x', 'x', (10, 0., 100.)),
+        HistSpec('x_low', 'x', np.array([0., 10., 50.]), selection='x < 50', weight='w'),
+        HistSpec('x_half', 'x/2', (10, 0., 100.)),
+        EffSpec('eff', 'x/2', (5, 0., 50.), pass_selection='pass'),
+    ])
+    # x is a column already, x/2 is defined once for both specs that use it
+    assert sum(c.startswith('_rp_col') for c in batch._columns.values())==1
+    results = batch.run()
+    assert batch.df.GetNRuns()==1
+    assert results['x'].GetEntries()==100 and results['x'].GetBinContent(1)==10
+    assert [results['x_low'].GetBinContent(i) for i in (1, 2)]==[20., 80.]
+    eff = results['eff']
+    assert eff.GetName()=='eff' and eff.GetTotalHistogram().GetBinContent(1)==20 and eff.GetEfficiency(1)==pytest.approx(.5)
+    # Results are kept, a second run does not loop again
+    assert batch.run()['x'] is results['x'] and batch.df.GetNRuns()==1
+
+def test_duplicate_names(events):
+    batch = RDFBatch('Events', events, threads=None).book(HistSpec('x', 'x', (10, 0., 100.)))
+    with pytest.raises(ValueError):
+        batch.book(HistSpec('x', 'x*2', (10, 0., 200.)))
@@ -0,0 +1,80 @@
+import os
+import pytest
+np = pytest.importorskip('numpy')
+from root_plotting.HistPlot import HistPlot
+from root_plotting.MultiHistPlot import MultiHistPlot
+from root_plotting.EffArrays import EffArrays
+from root_plotting.RenderCache import RenderCache
+
+EDGES = np.linspace(0., 10., 11)
+
+def inputs(scale=1.):
+    return [np.arange(10.) * scale, EffArrays(np.arange(10.), np.full(10, 20.), EDGES, title='eff')]
+
+@pytest.fixture
+def cache(tmp_path):
+    return RenderCache(str(tmp_path))
+
+def test_key_is_stable(cache):
+    key = cache.key(HistPlot(), 'plotHists', inputs(), [True, None])
+    assert key==cache.key(HistPlot(), 'plotHists', inputs(), [True, None])
+    # Same content in a different array object hashes the same
+    assert key==cache.key(HistPlot(), 'plotHists', [a.copy() if isinstance(a, np.ndarray) else a for a in inputs()], [True, None])
+
+def test_key_changes_with_output(cache):
+    key = cache.key(HistPlot(), 'plotHists', inputs(), [True, None])
+    assert key!=cache.key(HistPlot(), 'plotHists', inputs(2.), [True, None])
+    assert key!=cache.key(HistPlot(), 'plotHists', inputs(), [False, None])
+    assert key!=cache.key(HistPlot(), 'plotHist', inputs(), [True, None])
+    assert key!=cache.key(HistPlot({'xrange' : (0, 5)}), 'plotHists', inputs(), [True, None])
+    assert key!=cache.key(MultiHistPlot(), 'plotHists', inputs(), [True, None])
+
+def test_key_ignores_helpers(cache):
+    # Attached helpers are not plot parameters and must not change the key
+    from root_plotting.Profiler import PlotProfiler
+    key = cache.key(HistPlot(), 'plotHists', inputs(), None)
+    hp = HistPlot({'render_cache' : cache, 'profiler' : PlotProfiler(), 'plot_name' : 'x'})
+    assert key==cache.key(hp, 'plotHists', inputs(), None)
+
+def test_key_needs_plot_params(cache):
+    class Plotter():
+        pass
+    with pytest.raises(TypeError):
+        cache.key(Plotter(), 'plotHists', inputs(), None)
+
+def write(path, nbytes):
+    with open(path, 'wb') as f: f.write(b'x' * nbytes)
+    return str(path)
+
+def test_store_fetch_and_evict(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path / 'cache'), max_bytes=250)
+    out = tmp_path / 'out'
+    out.mkdir()
+    cache.store('a', [write(out / 'a.png', 100)])
+    cache.store('b', [write(out / 'b.png', 100)])
+    assert cache.size()==200
+    assert cache.fetch('a', [str(out / 'copy.png')])
+    assert (out / 'copy.png').read_bytes()==b'x' * 100
+    assert not cache.fetch('missing', [str(out / 'none.png')])
+
+    # Under the limit the directory is never scanned again
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, 'scandir', lambda path: scans.append(path) or scandir(path))
+    cache.store('a', [str(out / 'a.png')])                  # overwriting an entry does not grow the cache
+    assert cache.size()==200 and scans==[]
+    os.utime(cache.entry('b', 'b.png'), (0, 0))           # b is now the least recently used
+    cache.store('c', [write(out / 'c.png', 100)])
+    assert len(scans)==1
+    assert cache.stats['evictions']==1 and cache.size()==200
+    assert not os.path.exists(cache.entry('b', 'b.png'))
+    assert os.path.exists(cache.entry('a', 'a.png')) and os.path.exists(cache.entry('c', 'c.png'))
+    assert cache.stats['hits']==1 and cache.stats['misses']==1 and cache.stats['stores']==4
+
+def test_cache_hit_returns_sentinel():
+    from root_plotting.PlotBase import CACHED
+    hp = HistPlot()
+    hp._drawn = {'canvas' : object()}
+    assert hp.cache_hit() is CACHED
+    assert hp.cache_hit(True)==(CACHED, CACHED)
+    assert hp._drawn is None and not CACHED
@@ -0,0 +1,32 @@
+import pytest
+np = pytest.importorskip('numpy')
+from root_plotting.StackPlot import StackPlot
+
+CONTENTS = np.array([[1., 2., 1.], [10., 10., 0.], [0., 0., 0.]])
+
+def test_sample_scales_no_norm():
+    np.testing.assert_array_equal(StackPlot().sample_scales(CONTENTS), [1., 1., 1.])
+
+def test_sample_scales_common_norm():
+    scales = StackPlot({'norm' : 1.}).sample_scales(CONTENTS)
+    np.testing.assert_allclose(scales, [1/4, 1/20, 1.])          # an empty sample is left as it is
+    np.testing.assert_allclose((CONTENTS * scales[:, None]).sum(axis=1), [1., 1., 0.])
+
+def test_sample_scales_per_sample():
+    scales = StackPlot({'norm' : [8., None, 3.]}).sample_scales(CONTENTS)
+    np.testing.assert_allclose(scales, [2., 1., 1.])
+    scales = StackPlot({'norm' : np.array([2., 40., 1.])}).sample_scales(CONTENTS)
+    np.testing.assert_allclose(scales, [.5, 2., 1.])
+
+def test_sample_scales_wrong_length():
+    with pytest.raises(ValueError):
+        StackPlot({'norm' : [1., 2.]}).sample_scales(CONTENTS)
+
+def test_stack_uses_scales():
+    sp = StackPlot({'norm' : [2., None]})
+    edges = np.arange(4.)
+    samples = [(np.array([1., 2., 1.]), edges), (np.array([3., 0., 1.]), np.array([3., 0., 1.]), edges)]
+    out_edges, cumulative, total_w2, _ = sp.stack(samples)
+    np.testing.assert_array_equal(out_edges, edges)
+    np.testing.assert_allclose(cumulative, [[.5, 1., .5], [3.5, 1., 1.5]])
+    np.testing.assert_allclose(total_w2, np.array([1., 2., 1.]) / 4 + np.array([3., 0., 1.]))
@@ -0,0 +1,91 @@
+import pytest
+np = pytest.importorskip('numpy')
+from root_plotting.Stats import CL_1SIGMA, beta_quantile_numpy, eff_interval, ratio_interval
+
+ALPHA = (1 - CL_1SIGMA) / 2
+
+def test_beta_quantile_numpy_closed_form():
+    # Beta(1, b) has the quantile 1-(1-q)^(1/b), Beta(a, 1) has q^(1/a)
+    q = np.array([.01, ALPHA, .5, 1-ALPHA, .99])
+    for n in (1., 3., 25., 400.):
+        np.testing.assert_allclose(beta_quantile_numpy(q, 1., n), 1 - (1-q)**(1/n), rtol=1e-9)
+        np.testing.assert_allclose(beta_quantile_numpy(q, n, 1.), q**(1/n), rtol=1e-9)
+
+def test_beta_quantile_numpy_matches_scipy():
+    special = pytest.importorskip('scipy.special')
+    rng = np.random.default_rng(3)
+    a = rng.integers(1, 2000, 500).astype(float)
+    b = rng.integers(1, 2000, 500).astype(float)
+    q = rng.uniform(.001, .999, 500)
+    np.testing.assert_allclose(beta_quantile_numpy(q, a, b), special.betaincinv(a, b, q), rtol=1e-9, atol=1e-12)
+
+def test_clopper_pearson_edges():
+    # No passes: upper bound 1-alpha^(1/n); all pass: lower bound alpha^(1/n)
+    total = np.array([1., 10., 100.])
+    eff, err_low, err_up = eff_interval(np.zeros(3), total, method='clopper_pearson')
+    np.testing.assert_allclose(eff, 0.)
+    np.testing.assert_allclose(err_low, 0.)
+    np.testing.assert_allclose(err_up, 1 - ALPHA**(1/total), rtol=1e-9)
+    eff, err_low, err_up = eff_interval(total, total, method='clopper_pearson')
+    np.testing.assert_allclose(eff, 1.)
+    np.testing.assert_allclose(err_low, 1 - ALPHA**(1/total), rtol=1e-9)
+    np.testing.assert_allclose(err_up, 0.)
+
+def test_clopper_pearson_matches_scipy():
+    special = pytest.importorskip('scipy.special')
+    passed, total = np.array([1., 5., 37., 99.]), np.array([10., 10., 50., 100.])
+    eff, err_low, err_up = eff_interval(passed, total, method='clopper_pearson')
+    np.testing.assert_allclose(eff - err_low, special.betaincinv(passed, total-passed+1, ALPHA), rtol=1e-10)
+    np.testing.assert_allclose(eff + err_up, special.betaincinv(passed+1, total-passed, 1-ALPHA), rtol=1e-10)
+
+def test_normal_and_wilson():
+    passed, total = np.array([30.]), np.array([100.])
+    z = 1.
+    _, err_low, err_up = eff_interval(passed, total, method='normal', level=CL_1SIGMA)
+    np.testing.assert_allclose(err_low, np.sqrt(.3*.7/100), rtol=1e-9)
+    np.testing.assert_allclose(err_up, np.sqrt(.3*.7/100), rtol=1e-9)
+    _, err_low, err_up = eff_interval(passed, total, method='wilson')
+    center = (.3 + z*z/200) / (1 + z*z/100)
+    half = z * np.sqrt(.3*.7/100 + z*z/40000) / (1 + z*z/100)
+    np.testing.assert_allclose(.3 - err_low, center - half, rtol=1e-8)
+    np.testing.assert_allclose(.3 + err_up, center + half, rtol=1e-8)
+
+@pytest.mark.parametrize('method', ['clopper_pearson', 'wilson', 'bayesian', 'normal'])
+def test_eff_interval_empty_bins(method):
+    eff, err_low, err_up = eff_interval([0., 3.], [0., 4.], method=method)
+    assert eff[0]==0. and err_low[0]==0. and err_up[0]==0.
+    assert eff[1]==.75
+    assert err_low[1] >= 0. and err_up[1] >= 0.
+
+def test_eff_interval_unknown_method():
+    with pytest.raises(ValueError):
+        eff_interval([1.], [2.], method='agresti')
+
+def test_ratio_interval():
+    r, err_low, err_up = ratio_interval([40., 10., 5.], [100., 20., 10.], [20., 0., 0.], [100., 20., 0.])
+    assert r[0]==pytest.approx(2.)
+    assert 0 < err_low[0] < err_up[0]            # log interval: longer upwards
+    # No passes in the denominator, or an empty denominator sample: undefined, reported as 0
+    assert r[1]==0. and err_low[1]==0. and err_up[1]==0.
+    assert r[2]==0. and err_low[2]==0. and err_up[2]==0.
+    # Katz interval with no continuity correction: exp(+-z*se) around r
+    se = np.sqrt(1/40 - 1/100 + 1/20 - 1/100)
+    assert r[0] - err_low[0]==pytest.approx(2. / np.exp(se), rel=1e-6)
+    assert r[0] + err_up[0]==pytest.approx(2. * np.exp(se), rel=1e-6)
+
+def test_default_ratio_is_binomial_th1():
+    # The ratio panel stays a TH1 unless the Katz interval is requested
+    from root_plotting.EfficiencyPlot import EfficiencyPlot
+    from root_plotting.EffArrays import EffArrays
+    assert EfficiencyPlot().ratio_interval is None
+    a1 = EffArrays([5., 8.], [10., 10.], [0., 1., 2.])
+    a2 = EffArrays([4., 0.], [8., 10.], [0., 1., 2.])
+    r, err2 = a1.ratio_arrays(a2)
+    np.testing.assert_allclose(r, [1., 0.])
+    # TH1::Divide of the two efficiencies with binomial errors eff(1-eff)/total
+    np.testing.assert_allclose(err2[0], (.25/10 * .25 + .25/8 * .25) / .5**4)
+    pytest.importorskip('ROOT')
+    ep = EfficiencyPlot()
+    assert ep.eff_ratio(a1, a2).InheritsFrom('TH1')
+    ep.set_params({'ratio_interval' : 'katz'})
+    assert ep.eff_ratio(a1, a2).InheritsFrom('TGraphAsymmErrors')
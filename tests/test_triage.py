@@ -0,0 +1,48 @@
+import pytest
+np = pytest.importorskip('numpy')
+from root_plotting.Stats import chi2_test, ks_test, kolmogorov_prob
+from root_plotting.Triage import Triage
+
+def test_chi2_test():
+    c1 = np.array([[10., 20., 0.], [5., 5., 5.]])
+    c2 = np.array([[12., 16., 0.], [5., 5., 5.]])
+    chi2, ndf = chi2_test(c1, c1, c2, c2)
+    assert chi2[0]==pytest.approx(4/22 + 16/36)
+    assert chi2[1]==0.
+    np.testing.assert_array_equal(ndf, [2, 3])   # bins empty in both inputs do not count
+
+def test_ks_test():
+    c = np.array([[1., 4., 9., 4., 1.]])
+    dist, prob = ks_test(c, c, 2*c, 4*c)
+    assert dist[0]==0. and prob[0]==1.
+    c1 = np.array([[100., 0.]])
+    c2 = np.array([[0., 100.]])
+    dist, prob = ks_test(c1, c1, c2, c2)
+    assert dist[0]==1.
+    assert prob[0] < 1e-10
+    # Empty input: no distance
+    dist, prob = ks_test(np.zeros((1, 3)), np.zeros((1, 3)), np.ones((1, 3)), np.ones((1, 3)))
+    assert dist[0]==0. and prob[0]==1.
+
+def test_kolmogorov_prob():
+    # TMath::KolmogorovProb reference values
+    np.testing.assert_allclose(kolmogorov_prob([.1, .5, 1., 2.]), [1., .963945243, .269999671, .000670925], rtol=1e-6)
+
+def pair(scale):
+    edges = np.arange(6.)
+    contents = np.array([1., 2., 3., 4., 5.]) * scale
+    return {'edges' : edges, 'contents' : contents, 'sumw2' : contents}
+
+def test_score_ranks_and_flags():
+    records = Triage().score([('same', pair(1.), pair(1.)), ('scaled', pair(1.), pair(10.))])
+    assert [r.name for r in records]==['scaled', 'same']
+    assert records[0].flagged and not records[1].flagged
+    assert records[0].ndf==5
+    assert records[0].chi2==pytest.approx(81 / 11 * 15)
+    assert records[0].max_dev==pytest.approx(9.)
+
+def test_score_normalize_costs_one_degree_of_freedom():
+    record, = Triage(normalize=True).score([('scaled', pair(1.), pair(10.))])
+    assert record.ndf==4
+    assert record.chi2==pytest.approx(0., abs=1e-12)
+    assert not record.flagged
@@ -0,0 +1,53 @@
+import pytest
+np = pytest.importorskip('numpy')
+from root_plotting.Utils import divide_arrays
+
+def test_divide_arrays_matches_th1_divide():
+    ROOT = pytest.importorskip('ROOT')
+    from root_plotting.Utils import hist_arrays
+    rng = np.random.default_rng(1)
+    h1 = ROOT.TH1D('div_num', '', 20, 0, 20)
+    h2 = ROOT.TH1D('div_den', '', 20, 0, 20)
+    h1.SetDirectory(0)
+    h2.SetDirectory(0)
+    for x, w in zip(rng.uniform(-1, 21, 500), rng.uniform(.5, 2, 500)): h1.Fill(x, w)
+    for x, w in zip(rng.uniform(-1, 15, 800), rng.uniform(.5, 2, 800)): h2.Fill(x, w)
+    c1, w1, _ = hist_arrays(h1)
+    c2, w2, _ = hist_arrays(h2)
+    content, err2 = divide_arrays(c1, w1, c2, w2)
+    h1.Divide(h2)
+    expected, expected_w2, _ = hist_arrays(h1)
+    np.testing.assert_allclose(content, expected, rtol=1e-12)
+    np.testing.assert_allclose(err2, expected_w2, rtol=1e-12)
+
+def test_divide_arrays_error_propagation():
+    c1, w1 = np.array([4., 9.]), np.array([4., 9.])
+    c2, w2 = np.array([2., 3.]), np.array([1., 3.])
+    content, err2 = divide_arrays(c1, w1, c2, w2)
+    np.testing.assert_allclose(content, c1 / c2)
+    np.testing.assert_allclose(err2, (w1 / c1**2 + w2 / c2**2) * (c1 / c2)**2)
+
+def test_divide_arrays_empty_denominator():
+    content, err2 = divide_arrays([1., 0., 3.], [1., 0., 3.], [0., 0., 2.], [0., 0., 2.])
+    assert content[0]==0. and err2[0]==0.
+    assert content[1]==0. and err2[1]==0.
+    assert content[2]==1.5
+    assert np.all(np.isfinite(content)) and np.all(np.isfinite(err2))
+
+def test_hist_arrays_views_and_clone():
+    ROOT = pytest.importorskip('ROOT')
+    from root_plotting.Utils import hist_arrays, set_hist_arrays, clone
+    h = ROOT.TH1F('views', '', 5, 0, 5)
+    h.SetDirectory(0)
+    h.Sumw2()
+    contents, sumw2, edges = hist_arrays(h)
+    assert contents.dtype==np.float32 and len(contents)==7
+    np.testing.assert_array_equal(edges, np.arange(6.))
+    set_hist_arrays(h, np.arange(7.), np.arange(7.) * 2)
+    assert h.GetBinContent(3)==3. and h.GetBinError(3)==pytest.approx(np.sqrt(6.))
+    contents[3] = 10.                                   # a view: writes reach the histogram
+    assert h.GetBinContent(3)==10.
+    c = clone(h, name='views_copy')
+    assert c.ClassName()=='TH1F' and c.GetName()=='views_copy'
+    np.testing.assert_array_equal(hist_arrays(c)[0], hist_arrays(h)[0])
+    np.testing.assert_array_equal(hist_arrays(c)[1], hist_arrays(h)[1])